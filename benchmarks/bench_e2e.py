@@ -0,0 +1,234 @@
+"""
+Сквозной бенчмарк обеих функций на локальных стендах OpenAI, Typeform и Sheets (fakes.py).
+Функции вызываются через тестовый клиент Flask с заданной параллельностью; отчёт —
+p50/p95/p99, пропускная способность, разбивка по этапам и счётчики запросов к стендам.
+
+    python benchmarks/bench_e2e.py                                  # обе функции
+    python benchmarks/bench_e2e.py --target generate_form --requests 100 --concurrency 16
+    python benchmarks/bench_e2e.py --openai-latency 1500 --openai-errors 0.05 --openai-rpm 300
+
+Каждая функция запускается в отдельном процессе: у обеих модули main и settings.
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlencode
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+
+import fakes  # noqa: E402
+
+WEBHOOK_SECRET = "bench-secret"
+MUST_HAVES = "- Офис в Москве по вторникам и четвергам\n- Max budget is 2000 EUR"
+# Набор правил компактного redirect_url (v=...&a=...), как его пишет generate_form в лист rulesets
+RULESET_VERSION = "benchruleset"
+RULESET_REFS = ["musthave_ofis_v_moskve_po_vtornikam_i_chetvergam", "budget_accept", "email", "phone"]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def load_app(function):
+    """
+    Flask-приложение вокруг Cloud Function: маршрут на каждую точку входа.
+    """
+    sys.path.insert(0, os.path.join(ROOT, function))
+    import logging
+    from flask import Flask, request
+    import main
+    logging.getLogger().setLevel(logging.ERROR)
+    app = Flask(function)
+    entry_points = {
+        "generate_form": ("generate_form",),
+        "process_submission": ("process_submission", "typeform_webhook", "drain_submissions"),
+    }[function]
+    for name in entry_points:
+        handler = getattr(main, name)
+        app.add_url_rule(f"/{name}", name, (lambda h: lambda: h(request))(handler), methods=["GET", "POST"])
+    return app
+
+
+def drive(app, requests, concurrency):
+    """
+    requests — список (method, path, kwargs). Возвращает (samples, wall_seconds);
+    sample — latency, status и JSON ответа.
+    """
+    def call(item):
+        method, path, kwargs = item
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        latency = time.perf_counter() - start
+        return {"latency": latency, "status": response.status_code, "json": response.get_json(silent=True)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(call, requests))
+    return samples, time.perf_counter() - started
+
+
+def stage_breakdown(samples):
+    stages = {}
+    for sample in samples:
+        timings = (sample["json"] or {}).get("timings") or {}
+        for name, stage in (timings.get("stages") or {}).items():
+            stages.setdefault(name, []).append(stage["duration_ms"])
+        for key in ("sheet_read_ms", "sheet_write_ms"):
+            if key in timings:
+                stages.setdefault(key.replace("_ms", ""), []).append(timings[key])
+    return {name: {"p50": percentile(v, 0.5), "p95": percentile(v, 0.95)} for name, v in stages.items()}
+
+
+def summarize(name, samples, wall):
+    latencies = [s["latency"] * 1000 for s in samples]
+    return {
+        "scenario": name,
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s["status"] >= 400),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "stages": stage_breakdown(samples),
+    }
+
+
+def run_generate_form(args):
+    app = load_app("generate_form")
+    extra = {"no_cache": "1"} if args.no_cache else {}
+    results = []
+    if args.batch:
+        chunks = [list(range(2 + i, 2 + min(i + args.batch, args.requests))) for i in range(0, args.requests, args.batch)]
+        requests = [("GET", "/generate_form?" + urlencode({"row_ids": f"{c[0]}-{c[-1]}", **extra}), {}) for c in chunks]
+        samples, wall = drive(app, requests, args.concurrency)
+        results.append(summarize(f"generate_form batch={args.batch}", samples, wall))
+    else:
+        requests = [("GET", "/generate_form?" + urlencode({"row_id": row, **extra}), {})
+                    for row in range(2, 2 + args.requests)]
+        samples, wall = drive(app, requests, args.concurrency)
+        results.append(summarize("generate_form", samples, wall))
+        # Повтор тех же строк: отпечаток не изменился — ссылка возвращается без GPT и Typeform
+        samples, wall = drive(app, requests, args.concurrency)
+        results.append(summarize("generate_form (unchanged rows)", samples, wall))
+    return results
+
+
+def _answers(i):
+    # Каждый четвёртый не проходит must-have, каждый десятый — повторный отклик предыдущего кандидата
+    candidate = i - 1 if i % 10 == 9 else i
+    return {
+        "musthave_ofis_v_moskve_po_vtornikam_i_chetvergam": "Нет" if i % 4 == 0 else "Да", "budget_accept": "Да",
+        "email": f"candidate{candidate}@example.com", "phone": f"+7999{candidate:07d}",
+    }
+
+
+def run_process_submission(args):
+    app = load_app("process_submission")
+    redirects = [
+        ("GET", "/process_submission?" + urlencode({"pass": "true", "must_haves": MUST_HAVES, **_answers(i)}), {})
+        for i in range(args.requests)
+    ]
+    results = [summarize("process_submission redirect", *drive(app, redirects, args.concurrency))]
+    compact = [
+        ("GET", "/process_submission?" + urlencode({
+            "v": RULESET_VERSION, "a": ",".join(quote(_answers(i)[ref], safe="") for ref in RULESET_REFS)
+        }, safe=","), {})
+        for i in range(args.requests)
+    ]
+    results.append(summarize("process_submission compact", *drive(app, compact, args.concurrency)))
+
+    def webhook(i):
+        body = json.dumps({"event_id": f"ev{i}", "form_response": {
+            "form_id": "benchform", "token": f"tok{i}", "submitted_at": "2026-01-01T00:00:00Z",
+            "answers": [
+                {"type": "choice", "choice": {"label": value}, "field": {"ref": ref}}
+                for ref, value in _answers(i).items()
+            ],
+        }}, ensure_ascii=False).encode("utf-8")
+        digest = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).digest()
+        signature = "sha256=" + base64.b64encode(digest).decode()
+        return ("POST", "/typeform_webhook?" + urlencode({"must_haves": MUST_HAVES}),
+                {"data": body, "headers": {"Typeform-Signature": signature}, "content_type": "application/json"})
+
+    results.append(summarize("typeform_webhook", *drive(app, [webhook(i) for i in range(args.requests)], args.concurrency)))
+    samples, wall = drive(app, [("GET", "/drain_submissions", {})], 1)
+    results.append(summarize("drain_submissions", samples, wall))
+    return results
+
+
+def run_child(args):
+    runner = {"generate_form": run_generate_form, "process_submission": run_process_submission}[args.run]
+    print(json.dumps(runner(args)))
+
+
+def print_report(results, fake_stats):
+    for result in results:
+        print(f"\n{result['scenario']}: n={result['requests']} errors={result['errors']} "
+              f"wall={result['wall_s']}s throughput={result['throughput_rps']} req/s")
+        print(f"  latency p50={result['p50_ms']} ms  p95={result['p95_ms']} ms  p99={result['p99_ms']} ms")
+        for name, stage in sorted(result["stages"].items(), key=lambda item: -item[1]["p50"]):
+            print(f"    {name:<14} p50={stage['p50']:8.1f} ms  p95={stage['p95']:8.1f} ms")
+    print("\nзапросы к стендам:", json.dumps(fake_stats, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("generate_form", "process_submission", "all"), default="all")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=0, help="generate_form пакетами row_ids по N строк")
+    parser.add_argument("--no-cache", action="store_true", help="не читать кэш ответов OpenAI")
+    parser.add_argument("--client-quotas", action="store_true",
+                        help="оставить квоты scheduler из settings (по умолчанию сняты, лимиты задают стенды)")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    fakes.add_arguments(parser)
+    args = parser.parse_args()
+    if args.run:
+        return run_child(args)
+
+    bench_fakes = fakes.fakes_from_args(args)
+    env = dict(os.environ, **bench_fakes.start())
+    bench_fakes.servers["sheets"].cells["rulesets"] = {
+        (1, 1): RULESET_VERSION, (2, 1): MUST_HAVES, (3, 1): json.dumps(RULESET_REFS),
+    }
+    targets = ("generate_form", "process_submission") if args.target == "all" else (args.target,)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env.update({
+            "GPT_CACHE_BACKEND": env.get("GPT_CACHE_BACKEND", "memory"),
+            "GPT_CACHE_PATH": os.path.join(tmp, "gpt_cache.sqlite3"),
+            "TYPEFORM_WEBHOOK_SECRET": WEBHOOK_SECRET,
+            "SUBMISSION_QUEUE_PATH": os.path.join(tmp, "queue.sqlite3"),
+            "CANDIDATE_DB_PATH": os.path.join(tmp, "candidates.sqlite3"),
+            "DEDUP_INDEX_PATH": os.path.join(tmp, "dedup.jsonl"),
+        })
+        if not args.client_quotas:
+            env.update({key: "1000000" for key in ("OPENAI_RPM", "OPENAI_TPM", "SHEETS_RPM", "TYPEFORM_RPM")})
+        for target in targets:
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run", target] + sys.argv[1:],
+                env=env, stdout=subprocess.PIPE, text=True,
+            )
+            if child.returncode != 0:
+                sys.exit(f"{target}: бенчмарк завершился с кодом {child.returncode}")
+            results += json.loads(child.stdout.strip().splitlines()[-1])
+    print_report(results, bench_fakes.stats())
+    bench_fakes.stop()
+
+
+if __name__ == "__main__":
+    main()
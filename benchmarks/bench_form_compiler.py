@@ -0,0 +1,164 @@
+"""
+Бенчмарк сборки формы в generate_form: весь граф этапов (main.build_stages) на локальных
+стендах OpenAI, Typeform и Sheets (fakes.py) при FORM_COMPILER=local и FORM_COMPILER=gpt.
+Отчёт — латентность строки и каждого этапа для обоих режимов: при local JSON формы
+собирает form_compiler параллельно с логикой, при gpt — отдельный вызов OpenAI (промпт B6)
+после логики; ответ стенда на этот вызов — та же форма, собранная локально.
+
+    python benchmarks/bench_form_compiler.py [--rows 30] [--concurrency 4]
+    python benchmarks/bench_form_compiler.py --openai-latency 1500 --openai-token-delay 5
+
+Каждый режим запускается в отдельном процессе: FORM_COMPILER читается при импорте settings.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+
+import fakes  # noqa: E402
+
+MODES = ("local", "gpt")
+SAMPLE_QUESTIONS = [
+    {"title": "Сколько лет вы работаете с Windows-инфраструктурой?", "field_type": "number", "required": "yes"},
+    {
+        "title": "Какой у вас опыт с Active Directory?", "field_type": "multiple_choice", "required": "yes",
+        "options": ["Продвинутый", "Средний", "Начальный", "Нет опыта"],
+    },
+    {
+        "title": "Вы готовы приезжать в офис в Москве по вторникам и четвергам?", "field_type": "multiple_choice",
+        "ref": "musthave_office", "options": ["Да", "Нет"], "required": "yes",
+    },
+    {"title": "Expected monthly salary gross (EUR)", "field_type": "number", "ref": "salary", "required": "yes"},
+    {
+        "title": "Our max budget is 2000 EUR gross. Are you ok with it?", "field_type": "multiple_choice",
+        "ref": "budget_accept", "options": ["Yes", "No"],
+    },
+    {"title": "Email", "field_type": "email", "required": "yes"},
+    {"title": "Phone", "field_type": "phone_number", "default_country_code": "RU", "required": "yes"},
+    {"title": "Telegram nickname", "field_type": "short_text"},
+    {"title": "LinkedIn profile", "field_type": "website"},
+]
+SAMPLE_LOGIC = {"logic": [
+    {"type": "field", "ref": "musthave_office", "actions": [{
+        "action": "jump", "details": {"to": {"type": "thankyou", "value": "fail"}},
+        "condition": {"op": "is", "vars": [{"type": "field", "value": "musthave_office"}, {"type": "choice", "value": "Нет"}]},
+    }]},
+    {"type": "field", "ref": "budget_accept", "actions": [{
+        "action": "jump", "details": {"to": {"type": "thankyou", "value": "fail"}},
+        "condition": {"op": "is", "vars": [{"type": "field", "value": "budget_accept"}, {"type": "choice", "value": "No"}]},
+    }]},
+]}
+SAMPLE_MUST_HAVES = "- Офис в Москве по вторникам и четвергам\n- Max budget is 2000 EUR"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def form_fixture():
+    """
+    Ответ стенда OpenAI на этап формы: форма из примера, собранная form_compiler
+    (валидный payload того же размера, что вернул бы GPT).
+    """
+    from form_compiler import compile_form
+    content = json.dumps(
+        compile_form(SAMPLE_QUESTIONS, SAMPLE_LOGIC, "Системный администратор", SAMPLE_MUST_HAVES), ensure_ascii=False
+    )
+    return {"content": content, "prompt_tokens": 1500, "completion_tokens": len(content) // 4}
+
+
+def run_rows(rows, concurrency):
+    """
+    Процесс одного режима: строки 2..rows+1 листа стенда через main.run_pipeline.
+    Печатает JSON: по строке — ok, ошибка, длительности этапов и общая.
+    """
+    sys.path.insert(0, os.path.join(ROOT, "generate_form"))
+    import config_loader
+    import main
+    table, prompts = config_loader.load(list(range(2, 2 + rows)))
+
+    def run(row_id):
+        job_desc, must_haves, _, _ = table[row_id]
+        started = time.perf_counter()
+        result = {"ok": True, "error": None}
+        try:
+            _, timings = main.run_pipeline(job_desc, must_haves, prompts)
+        except Exception as e:
+            timings = getattr(e, "report", None)
+            result.update(ok=False, error=str(e))
+        result["stages"] = {name: stage["duration_ms"] for name, stage in ((timings or {}).get("stages") or {}).items()}
+        result["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        print(json.dumps(list(pool.map(run, sorted(table))), ensure_ascii=False))
+
+
+def report(mode, results, wall):
+    ok = [item for item in results if item["ok"]]
+    totals = [item["total_ms"] for item in ok]
+    print(f"FORM_COMPILER={mode:<6} строк {len(results)}, ошибок {len(results) - len(ok)}, wall {wall:.1f} s  "
+          f"строка p50={percentile(totals, 0.5):8.1f} ms  p95={percentile(totals, 0.95):8.1f} ms")
+    for name in sorted({name for item in ok for name in item["stages"]}):
+        values = [item["stages"][name] for item in ok if name in item["stages"]]
+        print(f"    {name:<12} p50={percentile(values, 0.5):8.1f} ms  p95={percentile(values, 0.95):8.1f} ms")
+    for item in results:
+        if not item["ok"]:
+            print(f"    первая ошибка: {item['error']}")
+            break
+    return statistics.median(totals) if totals else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--run-rows", action="store_true", help=argparse.SUPPRESS)
+    fakes.add_arguments(parser)
+    # --rows стенда: все строки таблицы прогоняются в каждом режиме
+    parser.set_defaults(rows=30)
+    args = parser.parse_args()
+    if args.run_rows:
+        return run_rows(args.rows, args.concurrency)
+
+    bench_fakes = fakes.fakes_from_args(args)
+    env = dict(os.environ, **bench_fakes.start())
+    env.update({
+        "GPT_CACHE_BACKEND": "off",
+        "TRACE_LOG": "0",
+        "LOG_LEVEL": "ERROR",
+        **{key: "1000000" for key in ("OPENAI_RPM", "OPENAI_TPM", "SHEETS_RPM", "TYPEFORM_RPM")},
+    })
+    sys.path.insert(0, os.path.join(ROOT, "generate_form"))
+    bench_fakes.servers["openai"].fixtures["form"] = form_fixture()
+    medians = {}
+    try:
+        for mode in MODES:
+            started = time.perf_counter()
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-rows", "--rows", str(args.rows),
+                 "--concurrency", str(args.concurrency)],
+                env=dict(env, FORM_COMPILER=mode), stdout=subprocess.PIPE, text=True,
+            )
+            if child.returncode != 0:
+                sys.exit(f"FORM_COMPILER={mode}: процесс завершился с кодом {child.returncode}")
+            results = json.loads(child.stdout.strip().splitlines()[-1])
+            medians[mode] = report(mode, results, time.perf_counter() - started)
+    finally:
+        bench_fakes.stop()
+    if all(medians.values()):
+        print(f"local быстрее gpt по медиане строки: x{medians['gpt'] / medians['local']:.2f}")
+    print(f"запросы к стендам: {json.dumps(bench_fakes.stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Бенчмарк локального валидатора формы: форма из 100 полей с логикой и thankyou-экранами.
+
+    python benchmarks/bench_form_validator.py [--fields 100] [--iterations 5000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "generate_form"))
+
+from form_validator import validate_form  # noqa: E402
+
+FIELD_TYPES = ("short_text", "number", "multiple_choice", "email", "phone_number", "long_text", "dropdown")
+
+
+def build_form(n_fields):
+    fields, logic = [], []
+    for i in range(n_fields):
+        field_type = FIELD_TYPES[i % len(FIELD_TYPES)]
+        field = {"ref": f"q{i}", "title": f"Вопрос {i}", "type": field_type, "validations": {"required": True}}
+        if field_type in ("multiple_choice", "dropdown"):
+            field["properties"] = {"choices": [
+                {"ref": f"q{i}_yes", "label": "Да"}, {"ref": f"q{i}_no", "label": "Нет"},
+            ]}
+            logic.append({"type": "field", "ref": f"q{i}", "actions": [{
+                "action": "jump", "details": {"to": {"type": "thankyou", "value": "thankyou_fail"}},
+                "condition": {"op": "is", "vars": [{"type": "field", "value": f"q{i}"}, {"type": "choice", "value": f"q{i}_no"}]},
+            }]})
+        elif field_type == "phone_number":
+            field["properties"] = {"default_country_code": "RU"}
+        fields.append(field)
+    return {
+        "title": "Бенчмарк",
+        "fields": fields,
+        "logic": logic,
+        "thankyou_screens": [
+            {"ref": "thankyou_quiz", "title": "Спасибо", "properties": {"redirect_url": "https://example.com/ok?email={field:email}"}},
+            {"ref": "thankyou_fail", "title": "Спасибо", "properties": {"redirect_url": "https://example.com/fail"}},
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fields", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    form = build_form(args.fields)
+    assert validate_form(form) == [], validate_form(form)[:3]
+    durations = []
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        validate_form(form)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+    print(f"fields={args.fields} logic={len(form['logic'])} n={args.iterations}  "
+          f"p50={statistics.median(durations) * 1e6:.1f} us  p99={p99 * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
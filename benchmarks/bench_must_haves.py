@@ -0,0 +1,86 @@
+"""
+Бенчмарк проверки must-haves в process_submission: прежний построчный разбор с перебором
+полей против скомпилированных правил (rules.evaluate) на форме с 50+ требованиями.
+
+    python benchmarks/bench_must_haves.py [--must-haves 60] [--extra-fields 20] [--iterations 2000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "process_submission"))
+
+import rules  # noqa: E402
+
+YES = ['yes', 'да', 'true', '1']
+
+
+def legacy_validate(must_haves_text, form_data):
+    """
+    Прежняя реализация validate_must_haves (без логирования): разбор текста на каждый запрос,
+    для каждого требования — перебор всех полей с подстрочным поиском.
+    """
+    must_have_list = [line.strip('-•: .').strip() for line in must_haves_text.split('\n') if line.strip()]
+    for requirement in must_have_list:
+        if 'бюджет' in requirement.lower() or 'budget' in requirement.lower():
+            answer = form_data.get('budget_accept')
+            if answer is None or answer.lower() not in YES:
+                return False
+            continue
+        for field_ref, answer in form_data.items():
+            if 'musthave' in field_ref.lower() and requirement.lower() in field_ref.lower():
+                if answer.lower() in YES:
+                    break
+                return False
+    return True
+
+
+def build_submission(n_must_haves, n_extra):
+    requirements = [f"skill{i}" for i in range(n_must_haves)] + ["Бюджет до 300000"]
+    must_haves = "\n".join(f"- {requirement}" for requirement in requirements)
+    form_data = {"email": "candidate@example.com", "phone": "+79990000000", "budget_accept": "Да"}
+    for i in range(n_extra):
+        form_data[f"q{i}"] = "ответ"
+    for i in range(n_must_haves):
+        form_data[f"musthave_skill{i}"] = "Yes"
+    return must_haves, form_data
+
+
+def timeit(fn, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return statistics.median(durations), durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--must-haves", type=int, default=60)
+    parser.add_argument("--extra-fields", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    must_haves, form_data = build_submission(args.must_haves, args.extra_fields)
+    assert legacy_validate(must_haves, form_data) and rules.evaluate(must_haves, form_data)[0]
+
+    def cold():
+        rules.compile_rules.cache_clear()
+        rules.evaluate(must_haves, form_data)
+
+    print(f"must_haves={args.must_haves + 1} fields={len(form_data)} n={args.iterations}")
+    for name, fn in (
+        ("legacy", lambda: legacy_validate(must_haves, form_data)),
+        ("rules (cold)", cold),
+        ("rules (warm)", lambda: rules.evaluate(must_haves, form_data)),
+    ):
+        p50, p99 = timeit(fn, args.iterations)
+        print(f"  {name:<14} p50={p50 * 1e6:8.1f} us  p99={p99 * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
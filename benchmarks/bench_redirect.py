@@ -0,0 +1,119 @@
+"""
+Бенчмарк redirect_url thankyou-экрана на корпусе must-haves (fixtures/must_haves.txt): длина
+прежнего (все ref и текст must_haves в параметрах) и компактного (v=<версия>&a=<ответы>) адреса
+после подстановки ответов Typeform и стоимость разбора в process_submission.extract_form_data
+(прежний — parse_qs и цикл по параметрам, компактный — один проход по строке запроса).
+
+    python benchmarks/bench_redirect.py [--iterations 2000]
+
+Адреса строятся кодом generate_form, разбор замеряется в отдельном процессе process_submission:
+у обеих функций модули settings и main.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import quote, parse_qs
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+CORPUS_PATH = os.path.join(BENCH_DIR, "fixtures", "must_haves.txt")
+# Typeform подставляет ответы закодированными
+ANSWERS = {"email": "candidate@example.com", "phone": "+79991234567"}
+_FIELD_RE = re.compile(r"\{field:([^}]+)\}")
+
+
+def substitute(url):
+    return _FIELD_RE.sub(lambda match: quote(ANSWERS.get(match.group(1), "Да"), safe=""), url)
+
+
+def build_urls():
+    """
+    Для каждого блока корпуса: (прежний адрес, компактный адрес, строка листа rulesets).
+    """
+    sys.path.insert(0, os.path.join(ROOT, "generate_form"))
+    from form_compiler import compile_field
+    from json_builder import build_final_redirect_url, build_compact_redirect_url, redirect_refs, ruleset_version
+    from question_builder import ensure_must_have_questions
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = [block.strip() for block in f.read().split("\n---\n") if block.strip()]
+    urls = []
+    for must_haves in corpus:
+        used_refs = set()
+        questions = ensure_must_have_questions([], must_haves)
+        fields = [compile_field(question, idx, used_refs) for idx, question in enumerate(questions)]
+        legacy = build_final_redirect_url(fields, extra_params={"pass": "true", "must_haves": must_haves})
+        refs = redirect_refs(fields)
+        version = ruleset_version(must_haves, refs)
+        compact = build_compact_redirect_url(version, refs)
+        urls.append((substitute(legacy), substitute(compact), [version, must_haves, json.dumps(refs)]))
+    return urls
+
+
+def timeit(fn, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def run_decode(iterations):
+    """
+    Процесс process_submission: urls из stdin, печатает p50 разбора корпуса в JSON.
+    """
+    sys.path.insert(0, os.path.join(ROOT, "process_submission"))
+    import logging
+    import main
+    import ruleset_store
+    logging.getLogger().setLevel(logging.ERROR)
+    urls = json.load(sys.stdin)
+    ruleset_store.load([row for _, _, row in urls])
+    legacy = [url.split("?", 1)[1] for url, _, _ in urls]
+    compact = [url.split("?", 1)[1] for _, url, _ in urls]
+    for (_, _, row), query in zip(urls, compact):
+        assert main.extract_form_data({}, query)["must_haves"] == row[1]
+
+    def decode_legacy():
+        for query in legacy:
+            main.extract_form_data(parse_qs(query))
+
+    def decode_compact():
+        for query in compact:
+            main.extract_form_data({}, query)
+
+    print(json.dumps({"legacy": timeit(decode_legacy, iterations), "compact": timeit(decode_compact, iterations)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--decode", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.decode:
+        return run_decode(args.iterations)
+
+    urls = build_urls()
+    child = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--decode", "--iterations", str(args.iterations)],
+        input=json.dumps(urls), stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, CANDIDATE_SHEET_EXPORT="0"),
+    )
+    if child.returncode != 0:
+        sys.exit(f"Разбор завершился с кодом {child.returncode}")
+    timings = json.loads(child.stdout.strip().splitlines()[-1])
+    for index, name in enumerate(("legacy", "compact")):
+        lengths = sorted(len(item[index]) for item in urls)
+        print(f"{name:<8} длина адреса p50={statistics.median(lengths):6.0f} max={lengths[-1]:6d}  "
+              f"разбор на адрес p50={timings[name] / len(urls) * 1e6:6.2f} us")
+    print(f"блоков={len(urls)} n={args.iterations}")
+
+
+if __name__ == "__main__":
+    main()
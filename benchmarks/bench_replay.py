@@ -0,0 +1,138 @@
+"""
+Офлайн-прогон generate_form по архиву вызовов OpenAI (generate_form/gpt_archive.py): строки
+из архива проходят весь граф этапов, ответы OpenAI воспроизводятся из архива с исходной
+длительностью (--speed), Typeform и Sheets — локальные стенды (fakes.py). Отчёт — латентность
+по этапам, промахи архива (промпт или код этапа изменились); --out сохраняет результат каждой
+строки, --compare сравнивает вопросы, логику, JSON формы и латентность с прошлым прогоном.
+
+    GPT_RECORD_MODE=record GPT_ARCHIVE_PATH=archive.jsonl ...   # запись: обычный запуск generate_form
+    python benchmarks/bench_replay.py --archive archive.jsonl --out run_a.jsonl
+    python benchmarks/bench_replay.py --archive archive.jsonl --out run_b.jsonl --compare run_a.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+
+import fakes  # noqa: E402
+
+OUTPUT_STAGES = ("questions", "logic", "form_json")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def replay_rows(inputs, concurrency):
+    """
+    Прогоняет входы строк через граф этапов. Возвращает результат по строке: ключ входа,
+    ok, этап и ошибка, выходы этапов OUTPUT_STAGES, длительности этапов и общая.
+    """
+    import gpt_archive
+    import main
+    import pipeline
+
+    def run(record):
+        started = time.perf_counter()
+        result = {"key": record["key"], "ok": True, "stage": None, "error": None, "miss": False}
+        try:
+            results, timings = pipeline.run(main.build_stages(record["job_desc"], record["must_haves"], record["prompts"]))
+            result["outputs"] = {stage: results.get(stage) for stage in OUTPUT_STAGES}
+        except pipeline.PipelineError as e:
+            timings = e.report
+            result.update(ok=False, stage=e.stage, error=str(e.error),
+                          miss=isinstance(e.error, gpt_archive.ReplayMissError))
+        result["stages"] = {name: stage["duration_ms"] for name, stage in ((timings or {}).get("stages") or {}).items()}
+        result["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(run, inputs))
+
+
+def compare(results, previous_path):
+    """
+    Сравнение с прошлым прогоном по ключу входа: совпадение выходов по этапам и разница p50 длительности.
+    """
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {item["key"]: item for item in map(json.loads, f) if item.get("ok")}
+    pairs = [(item, previous[item["key"]]) for item in results if item["ok"] and item["key"] in previous]
+    print(f"\nсравнение с {previous_path}: общих строк {len(pairs)}")
+    for stage in OUTPUT_STAGES:
+        same = sum(1 for item, old in pairs if item["outputs"].get(stage) == old["outputs"].get(stage))
+        print(f"  {stage:<10} совпадает {same}/{len(pairs)}")
+    stages = sorted({name for item, _ in pairs for name in item["stages"]})
+    for name in stages + ["total"]:
+        new = [item["total_ms"] if name == "total" else item["stages"].get(name, 0) for item, _ in pairs]
+        old = [prev["total_ms"] if name == "total" else prev["stages"].get(name, 0) for _, prev in pairs]
+        print(f"  {name:<14} p50 {percentile(old, 0.5):8.1f} -> {percentile(new, 0.5):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", required=True, help="JSONL-архив, записанный при GPT_RECORD_MODE=record")
+    parser.add_argument("--rows", type=int, default=0, help="сколько строк архива прогнать, 0 — все")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--speed", type=float, default=1.0, help="множитель исходной длительности ответов, 0 — сразу")
+    parser.add_argument("--out", help="JSONL с результатом каждой строки")
+    parser.add_argument("--compare", help="JSONL прошлого прогона (--out) для сравнения")
+    parser.add_argument("--typeform-latency", type=float, default=300, help="мс")
+    parser.add_argument("--sheets-latency", type=float, default=150, help="мс")
+    args = parser.parse_args()
+
+    bench_fakes = fakes.Fakes(typeform=fakes.ServiceConfig(args.typeform_latency),
+                              sheets=fakes.ServiceConfig(args.sheets_latency), rows=0)
+    os.environ.update(bench_fakes.start())
+    os.environ.update({
+        "GPT_RECORD_MODE": "replay",
+        "GPT_ARCHIVE_PATH": os.path.abspath(args.archive),
+        "GPT_REPLAY_SPEED": str(args.speed),
+        "GPT_CACHE_BACKEND": "off",
+        "TRACE_LOG": "0",
+        "LOG_LEVEL": "ERROR",
+        **{key: "1000000" for key in ("OPENAI_RPM", "OPENAI_TPM", "SHEETS_RPM", "TYPEFORM_RPM")},
+    })
+    sys.path.insert(0, os.path.join(ROOT, "generate_form"))
+    import gpt_archive
+
+    calls, inputs = gpt_archive.load(args.archive)
+    if args.rows:
+        inputs = inputs[:args.rows]
+    started = time.perf_counter()
+    results = replay_rows(inputs, args.concurrency)
+    wall = time.perf_counter() - started
+
+    ok = [item for item in results if item["ok"]]
+    misses = sum(1 for item in results if item["miss"])
+    print(f"архив: вызовов {len(calls)}, строк {len(inputs)}; speed={args.speed} concurrency={args.concurrency}")
+    print(f"строк {len(results)}: ok {len(ok)}, промахи архива {misses}, ошибки {len(results) - len(ok) - misses}; "
+          f"wall {wall:.1f} s")
+    totals = [item["total_ms"] for item in ok]
+    print(f"  строка p50={percentile(totals, 0.5):.1f} ms  p95={percentile(totals, 0.95):.1f} ms")
+    stages = sorted({name for item in ok for name in item["stages"]})
+    for name in stages:
+        values = [item["stages"][name] for item in ok if name in item["stages"]]
+        print(f"    {name:<14} p50={percentile(values, 0.5):8.1f} ms  p95={percentile(values, 0.95):8.1f} ms")
+    for item in results:
+        if not item["ok"]:
+            print(f"  {item['key'][:12]}: этап {item['stage']}: {item['error']}")
+            break
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for item in results:
+                f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+    if args.compare:
+        compare(results, args.compare)
+    bench_fakes.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Бенчмарк холодного старта: время импорта main каждой функции по `python -X importtime`
+в чистом процессе (без ключей API в окружении). Печатает медиану по запускам и самые
+тяжёлые модули; код возврата 1, если превышен бюджет --max-ms или при старте
+импортирован клиент, который должен грузиться лениво (LAZY_MODULES).
+
+    python benchmarks/bench_startup.py [--runs 5] [--top 10] [--max-ms 400]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FUNCTIONS = ("generate_form", "process_submission")
+# Клиенты внешних API: импортируются только на путях, где нужны
+LAZY_MODULES = ("openai", "googleapiclient", "google.oauth2", "google_auth_httplib2", "requests", "httpx")
+# Ключи, без которых функция обязана импортироваться
+UNSET_ENV = ("OPENAI_API_KEY", "TYPEFORM_API_KEY", "GOOGLE_SHEET_ID")
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(function):
+    """
+    Один холодный импорт main: (total_us, {модуль: cumulative_us}) по выводу -X importtime.
+    """
+    env = {key: value for key, value in os.environ.items() if key not in UNSET_ENV}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=os.path.join(ROOT, function), env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True,
+    )
+    if child.returncode != 0:
+        sys.exit(f"{function}: import main завершился с ошибкой\n{child.stderr[-2000:]}")
+    modules = {}
+    for line in child.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2))
+    return modules.get("main", 0), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="сколько самых тяжёлых модулей показать")
+    parser.add_argument("--max-ms", type=float, default=None, help="бюджет импорта main на функцию, мс")
+    args = parser.parse_args()
+    failed = False
+    for function in FUNCTIONS:
+        runs = [measure(function) for _ in range(args.runs)]
+        total_ms = statistics.median(total for total, _ in runs) / 1000
+        _, modules = runs[-1]
+        eager = sorted(module for module in modules if module in LAZY_MODULES)
+        print(f"\n{function}: import main p50={total_ms:.1f} ms (runs={args.runs}, modules={len(modules)})")
+        top_level = {module: us for module, us in modules.items() if "." not in module and module != "main"}
+        for module, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {module:<24} {us / 1000:8.1f} ms")
+        if eager:
+            print(f"  ОШИБКА: при старте импортированы {', '.join(eager)}")
+            failed = True
+        if args.max_ms is not None and total_ms > args.max_ms:
+            print(f"  ОШИБКА: {total_ms:.1f} ms больше бюджета {args.max_ms} ms")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
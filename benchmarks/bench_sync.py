@@ -0,0 +1,72 @@
+"""
+Бенчмарк синхронизации с таблицей (generate_form/sync_worker.py) на локальных стендах (fakes.py):
+первый опрос без снимка, опрос без изменений, правка --edits строк и перезапуск воркера
+с потерянным снимком. По каждому опросу — длительность, счётчики воркера и число запросов к стендам.
+
+    python benchmarks/bench_sync.py [--rows 200] [--edits 5] [--openai-latency 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, BENCH_DIR)
+
+import fakes  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edits", type=int, default=5, help="сколько строк изменить между опросами")
+    parser.add_argument("--seed", type=int, default=1)
+    fakes.add_arguments(parser)
+    parser.set_defaults(rows=200, openai_latency=200, typeform_latency=50, sheets_latency=50)
+    args = parser.parse_args()
+
+    bench_fakes = fakes.fakes_from_args(args)
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update(bench_fakes.start())
+    os.environ.update({
+        "GPT_CACHE_BACKEND": "memory",
+        "SYNC_STATE_PATH": os.path.join(tmp.name, "sync_state.json"),
+        "TRACE_LOG": "0",
+        **{key: "1000000" for key in ("OPENAI_RPM", "OPENAI_TPM", "SHEETS_RPM", "TYPEFORM_RPM")},
+    })
+    sys.path.insert(0, os.path.join(ROOT, "generate_form"))
+    import logging
+    import sync_worker
+    logging.getLogger().setLevel(logging.ERROR)
+
+    sheet = bench_fakes.servers["sheets"]
+    must_haves_col = fakes._col_index("D")
+
+    def poll(name, snapshot):
+        before = bench_fakes.stats()
+        started = time.perf_counter()
+        summary = sync_worker.sync_once(snapshot)
+        wall_ms = (time.perf_counter() - started) * 1000
+        after = bench_fakes.stats()
+        calls = {service: after[service]["requests"] - before[service]["requests"] for service in after}
+        print(f"{name:<26} {wall_ms:9.1f} ms  {summary}  запросы: {calls}")
+
+    print(f"строк={args.rows} правок={args.edits} openai={args.openai_latency} ms")
+    snapshot = sync_worker.Snapshot()
+    poll("первый опрос", snapshot)
+    poll("без изменений", snapshot)
+    edited = random.Random(args.seed).sample(range(2, args.rows + 2), min(args.edits, args.rows))
+    with sheet.lock:
+        for row in edited:
+            sheet.cells[fakes.JOURNEYS_SHEET][(must_haves_col, row)] += "\n- Опыт с PowerShell"
+    poll(f"изменено {len(edited)} строк", snapshot)
+    poll("снимок потерян", sync_worker.Snapshot(path=None))
+    bench_fakes.stop()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
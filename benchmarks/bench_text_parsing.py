@@ -0,0 +1,90 @@
+"""
+Бенчмарк разбора must-haves на корпусе реальных блоков (fixtures/must_haves.txt):
+прежний разбор — каждый этап заново делит текст на строки и ищет бюджет (main, question_builder,
+logic_generator, rules) — против text_parsing.parse_must_haves (холодный и из кэша).
+Проверяет, что копии text_parsing в generate_form и process_submission совпадают.
+
+    python benchmarks/bench_text_parsing.py [--iterations 2000]
+"""
+
+import argparse
+import filecmp
+import os
+import re
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+CORPUS_PATH = os.path.join(BENCH_DIR, "fixtures", "must_haves.txt")
+sys.path.insert(0, os.path.join(ROOT, "generate_form"))
+
+import text_parsing  # noqa: E402
+
+
+def legacy_parse(must_haves):
+    """
+    Прежний разбор одной формы: бюджет в main (re на каждой строке), список требований
+    в question_builder, logic_generator и rules, проверка слов бюджета в каждом.
+    """
+    budget = None
+    for line in must_haves.split('\n'):
+        if 'budget' in line.lower() or 'бюджет' in line.lower():
+            match = re.search(r'(\d+[\.,]?\d*)', line)
+            if match:
+                budget = match.group(1)
+    for _ in range(3):
+        requirements = [line.strip('-•: .').strip() for line in must_haves.split('\n') if line.strip()]
+        musthaves = [r for r in requirements if not any(k in r.lower() for k in ("бюджет", "budget"))]
+    return budget, musthaves
+
+
+def parse_all(corpus, parse):
+    for block in corpus:
+        parse(block)
+
+
+def timeit(fn, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return statistics.median(durations), durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    copies = [os.path.join(ROOT, function, "text_parsing.py") for function in ("generate_form", "process_submission")]
+    if not filecmp.cmp(*copies, shallow=False):
+        sys.exit("Копии text_parsing.py в generate_form и process_submission различаются")
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = [block.strip() for block in f.read().split("\n---\n") if block.strip()]
+
+    parsed = [text_parsing.parse_must_haves(block) for block in corpus]
+    with_budget = sum(1 for p in parsed if p.has_budget)
+    with_amount = sum(1 for p in parsed if p.budget is not None)
+    with_currency = sum(1 for p in parsed if p.currency)
+    print(f"блоков={len(corpus)} бюджет: указан={with_budget} сумма={with_amount} валюта={with_currency} "
+          f"контакты={sum(len(p.contacts) for p in parsed)} n={args.iterations}")
+
+    def cold():
+        text_parsing.parse_must_haves.cache_clear()
+        parse_all(corpus, text_parsing.parse_must_haves)
+
+    for name, fn in (
+        ("legacy", lambda: parse_all(corpus, legacy_parse)),
+        ("parse (cold)", cold),
+        ("parse (warm)", lambda: parse_all(corpus, text_parsing.parse_must_haves)),
+    ):
+        p50, p99 = timeit(fn, args.iterations)
+        print(f"  {name:<14} корпус p50={p50 * 1e6:8.1f} us  p99={p99 * 1e6:8.1f} us  "
+              f"на блок p50={p50 / len(corpus) * 1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Локальные стенды OpenAI, Typeform и Google Sheets для бенчмарков: настраиваемые задержка,
+доля ошибок 5xx и лимит запросов в минуту (429 с Retry-After). Ответы OpenAI — записанные
+реальные ответы из fixtures/openai_responses.json, по этапу (вопросы/логика); ответ этапа
+формы (GPT-путь FORM_COMPILER) бенчмарк кладёт в fixtures["form"] сам.
+
+    python benchmarks/fakes.py [--openai-latency 800] ...   # поднять стенды и ждать
+
+Запуск из кода: Fakes(...).start() -> dict адресов для переменных окружения функций.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "openai_responses.json")
+SHEET_ID = "bench-sheet"
+JOURNEYS_SHEET = "journeys"
+CONFIG_SHEET = "gpt instruction"
+
+
+class ServiceConfig:
+    """
+    latency_ms (+- jitter_ms) — задержка ответа; error_rate — доля ответов 500;
+    rpm — лимит запросов в минуту (0 — без лимита); token_delay_ms — пауза между
+    фрагментами потокового ответа OpenAI.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rpm=0, token_delay_ms=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.token_delay_ms = token_delay_ms
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def rate_limited(self):
+        """
+        Фиксированное окно в минуту; возвращает секунды до следующего окна или None.
+        """
+        if not self.rpm:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 60:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            if self._window_count > self.rpm:
+                return max(1, int(60 - (now - self._window_start)))
+        return None
+
+    def failed(self):
+        return self.error_rate and random.random() < self.error_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _guard(self):
+        """
+        Общие для всех стендов задержка, лимит и случайные ошибки. True — запрос уже отвечен.
+        """
+        self.server.stats["requests"] += 1
+        retry_after = self.config.rate_limited()
+        if retry_after is not None:
+            self.server.stats["429"] += 1
+            self.send_json(429, {"error": {"message": "Rate limit exceeded"}}, {"Retry-After": str(retry_after)})
+            return True
+        self.config.delay()
+        if self.config.failed():
+            self.server.stats["500"] += 1
+            self.send_json(500, {"error": {"message": "Injected failure"}})
+            return True
+        return False
+
+    def _dispatch(self, method):
+        body = self._body()
+        if self._guard():
+            return
+        try:
+            self.handle_api(method, urlsplit(self.path), body)
+        except Exception as e:  # стенд не должен падать от неожиданного запроса
+            self.send_json(500, {"error": {"message": f"fake: {e}"}})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+
+class OpenAIHandler(_Handler):
+    def handle_api(self, method, url, body):
+        if method != "POST" or not url.path.endswith("/chat/completions"):
+            return self.send_json(404, {"error": {"message": "not found"}})
+        request = json.loads(body)
+        system = next((m["content"] for m in request["messages"] if m["role"] == "system"), "")
+        stage = ("questions" if "вопрос" in system else "logic" if "логик" in system
+                 else "form" if "JSON" in system else None)
+        recorded = self.server.fixtures.get(stage, {"content": "{}", "prompt_tokens": 100, "completion_tokens": 1})
+        usage = {
+            "prompt_tokens": recorded["prompt_tokens"], "completion_tokens": recorded["completion_tokens"],
+            "total_tokens": recorded["prompt_tokens"] + recorded["completion_tokens"],
+        }
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": request["model"]}
+        if not request.get("stream"):
+            return self.send_json(200, {
+                **base, "object": "chat.completion", "usage": usage,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": recorded["content"]}}],
+            })
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        content = recorded["content"]
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]  # ~ токен на фрагмент
+        try:
+            for idx, piece in enumerate(pieces):
+                delta = {"content": piece} if idx else {"role": "assistant", "content": piece}
+                self._event({**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                if self.config.token_delay_ms:
+                    time.sleep(self.config.token_delay_ms / 1000)
+            self._event({**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._event({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент оборвал поток (ранняя остановка по закрытию JSON) — это норма
+            self.close_connection = True
+
+    def _event(self, data):
+        self._chunk(b"data: " + json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class TypeformHandler(_Handler):
+    def handle_api(self, method, url, body):
+        parts = [p for p in url.path.split("/") if p]
+        forms = self.server.forms
+        if parts == ["forms"] and method == "POST":
+            form = json.loads(body)
+            form_id = uuid.uuid4().hex[:8]
+            forms[form_id] = {"title": form.get("title", ""), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+            self.server.bodies[form_id] = form
+            return self.send_json(201, self._form(form_id))
+        if parts == ["forms"] and method == "GET":
+            search = parse_qs(url.query).get("search", [""])[0]
+            items = [self._form(form_id) for form_id, form in forms.items() if search in form["title"]]
+            return self.send_json(200, {"total_items": len(items), "page_count": 1, "items": items})
+        if len(parts) == 2 and parts[0] == "forms" and method == "GET":
+            if parts[1] not in forms:
+                return self.send_json(404, {"code": "FORM_NOT_FOUND"})
+            return self.send_json(200, {**self.server.bodies.get(parts[1], {}), **self._form(parts[1])})
+        if len(parts) == 2 and parts[0] == "forms" and method == "PUT":
+            if parts[1] not in forms:
+                return self.send_json(404, {"code": "FORM_NOT_FOUND"})
+            self.server.bodies[parts[1]] = json.loads(body)
+            forms[parts[1]]["title"] = self.server.bodies[parts[1]].get("title", "")
+            return self.send_json(200, self._form(parts[1]))
+        if len(parts) == 4 and parts[0] == "forms" and parts[2] == "webhooks" and method == "PUT":
+            return self.send_json(200, {"form_id": parts[1], "tag": parts[3], **json.loads(body)})
+        return self.send_json(404, {"code": "NOT_FOUND"})
+
+    def _form(self, form_id):
+        host = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+        return {"id": form_id, **self.server.forms[form_id], "_links": {"display": f"{host}/to/{form_id}"}}
+
+
+_CELL_RE = re.compile(r"^([A-Z]+)(\d*)$")
+
+
+def _col_index(col):
+    n = 0
+    for ch in col:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _col_name(n):
+    name = ""
+    while n:
+        n, rem = divmod(n - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+class SheetsHandler(_Handler):
+    """
+    Подмножество Sheets API v4 values: batchGet, get, update, batchUpdate, append.
+    """
+
+    def handle_api(self, method, url, body):
+        match = re.match(r"^/v4/spreadsheets/([^/]+)/values(?::(batchGet|batchUpdate)|/([^:]+)(?::(append))?)$", url.path)
+        if not match:
+            return self.send_json(404, {"error": {"message": "not found"}})
+        _, batch_op, range_, append = match.groups()
+        query = parse_qs(url.query)
+        if batch_op == "batchGet":
+            ranges = query.get("ranges", [])
+            return self.send_json(200, {"spreadsheetId": SHEET_ID, "valueRanges": [self._read(r) for r in ranges]})
+        if batch_op == "batchUpdate":
+            data = json.loads(body)
+            for item in data.get("data", []):
+                self._write(item["range"], item["values"])
+            return self.send_json(200, {"spreadsheetId": SHEET_ID, "totalUpdatedCells": len(data.get("data", []))})
+        range_ = unquote(range_)
+        if append:
+            values = json.loads(body)["values"]
+            sheet_name = range_.split("!")[0]
+            with self.server.lock:
+                rows = self.server.appended.setdefault(sheet_name, [])
+                rows.extend(values)
+                # Дописанные строки видны и при чтении листа — после последней заполненной
+                cells = self.server.cells.setdefault(sheet_name, {})
+                last = max((row for _, row in cells), default=0)
+                for dr, line in enumerate(values):
+                    for dc, value in enumerate(line):
+                        cells[(1 + dc, last + 1 + dr)] = value
+            return self.send_json(200, {"spreadsheetId": SHEET_ID, "updates": {"updatedRows": len(values)}})
+        if method == "GET":
+            return self.send_json(200, self._read(range_))
+        self._write(range_, json.loads(body)["values"])
+        return self.send_json(200, {"spreadsheetId": SHEET_ID, "updatedRange": range_})
+
+    def _parse(self, range_):
+        sheet, _, cells = range_.rpartition("!")
+        sheet = sheet.strip("'") or JOURNEYS_SHEET
+        start, _, end = cells.partition(":")
+        (c1, r1), (c2, r2) = _CELL_RE.match(start).groups(), _CELL_RE.match(end or start).groups()
+        r1 = int(r1 or 1)
+        if not r2:
+            # Открытый диапазон "C2:I" или "A:C" — до последней заполненной строки листа
+            r2 = max((row for _, row in self.server.cells.get(sheet, {})), default=r1)
+        return sheet, _col_index(c1), r1, _col_index(c2), int(r2)
+
+    def _read(self, range_):
+        sheet, c1, r1, c2, r2 = self._parse(range_)
+        cells = self.server.cells.get(sheet, {})
+        values = []
+        for row in range(r1, r2 + 1):
+            line = [cells.get((col, row), "") for col in range(c1, c2 + 1)]
+            while line and line[-1] == "":
+                line.pop()
+            values.append(line)
+        while values and not values[-1]:
+            values.pop()
+        result = {"range": range_, "majorDimension": "ROWS"}
+        if values:
+            result["values"] = values
+        return result
+
+    def _write(self, range_, values):
+        sheet, c1, r1, _, _ = self._parse(range_)
+        with self.server.lock:
+            cells = self.server.cells.setdefault(sheet, {})
+            for dr, line in enumerate(values):
+                for dc, value in enumerate(line):
+                    cells[(c1 + dc, r1 + dr)] = value
+
+
+def default_cells(rows):
+    """
+    Таблица для стенда: строки вакансий 2..rows+1 (C — описание, D — must-haves) и промпты B6-B8.
+    """
+    journeys = {}
+    for row in range(2, rows + 2):
+        journeys[(_col_index("C"), row)] = (
+            f"Системный администратор Windows #{row}\nПоддержка Active Directory, Exchange, "
+            f"офис в Москве по вторникам и четвергам."
+        )
+        journeys[(_col_index("D"), row)] = "- Офис в Москве по вторникам и четвергам\n- Max budget is 2000 EUR"
+    config = {
+        (_col_index("B"), 6): "Собери JSON формы Typeform по вопросам и логике.",
+        (_col_index("B"), 7): "Сгенерируй вопросы для собеседования по описанию и must have.",
+        (_col_index("B"), 8): "Построй логику формы: если на любой must have ответ 'Нет' — завершить форму с отказом.",
+    }
+    return {JOURNEYS_SHEET: journeys, CONFIG_SHEET: config}
+
+
+class Fakes:
+    """
+    Поднимает три стенда на свободных портах localhost. start() возвращает переменные
+    окружения, направляющие generate_form и process_submission на стенды.
+    """
+
+    def __init__(self, openai=None, typeform=None, sheets=None, rows=1000):
+        self.configs = {
+            "openai": openai or ServiceConfig(),
+            "typeform": typeform or ServiceConfig(),
+            "sheets": sheets or ServiceConfig(),
+        }
+        self.rows = rows
+        self.servers = {}
+
+    def _serve(self, name, handler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        server.config = self.configs[name]
+        server.stats = {"requests": 0, "429": 0, "500": 0}
+        server.lock = threading.Lock()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.servers[name] = server
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def start(self):
+        with open(FIXTURES_PATH, encoding="utf-8") as f:
+            fixtures = json.load(f)
+        openai_url = self._serve("openai", OpenAIHandler)
+        self.servers["openai"].fixtures = fixtures
+        typeform_url = self._serve("typeform", TypeformHandler)
+        self.servers["typeform"].forms = {}
+        self.servers["typeform"].bodies = {}
+        sheets_url = self._serve("sheets", SheetsHandler)
+        self.servers["sheets"].cells = default_cells(self.rows)
+        self.servers["sheets"].appended = {}
+        return {
+            "OPENAI_BASE_URL": f"{openai_url}/v1",
+            "TYPEFORM_API_URL": typeform_url,
+            "SHEETS_API_ENDPOINT": sheets_url + "/",
+            "GOOGLE_ANONYMOUS_CREDENTIALS": "1",
+            "GOOGLE_SHEET_ID": SHEET_ID,
+            "OPENAI_API_KEY": "fake",
+            "TYPEFORM_API_KEY": "fake",
+        }
+
+    def stats(self):
+        return {name: dict(server.stats) for name, server in self.servers.items()}
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+def add_arguments(parser):
+    for name, latency in (("openai", 800), ("typeform", 300), ("sheets", 150)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency, help="мс")
+        parser.add_argument(f"--{name}-errors", type=float, default=0.0, help="доля ответов 500")
+        parser.add_argument(f"--{name}-rpm", type=int, default=0, help="лимит запросов в минуту, 0 — без лимита")
+    parser.add_argument("--openai-token-delay", type=float, default=2.0, help="мс между фрагментами потока")
+    parser.add_argument("--jitter", type=float, default=0.1, help="разброс задержки, доля от latency")
+    parser.add_argument("--rows", type=int, default=1000, help="строк вакансий в таблице стенда")
+
+
+def fakes_from_args(args):
+    def config(name, **extra):
+        latency = getattr(args, f"{name}_latency")
+        return ServiceConfig(
+            latency, latency * args.jitter, getattr(args, f"{name}_errors"), getattr(args, f"{name}_rpm"), **extra
+        )
+    return Fakes(config("openai", token_delay_ms=args.openai_token_delay), config("typeform"), config("sheets"),
+                 rows=args.rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+    fakes = fakes_from_args(args)
+    for key, value in fakes.start().items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fakes.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Модуль clients: общие клиенты Google Sheets, OpenAI и HTTP-сессия для Typeform.
+Клиенты создаются лениво один раз на тёплый инстанс и переиспользуются между запросами.
+Библиотеки клиентов (openai, googleapiclient, requests) тоже импортируются при первом
+использовании: холодный старт не платит за клиентов, которые запросу не нужны.
+"""
+
+import logging
+import threading
+from settings import (
+    GOOGLE_CREDS_PATH, HTTP_POOL_SIZE, HTTP_TIMEOUT, OPENAI_BASE_URL, SHEETS_API_ENDPOINT, GOOGLE_ANONYMOUS_CREDENTIALS
+)
+
+SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+logger = logging.getLogger("clients")
+
+_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_credentials = None
+_http_session = None
+_sheets = None
+_openai_clients = {}
+# httplib2 внутри googleapiclient не потокобезопасен — сервис общий, а HTTP-соединение
+# у каждого потока своё (см. _build_request); учётные данные и их обновление общие
+_local = threading.local()
+
+
+def get_http_session():
+    """
+    requests.Session с пулом keep-alive соединений (Typeform и обновление токенов Google).
+    """
+    global _http_session
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+
+def get_google_credentials():
+    """
+    Учётные данные сервисного аккаунта: читаются из файла один раз,
+    access token обновляется централизованно под блокировкой, когда истекает.
+    """
+    global _credentials
+    if _credentials is None:
+        with _lock:
+            if _credentials is None and GOOGLE_ANONYMOUS_CREDENTIALS:
+                import google.auth.credentials
+                _credentials = google.auth.credentials.AnonymousCredentials()
+            elif _credentials is None:
+                from google.oauth2 import service_account
+                _credentials = service_account.Credentials.from_service_account_file(
+                    GOOGLE_CREDS_PATH, scopes=SHEETS_SCOPES
+                )
+    if not _credentials.valid:
+        with _refresh_lock:
+            if not _credentials.valid:
+                import google.auth.transport.requests
+                _credentials.refresh(google.auth.transport.requests.Request(session=get_http_session()))
+                logger.info("Токен Google обновлён")
+    return _credentials
+
+
+def _thread_http():
+    http = getattr(_local, "http", None)
+    if http is None:
+        import httplib2
+        import google_auth_httplib2
+        http = _local.http = google_auth_httplib2.AuthorizedHttp(
+            get_google_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT)
+        )
+    return http
+
+
+def _build_request(http, *args, **kwargs):
+    """
+    requestBuilder для googleapiclient: запрос выполняется через соединение текущего потока.
+    """
+    from googleapiclient.http import HttpRequest
+    return HttpRequest(_thread_http(), *args, **kwargs)
+
+
+def get_sheets_service():
+    """
+    Возвращает spreadsheets()-ресурс Sheets API. Discovery-документ берётся из пакета
+    (static_discovery), без сетевого запроса; сервис строится один раз на инстанс.
+    """
+    global _sheets
+    get_google_credentials()
+    if _sheets is None:
+        with _lock:
+            if _sheets is None:
+                from googleapiclient.discovery import build
+                service = build(
+                    'sheets', 'v4', http=_thread_http(), requestBuilder=_build_request,
+                    cache_discovery=False, static_discovery=True,
+                    client_options={"api_endpoint": SHEETS_API_ENDPOINT} if SHEETS_API_ENDPOINT else None
+                )
+                _sheets = service.spreadsheets()
+    return _sheets
+
+
+def get_openai_client(api_key):
+    """
+    Клиент OpenAI на ключ: внутри держит пул HTTP-соединений, поэтому создаётся один раз.
+    Собственные повторы SDK отключены — повторяет scheduler с учётом общих квот.
+    """
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY не задан")
+    client = _openai_clients.get(api_key)
+    if client is None:
+        with _lock:
+            client = _openai_clients.get(api_key)
+            if client is None:
+                import openai
+                client = _openai_clients[api_key] = openai.OpenAI(
+                    api_key=api_key, base_url=OPENAI_BASE_URL, timeout=HTTP_TIMEOUT, max_retries=0
+                )
+    return client
@@ -0,0 +1,169 @@
+"""
+Модуль config_loader: чтение строк вакансий и промптов из Google Sheets одним batchGet.
+Промпты (B6/B7/B8) кэшируются в памяти на PROMPTS_CACHE_TTL секунд и версионируются контрольной суммой.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import scheduler
+import tracing
+from clients import get_sheets_service
+from settings import (
+    SHEET_NAME, CONFIG_SHEET, COLUMN_JOB_DESC, COLUMN_FORM_LINK, COLUMN_FINGERPRINT, GOOGLE_SHEET_ID,
+    QUESTIONS_PROMPT_CELL, LOGIC_PROMPT_CELL, FORM_PROMPT_CELL, DEFAULT_QUESTIONS_PROMPT, PROMPTS_CACHE_TTL,
+    GPT_MODEL, FORM_COMPILER, QUESTION_BUILDER
+)
+
+PROMPT_CELLS = {
+    "questions": QUESTIONS_PROMPT_CELL,  # B7
+    "logic": LOGIC_PROMPT_CELL,          # B8
+    "form": FORM_PROMPT_CELL,            # B6
+}
+
+logger = logging.getLogger("config_loader")
+
+_lock = threading.Lock()
+_prompts = None
+_prompts_loaded_at = 0.0
+
+
+def row_range(row_id):
+    last = max(COLUMN_FORM_LINK, COLUMN_FINGERPRINT)
+    return f"{SHEET_NAME}!{COLUMN_JOB_DESC}{row_id}:{last}{row_id}"  # C..I
+
+
+def parse_row_values(value_range):
+    """
+    Разбирает диапазон C:I одной строки в (job_desc, must_haves, form_link, fingerprint).
+    """
+    row = value_range.get('values', [[]])[0] if value_range.get('values') else []
+    link_idx = ord(COLUMN_FORM_LINK) - ord(COLUMN_JOB_DESC)
+    fingerprint_idx = ord(COLUMN_FINGERPRINT) - ord(COLUMN_JOB_DESC)
+    job_desc = row[0] if len(row) > 0 else ''
+    must_haves = row[1] if len(row) > 1 else ''
+    form_link = row[link_idx] if len(row) > link_idx else ''
+    fingerprint = row[fingerprint_idx] if len(row) > fingerprint_idx else ''
+    return job_desc, must_haves, form_link, fingerprint
+
+
+def row_fingerprint(job_desc, must_haves, prompts):
+    """
+    Отпечаток всего, от чего зависит форма строки: описание, must-haves, версия промптов,
+    модель и способ сборки вопросов и формы. Совпал с сохранённым в COLUMN_FINGERPRINT — форма актуальна.
+    """
+    digest = hashlib.sha256()
+    for part in (job_desc, must_haves, prompts["version"], GPT_MODEL, FORM_COMPILER, QUESTION_BUILDER):
+        digest.update(part.encode("utf-8") + b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _cell_value(value_range):
+    values = value_range.get('values', [[]])
+    return values[0][0] if values and values[0] else ''
+
+
+def prompts_checksum(raw_prompts):
+    """
+    Версия промптов: sha256 от текста ячеек (до подстановки дефолтов), первые 12 символов.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(raw_prompts):
+        digest.update(name.encode("utf-8") + b"\0" + raw_prompts[name].encode("utf-8") + b"\0")
+    return digest.hexdigest()[:12]
+
+
+def build_prompts(raw_prompts):
+    """
+    Подставляет дефолты для пустых ячеек и добавляет version.
+    """
+    return {
+        "questions": raw_prompts["questions"] or DEFAULT_QUESTIONS_PROMPT,
+        "logic": raw_prompts["logic"] or "",
+        "form": raw_prompts["form"] or DEFAULT_QUESTIONS_PROMPT,
+        "version": prompts_checksum(raw_prompts),
+    }
+
+
+def _cached_prompts():
+    if _prompts is not None and time.monotonic() - _prompts_loaded_at < PROMPTS_CACHE_TTL:
+        return _prompts
+    return None
+
+
+def _remember_prompts(prompts):
+    global _prompts, _prompts_loaded_at
+    with _lock:
+        if _prompts is not None and _prompts["version"] != prompts["version"]:
+            logger.info(f"Промпты изменились: версия {_prompts['version']} -> {prompts['version']}")
+        _prompts = prompts
+        _prompts_loaded_at = time.monotonic()
+
+
+def sheet_range(first_row):
+    """
+    Открытый диапазон C..I всех строк листа начиная с first_row: читается одним запросом.
+    """
+    last = max(COLUMN_FORM_LINK, COLUMN_FINGERPRINT)
+    return f"{SHEET_NAME}!{COLUMN_JOB_DESC}{first_row}:{last}"
+
+
+def _batch_get(row_ranges, refresh_prompts, **span_attrs):
+    """
+    Один batchGet: row_ranges и, если кэш промптов пуст или устарел, ячейки промптов.
+    Возвращает (value ranges строк, prompts).
+    """
+    prompts = None if refresh_prompts else _cached_prompts()
+    ranges = list(row_ranges)
+    if prompts is None:
+        ranges += [f"{CONFIG_SHEET}!{cell}" for cell in PROMPT_CELLS.values()]
+    with tracing.span("sheet_read", ranges=len(ranges), **span_attrs):
+        request = get_sheets_service().values().batchGet(spreadsheetId=GOOGLE_SHEET_ID, ranges=ranges)
+        result = scheduler.call("sheets", request.execute)
+    values = result.get('valueRanges', [])
+    values += [{}] * (len(ranges) - len(values))
+    with tracing.span("config_read") as span:
+        if prompts is None:
+            prompt_values = values[len(row_ranges):]
+            raw_prompts = {name: _cell_value(prompt_values[idx]) for idx, name in enumerate(PROMPT_CELLS)}
+            prompts = build_prompts(raw_prompts)
+            _remember_prompts(prompts)
+            tracing.add(cache_misses=1)
+        else:
+            tracing.add(cache_hits=1)
+        tracing.add(prompt_chars=sum(len(prompts[name]) for name in PROMPT_CELLS))
+        span.attrs["prompts_version"] = prompts["version"]
+    return values[:len(row_ranges)], prompts
+
+
+def load(row_ids, refresh_prompts=False):
+    """
+    Читает строки row_ids (C..I) и, если кэш промптов пуст или устарел, ячейки промптов
+    из листа CONFIG_SHEET — всё одним batchGet.
+    Возвращает (rows, prompts): rows — dict row_id -> (job_desc, must_haves, form_link, fingerprint),
+    prompts — dict questions/logic/form/version.
+    """
+    values, prompts = _batch_get([row_range(row_id) for row_id in row_ids], refresh_prompts, rows=len(row_ids))
+    rows = {row_id: parse_row_values(values[idx]) for idx, row_id in enumerate(row_ids)}
+    return rows, prompts
+
+
+def load_sheet(first_row, refresh_prompts=False):
+    """
+    Читает все строки листа начиная с first_row одним диапазоном (и промпты — в том же batchGet).
+    Возвращает (rows, prompts), как load; строки без описания и must-haves пропускаются.
+    """
+    values, prompts = _batch_get([sheet_range(first_row)], refresh_prompts)
+    rows = {}
+    for offset, row in enumerate(values[0].get('values', [])):
+        parsed = parse_row_values({'values': [row]} if row else {})
+        if parsed[0] or parsed[1]:
+            rows[first_row + offset] = parsed
+    return rows, prompts
+
+
+def invalidate_prompts():
+    global _prompts
+    with _lock:
+        _prompts = None
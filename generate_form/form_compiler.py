@@ -0,0 +1,268 @@
+"""
+Модуль form_compiler: локальная сборка финального JSON формы Typeform из вопросов и логики.
+Заменяет третий вызов OpenAI (промпт B6): результат детерминирован и собирается за миллисекунды.
+"""
+
+import logging
+import re
+from json_builder import build_final_redirect_url, build_compact_redirect_url, redirect_refs, ruleset_version
+from settings import FAIL_URL, REDIRECT_FORMAT
+
+logger = logging.getLogger("form_compiler")
+
+QUIZ_SCREEN_REF = "thankyou_quiz"
+FAIL_SCREEN_REF = "thankyou_fail"
+
+# Синонимы типов из ответа GPT -> тип поля Typeform
+FIELD_TYPE_ALIASES = {
+    "text": "short_text",
+    "string": "short_text",
+    "short_text": "short_text",
+    "long_text": "long_text",
+    "textarea": "long_text",
+    "multiple_choice": "multiple_choice",
+    "choice": "multiple_choice",
+    "select": "dropdown",
+    "dropdown": "dropdown",
+    "yes_no": "yes_no",
+    "boolean": "yes_no",
+    "number": "number",
+    "numeric": "number",
+    "email": "email",
+    "phone": "phone_number",
+    "phone_number": "phone_number",
+    "website": "website",
+    "url": "website",
+    "date": "date",
+    "rating": "rating",
+    "opinion_scale": "opinion_scale",
+    "file_upload": "file_upload",
+    "statement": "statement",
+}
+CHOICE_TYPES = {"multiple_choice", "dropdown"}
+CONTACT_REFS = {"email": "email", "phone_number": "phone"}
+YES_VALUES = {"yes", "да", "true", "1", "required"}
+
+_REF_INVALID = re.compile(r"[^a-z0-9_-]+")
+_FIELD_KEYS = ("field_type", "type")
+_CHOICE_KEYS = ("choices", "options")
+
+
+class FormCompileError(ValueError):
+    """Вопросы или логика не в том виде, который может собрать локальный компилятор."""
+
+
+def make_ref(text, fallback):
+    """
+    ref из текста: латиница, цифры, '_' и '-'. Для текста без латиницы — fallback.
+    """
+    ref = _REF_INVALID.sub("_", str(text).lower()).strip("_")[:60]
+    return ref or fallback
+
+
+def _unique_ref(ref, used):
+    candidate, n = ref, 2
+    while candidate in used:
+        candidate = f"{ref}_{n}"
+        n += 1
+    used.add(candidate)
+    return candidate
+
+
+def questions_list(questions):
+    """
+    Список вопросов из ответа GPT: сам список или значение ключа questions/fields.
+    """
+    if isinstance(questions, dict):
+        for key in ("questions", "fields"):
+            if isinstance(questions.get(key), list):
+                return questions[key]
+    if isinstance(questions, list):
+        return questions
+    raise FormCompileError("Вопросы должны быть списком или dict с ключом questions/fields")
+
+
+def _choices(raw):
+    """
+    Варианты ответа как список (label, ref); ref есть, только если его задал GPT.
+    """
+    if isinstance(raw, str):
+        raw = [part.strip() for part in raw.split(",")]
+    choices = []
+    for choice in raw or []:
+        label, ref = (choice.get("label"), choice.get("ref")) if isinstance(choice, dict) else (choice, None)
+        if label not in (None, ""):
+            choices.append((str(label), ref))
+    return choices
+
+
+def compile_field(question, idx, used_refs):
+    """
+    Превращает вопрос (dict от GPT или строку) в поле Typeform.
+    """
+    if isinstance(question, str):
+        question = {"title": question}
+    if not isinstance(question, dict):
+        raise FormCompileError(f"Вопрос #{idx + 1} должен быть словарём или строкой")
+    title = question.get("title") or question.get("question") or question.get("text")
+    if not title:
+        raise FormCompileError(f"У вопроса #{idx + 1} нет title")
+    raw_type = next((question[key] for key in _FIELD_KEYS if question.get(key)), None)
+    raw_choices = next((question[key] for key in _CHOICE_KEYS if question.get(key)), None)
+    if raw_type is None:
+        raw_type = "multiple_choice" if raw_choices else "short_text"
+    field_type = FIELD_TYPE_ALIASES.get(str(raw_type).strip().lower())
+    if field_type is None:
+        raise FormCompileError(f"Неизвестный тип поля '{raw_type}' у вопроса #{idx + 1}")
+
+    ref = question.get("ref") or CONTACT_REFS.get(field_type)
+    if not ref or (ref in used_refs and field_type in CONTACT_REFS):
+        ref = make_ref(title, f"q{idx + 1}")
+    field = {"ref": _unique_ref(ref, used_refs), "title": str(title), "type": field_type}
+
+    properties = dict(question.get("properties") or {})
+    if field_type in CHOICE_TYPES:
+        choices = _choices(raw_choices or properties.get("choices"))
+        if not choices:
+            raise FormCompileError(f"У вопроса #{idx + 1} ({field_type}) нет вариантов ответа")
+        choice_refs = set()
+        properties["choices"] = [
+            {"ref": _unique_ref(choice_ref or f"{field['ref']}_{make_ref(label, str(n + 1))}", choice_refs), "label": label}
+            for n, (label, choice_ref) in enumerate(choices)
+        ]
+    if field_type == "phone_number" and question.get("default_country_code"):
+        properties["default_country_code"] = question["default_country_code"]
+    if properties:
+        field["properties"] = properties
+
+    required = question.get("required")
+    if isinstance(required, str):
+        required = required.strip().lower() in YES_VALUES
+    if required is not None and field_type != "statement":
+        field["validations"] = {"required": bool(required)}
+    return field
+
+
+def _logic_rules(logic):
+    if not logic:
+        return []
+    if isinstance(logic, dict):
+        logic = logic.get("logic", [])
+    if not isinstance(logic, list):
+        raise FormCompileError("Логика должна быть списком правил или dict с ключом logic")
+    return logic
+
+
+def _screen_ref(value):
+    return FAIL_SCREEN_REF if re.search(r"fail|reject|отказ", str(value), re.IGNORECASE) else QUIZ_SCREEN_REF
+
+
+def _fix_jumps(node, field_refs, choice_index):
+    """
+    Переводит цели jump на реальные ref: неизвестные thankyou-экраны сводятся к quiz/fail,
+    условия по choice с текстом варианта вместо ref — к ref варианта.
+    Возвращает False, если jump ведёт на несуществующее поле.
+    """
+    if isinstance(node, list):
+        return all(_fix_jumps(item, field_refs, choice_index) for item in node)
+    if not isinstance(node, dict):
+        return True
+    if node.get("type") == "choice" and isinstance(node.get("value"), str):
+        node["value"] = choice_index.get(node["value"].strip().lower(), node["value"])
+    target = node.get("to")
+    if isinstance(target, dict):
+        if target.get("type") == "thankyou":
+            if target.get("value") not in (QUIZ_SCREEN_REF, FAIL_SCREEN_REF):
+                target["value"] = _screen_ref(target.get("value"))
+        elif target.get("type") == "field" and target.get("value") not in field_refs:
+            return False
+    return all(_fix_jumps(value, field_refs, choice_index) for value in node.values())
+
+
+def compile_logic(logic, fields):
+    """
+    Оставляет только правила для существующих полей с корректными целями переходов.
+    """
+    field_refs = {field["ref"] for field in fields}
+    choice_index = {}
+    for field in fields:
+        for choice in field.get("properties", {}).get("choices", []):
+            choice_index[choice["ref"].lower()] = choice["ref"]
+            choice_index.setdefault(choice["label"].strip().lower(), choice["ref"])
+    compiled = []
+    for rule in _logic_rules(logic):
+        if not isinstance(rule, dict) or rule.get("ref") not in field_refs:
+            logger.warning(f"Правило логики пропущено: неизвестное поле {rule!r:.200}")
+            continue
+        if not _fix_jumps(rule.get("actions", []), field_refs, choice_index):
+            logger.warning(f"Правило логики для {rule['ref']} пропущено: переход на неизвестное поле")
+            continue
+        compiled.append({"type": rule.get("type", "field"), "ref": rule["ref"], "actions": rule.get("actions", [])})
+    return compiled
+
+
+def form_ruleset(fields, must_haves):
+    """
+    Набор правил формы для компактного redirect_url: (версия, ref ответов по порядку)
+    или None, если форма использует прежний формат (REDIRECT_FORMAT=full или нет must-haves).
+    """
+    if REDIRECT_FORMAT != "compact" or not must_haves:
+        return None
+    refs = redirect_refs(fields)
+    return ruleset_version(must_haves, refs), refs
+
+
+def build_form_shell(questions, title, must_haves=""):
+    """
+    Часть формы, не зависящая от логики: поля с ref и вариантами ответа и thankyou-экраны
+    (основной — с redirect_url на process_submission, отказ — на FAIL_URL).
+    """
+    used_refs = set()
+    fields = [compile_field(question, idx, used_refs) for idx, question in enumerate(questions_list(questions))]
+    if not fields:
+        raise FormCompileError("Нет ни одного вопроса")
+    ruleset = form_ruleset(fields, must_haves)
+    if ruleset:
+        redirect_url = build_compact_redirect_url(*ruleset)
+    else:
+        redirect_url = build_final_redirect_url(
+            fields, extra_params={"pass": "true", "must_haves": must_haves} if must_haves else {"pass": "true"}
+        )
+    return {
+        "title": title,
+        "fields": fields,
+        "thankyou_screens": [
+            {
+                "ref": QUIZ_SCREEN_REF,
+                "title": "Спасибо! Ваши ответы отправлены.",
+                "properties": {"show_button": False, "redirect_url": redirect_url},
+            },
+            {
+                "ref": FAIL_SCREEN_REF,
+                "title": "Спасибо за интерес к вакансии!",
+                "properties": {"show_button": False, "redirect_url": FAIL_URL},
+            },
+        ],
+    }
+
+
+def attach_logic(shell, logic):
+    """
+    Дополняет каркас формы правилами логики. Возвращает полный payload для POST /forms.
+    """
+    return {**shell, "logic": compile_logic(logic, shell["fields"])}
+
+
+def compile_form(questions, logic, title, must_haves=""):
+    """
+    Собирает полный payload для POST /forms: каркас формы (build_form_shell) и logic jumps.
+    """
+    return attach_logic(build_form_shell(questions, title, must_haves), logic)
+
+
+def form_title(job_desc, max_length=100):
+    """
+    Название формы — первая непустая строка описания вакансии.
+    """
+    first_line = next((line.strip() for line in job_desc.splitlines() if line.strip()), "Анкета кандидата")
+    return first_line[:max_length]
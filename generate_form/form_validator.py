@@ -0,0 +1,327 @@
+"""
+Модуль form_validator: локальная проверка payload формы Typeform перед отправкой в API.
+Возвращает все нарушения сразу в виде структурированных ошибок (path, code, message).
+"""
+
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Типы полей Typeform; обязательные properties по типу проверяет _PROPERTY_CHECKS
+FIELD_TYPES = frozenset((
+    "short_text", "long_text", "multiple_choice", "dropdown", "picture_choice", "yes_no", "number",
+    "email", "phone_number", "website", "date", "rating", "opinion_scale", "file_upload", "legal",
+    "statement", "group",
+))
+CHOICE_FIELD_TYPES = frozenset(("multiple_choice", "dropdown", "picture_choice"))
+LOGIC_ACTIONS = frozenset(("jump", "add", "subtract", "multiply", "divide", "set"))
+JUMP_TARGET_TYPES = frozenset(("field", "thankyou"))
+
+# ref повторяются от формы к форме (q1, musthave_*), проверка регуляркой кэшируется
+_ref_ok = lru_cache(maxsize=4096)(re.compile(r"[A-Za-z0-9_-]{1,255}").fullmatch)
+_country_code_ok = re.compile(r"[A-Z]{2}").fullmatch
+_EMPTY = {}
+# Незаменённые плейсхолдеры вроде {post_submit_url}; подстановки Typeform {field:...} допустимы
+_PLACEHOLDER_RE = re.compile(r"\{(?!field:|hidden:|variable:)[^{}]*url[^{}]*\}", re.IGNORECASE)
+
+
+class FormValidationError(ValueError):
+    """Payload формы не прошёл локальную проверку; errors — список всех нарушений."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        summary = "; ".join(f"{e['path']}: {e['message']}" for e in errors[:5])
+        more = f" (и ещё {len(errors) - 5})" if len(errors) > 5 else ""
+        super().__init__(f"Форма не прошла проверку: {summary}{more}")
+
+
+def _dict(value):
+    return value if type(value) is dict else _EMPTY
+
+
+def _path(path):
+    # Путь собирается строкой только для найденной ошибки; при обходе это кортеж (родитель, ключ или индекс)
+    if type(path) is str:
+        return path
+    parent, part = path
+    prefix = _path(parent)
+    if type(part) is int:
+        return f"{prefix}[{part}]"
+    return f"{prefix}.{part}" if prefix else part
+
+
+def _error(errors, path, code, message):
+    errors.append({"path": _path(path), "code": code, "message": message})
+
+
+def _ref_error(errors, path, ref, seen, kind):
+    # Вызывается, только если ref не прошёл проверку
+    if not isinstance(ref, str) or not _ref_ok(ref):
+        _error(errors, (path, "ref"), "invalid_ref", f"ref {kind} должен состоять из [A-Za-z0-9_-], 1-255 символов")
+    else:
+        _error(errors, (path, "ref"), "duplicate_ref", f"ref '{ref}' повторяется")
+
+
+def _check_ref(errors, path, ref, seen, kind):
+    if type(ref) is str and ref not in seen and _ref_ok(ref):
+        seen.add(ref)
+        return True
+    _ref_error(errors, path, ref, seen, kind)
+    return False
+
+
+def _check_choices(errors, path, properties, choice_refs):
+    choices = properties.get("choices")
+    choices_path = ((path, "properties"), "choices")
+    if type(choices) is not list or not choices:
+        _error(errors, choices_path, "missing_choices", "нужен непустой список choices")
+        return
+    seen = set()
+    for j, choice in enumerate(choices):
+        if type(choice) is not dict:
+            _error(errors, (choices_path, j), "invalid_choice", "вариант ответа должен быть словарём")
+            continue
+        label = choice.get("label")
+        if type(label) is not str or not label or label.isspace():
+            _error(errors, ((choices_path, j), "label"), "missing_label", "у варианта ответа нужен непустой label")
+        ref = choice.get("ref")
+        if ref is not None:
+            if type(ref) is str and ref not in seen and _ref_ok(ref):
+                seen.add(ref)
+                choice_refs.add(ref)
+            else:
+                _ref_error(errors, (choices_path, j), ref, seen, "варианта")
+
+
+def _check_phone(errors, path, properties, choice_refs):
+    code = properties.get("default_country_code")
+    if code is not None and not (type(code) is str and _country_code_ok(code)):
+        _error(errors, ((path, "properties"), "default_country_code"), "invalid_country_code",
+               "default_country_code — двухбуквенный код ISO (например, RU)")
+
+
+def _check_group(errors, path, properties, choice_refs, field_refs):
+    subfields = properties.get("fields")
+    fields_path = ((path, "properties"), "fields")
+    if type(subfields) is not list:
+        _error(errors, fields_path, "missing_property", "для group нужен список properties.fields")
+        return
+    _check_fields(errors, fields_path, subfields, field_refs, choice_refs)
+
+
+# Проверки properties по типу поля, собраны один раз при импорте модуля
+_PROPERTY_CHECKS = {field_type: _check_choices for field_type in CHOICE_FIELD_TYPES}
+_PROPERTY_CHECKS["phone_number"] = _check_phone
+
+
+def _check_fields(errors, path, fields, field_refs, choice_refs):
+    # Весь список полей — за один вызов; путь поля (path, i) собирается только для ошибки
+    for i, field in enumerate(fields):
+        if type(field) is not dict:
+            _error(errors, (path, i), "invalid_field", "поле должно быть словарём")
+            continue
+        field_type = field.get("type")
+        # Все множества допустимых значений состоят из строк: нестроковое значение (в том числе
+        # нехэшируемое) заведомо не подходит и в множестве не ищется
+        if type(field_type) is not str or field_type not in FIELD_TYPES:
+            _error(errors, ((path, i), "type"), "unknown_type", f"неизвестный тип поля {field_type!r}")
+        title = field.get("title")
+        if type(title) is not str or not title or title.isspace():
+            _error(errors, ((path, i), "title"), "missing_title", "у поля нужен непустой title")
+        ref = field.get("ref")
+        if ref is not None:
+            if type(ref) is str and ref not in field_refs and _ref_ok(ref):
+                field_refs.add(ref)
+            else:
+                _ref_error(errors, (path, i), ref, field_refs, "поля")
+        properties = field.get("properties")
+        if properties is None:
+            properties = _EMPTY
+        elif type(properties) is not dict:
+            _error(errors, ((path, i), "properties"), "invalid_properties", "properties должен быть словарём")
+            continue
+        check = _PROPERTY_CHECKS.get(field_type) if type(field_type) is str else None
+        if check is not None:
+            check(errors, (path, i), properties, choice_refs)
+        elif field_type == "group":
+            _check_group(errors, (path, i), properties, choice_refs, field_refs)
+        validations = field.get("validations")
+        if validations is not None:
+            if type(validations) is not dict:
+                _error(errors, ((path, i), "validations"), "invalid_validations", "validations должен быть словарём")
+            elif type(validations.get("required", False)) is not bool:
+                _error(errors, (((path, i), "validations"), "required"), "invalid_required", "required должен быть bool")
+
+
+def check_redirect_url(url):
+    """
+    Возвращает текст ошибки для redirect_url или None, если адрес корректен.
+    """
+    if not isinstance(url, str) or not url:
+        return "redirect_url должен быть непустой строкой"
+    if _PLACEHOLDER_RE.search(url):
+        return "в redirect_url остался плейсхолдер"
+    if any(ch.isspace() for ch in url):
+        return "redirect_url не должен содержать пробелов"
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return "redirect_url должен быть абсолютным http(s)-адресом"
+    return None
+
+
+def _check_thankyou_screens(errors, screens, screen_refs):
+    if not isinstance(screens, list):
+        _error(errors, "thankyou_screens", "invalid_thankyou_screens", "thankyou_screens должен быть списком")
+        return
+    for i, screen in enumerate(screens):
+        path = ("thankyou_screens", i)
+        if not isinstance(screen, dict):
+            _error(errors, path, "invalid_thankyou_screen", "thankyou screen должен быть словарём")
+            continue
+        if not isinstance(screen.get("title"), str):
+            _error(errors, (path, "title"), "missing_title", "у thankyou screen нужен title")
+        if screen.get("ref") is not None:
+            _check_ref(errors, path, screen["ref"], screen_refs, "экрана")
+        properties = _dict(screen.get("properties"))
+        if "redirect_url" in properties:
+            message = check_redirect_url(properties["redirect_url"])
+            if message:
+                _error(errors, ((path, "properties"), "redirect_url"), "invalid_redirect_url", message)
+
+
+def _check_vars(errors, path, node, field_refs, choice_refs):
+    """
+    Рекурсивно проверяет условия: ссылки на поля и варианты ответа должны существовать.
+    Словари из списка vars проверяются в том же вызове, рекурсия — только на вложенные vars.
+    """
+    is_list = type(node) is list
+    for j, item in enumerate(node if is_list else (node,)):
+        if type(item) is list:
+            _check_vars(errors, (path, j) if is_list else path, item, field_refs, choice_refs)
+            continue
+        if type(item) is not dict:
+            continue
+        var_type = item.get("type")
+        if var_type == "field":
+            value = item.get("value")
+            if type(value) is not str or value not in field_refs:
+                _error(errors, (path, j) if is_list else path, "unknown_field_ref",
+                       f"условие ссылается на несуществующее поле {value!r}")
+        elif var_type == "choice":
+            value = item.get("value")
+            if type(value) is not str or value not in choice_refs:
+                _error(errors, (path, j) if is_list else path, "unknown_choice_ref",
+                       f"условие ссылается на несуществующий вариант {value!r}")
+        nested = item.get("vars")
+        if nested is not None:
+            _check_vars(errors, ((path, j) if is_list else path, "vars"), nested, field_refs, choice_refs)
+
+
+def _check_logic(errors, logic, field_refs, choice_refs, screen_refs):
+    if type(logic) is not list:
+        _error(errors, "logic", "invalid_logic", "logic должен быть списком")
+        return
+    # default_tys — стандартный thankyou screen Typeform, существует всегда
+    targets = {"field": field_refs, "thankyou": screen_refs | {"default_tys"}}
+    for i, rule in enumerate(logic):
+        path = ("logic", i)
+        if type(rule) is not dict:
+            _error(errors, path, "invalid_logic_rule", "правило логики должно быть словарём")
+            continue
+        if rule.get("type", "field") == "field":
+            ref = rule.get("ref")
+            if type(ref) is not str or ref not in field_refs:
+                _error(errors, (path, "ref"), "unknown_field_ref", f"логика для несуществующего поля {ref!r}")
+        actions = rule.get("actions")
+        if type(actions) is not list:
+            _error(errors, (path, "actions"), "invalid_actions", "actions должен быть списком")
+            continue
+        # Действия правила проверяются в этом же цикле, путь действия (actions_path, j) — только для ошибки
+        actions_path = (path, "actions")
+        for j, action in enumerate(actions):
+            name = action.get("action") if type(action) is dict else None
+            if type(name) is not str or name not in LOGIC_ACTIONS:
+                _error(errors, (actions_path, j), "invalid_action",
+                       "action должен быть одним из " + ", ".join(sorted(LOGIC_ACTIONS)))
+                continue
+            if name == "jump":
+                details = action.get("details")
+                target = details.get("to") if type(details) is dict else None
+                if type(target) is not dict:
+                    target = _EMPTY
+                target_type = target.get("type")
+                if type(target_type) is not str or target_type not in JUMP_TARGET_TYPES:
+                    _error(errors, ((((actions_path, j), "details"), "to"), "type"),
+                           "invalid_jump_target", "jump ведёт на field или thankyou")
+                else:
+                    value = target.get("value")
+                    if type(value) is not str or value not in targets[target_type]:
+                        _error(errors, ((((actions_path, j), "details"), "to"), "value"),
+                               "unknown_jump_target", f"jump на несуществующий {target_type} {value!r}")
+            condition = action.get("condition")
+            if condition is not None:
+                _check_vars(errors, ((actions_path, j), "condition"), condition, field_refs, choice_refs)
+
+
+class _Invalid(Exception):
+    pass
+
+
+class _FailFast:
+    """
+    Сборщик ошибок быстрого прохода: первое же нарушение прерывает проверку.
+    """
+
+    __slots__ = ()
+
+    def append(self, error):
+        raise _Invalid
+
+
+_FAIL_FAST = _FailFast()
+
+
+def _check_form(errors, form_json):
+    if not isinstance(form_json, dict):
+        _error(errors, "", "invalid_form", "JSON формы должен быть словарём")
+        return
+    title = form_json.get("title")
+    if not isinstance(title, str) or not title.strip():
+        _error(errors, "title", "missing_title", "у формы нужен непустой строковый title")
+    fields = form_json.get("fields")
+    field_refs, choice_refs, screen_refs = set(), set(), set()
+    if not isinstance(fields, list) or not fields:
+        _error(errors, "fields", "missing_fields", "нужен непустой список fields")
+        fields = []
+    _check_fields(errors, "fields", fields, field_refs, choice_refs)
+    if "thankyou_screens" in form_json:
+        _check_thankyou_screens(errors, form_json["thankyou_screens"], screen_refs)
+    if "logic" in form_json:
+        _check_logic(errors, form_json["logic"], field_refs, choice_refs, screen_refs)
+
+
+def validate_form(form_json):
+    """
+    Проверяет payload формы: типы полей и их обязательные properties, варианты ответа,
+    уникальность ref, цели jump (поля и thankyou-экраны), redirect_url.
+    Возвращает список ошибок; пустой список — форма корректна.
+    Сначала те же проверки идут до первого нарушения (корректная форма — обычный случай),
+    список всех ошибок собирается повторным проходом только для некорректной формы.
+    """
+    try:
+        _check_form(_FAIL_FAST, form_json)
+        return []
+    except _Invalid:
+        pass
+    errors = []
+    _check_form(errors, form_json)
+    return errors
+
+
+def ensure_valid(form_json):
+    """
+    Бросает FormValidationError со всеми нарушениями, если форма некорректна.
+    """
+    errors = validate_form(form_json)
+    if errors:
+        raise FormValidationError(errors)
@@ -0,0 +1,102 @@
+"""
+Модуль gpt_archive: запись и воспроизведение вызовов OpenAI (GPT_RECORD_MODE).
+record — каждый вызов этапа (ключ gpt_cache.make_key, промпт, ответ, время до первого токена,
+длительность, токены) и входные данные строки дописываются в JSONL-архив GPT_ARCHIVE_PATH;
+replay — ответ берётся из архива по ключу и отдаётся с исходной длительностью
+(× GPT_REPLAY_SPEED) без обращения к OpenAI. Промпта нет в архиве (изменился промпт
+или код этапа) — ReplayMissError: этап падает, а не уходит в сеть.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from settings import GPT_RECORD_MODE, GPT_ARCHIVE_PATH, GPT_REPLAY_SPEED
+
+logger = logging.getLogger("gpt_archive")
+
+RECORD = GPT_RECORD_MODE == "record"
+REPLAY = GPT_RECORD_MODE == "replay"
+
+_lock = threading.Lock()
+_recorded_inputs = set()
+_calls = None
+_inputs = None
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+def _append(record, path=GPT_ARCHIVE_PATH):
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def record_call(stage, key, model, system_message, prompt, content, stats):
+    """
+    Дописывает вызов этапа: stats — ttft_ms, duration_ms, prompt_tokens, completion_tokens.
+    """
+    _append({
+        "type": "call", "key": key, "stage": stage, "model": model, "system": system_message,
+        "prompt": prompt, "content": content, **stats, "recorded_at": time.time(),
+    })
+
+
+def record_input(job_desc, must_haves, prompts):
+    """
+    Дописывает входные данные строки (описание, must-haves, промпты) — по ним replay
+    прогоняет те же строки без таблицы. Одинаковые входы пишутся один раз на процесс.
+    """
+    key = hashlib.sha256(json.dumps([job_desc, must_haves, prompts], ensure_ascii=False).encode("utf-8")).hexdigest()
+    with _lock:
+        if key in _recorded_inputs:
+            return
+        _recorded_inputs.add(key)
+    _append({
+        "type": "input", "key": key, "job_desc": job_desc, "must_haves": must_haves, "prompts": prompts,
+        "recorded_at": time.time(),
+    })
+
+
+def load(path=GPT_ARCHIVE_PATH):
+    """
+    Читает архив: (calls, inputs) — вызовы по ключу (при повторах — последний) и входы строк по порядку.
+    """
+    calls, inputs = {}, {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("type") == "call":
+                calls[record["key"]] = record
+            elif record.get("type") == "input":
+                inputs.setdefault(record["key"], record)
+    return calls, list(inputs.values())
+
+
+def _archive():
+    global _calls, _inputs
+    if _calls is None:
+        with _lock:
+            if _calls is None:
+                _calls, _inputs = load()
+                logger.info(f"Архив {GPT_ARCHIVE_PATH}: вызовов {len(_calls)}, строк {len(_inputs)}")
+    return _calls
+
+
+def replay(stage, key):
+    """
+    Ответ этапа из архива с исходной длительностью. Возвращает (content, stats).
+    """
+    record = _archive().get(key)
+    if record is None or record["stage"] != stage:
+        raise ReplayMissError(f"Этап {stage}: ответа нет в архиве {GPT_ARCHIVE_PATH} (ключ {key[:12]})")
+    if GPT_REPLAY_SPEED > 0 and record.get("duration_ms"):
+        time.sleep(record["duration_ms"] / 1000 * GPT_REPLAY_SPEED)
+    stats = {name: record.get(name) for name in ("ttft_ms", "duration_ms", "prompt_tokens", "completion_tokens")}
+    return record["content"], stats
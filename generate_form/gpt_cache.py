@@ -0,0 +1,237 @@
+"""
+Модуль gpt_cache: кэш ответов OpenAI по хэшу модели, системного сообщения и полного промпта.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from settings import GPT_CACHE_BACKEND, GPT_CACHE_PATH, GPT_CACHE_TTL, GPT_CACHE_MAX_ITEMS
+
+logger = logging.getLogger("gpt_cache")
+
+_bypass = contextvars.ContextVar("gpt_cache_bypass", default=False)
+_stats_lock = threading.Lock()
+_stats = {}
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def make_key(model, system_message, prompt):
+    """
+    Ключ кэша: sha256 от модели, системного сообщения и полного промпта.
+    Промпт включает текст из B6/B7/B8, поэтому правка промпта в таблице даёт новый ключ.
+    """
+    payload = json.dumps([model, system_message, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """
+    LRU-кэш в памяти инстанса с ограничением по числу записей и TTL.
+    """
+
+    def __init__(self, max_items=GPT_CACHE_MAX_ITEMS, ttl=GPT_CACHE_TTL):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (stage, value, created_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if time.time() - item[2] > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key, stage, value, created_at=None):
+        with self._lock:
+            self._items[key] = (stage, value, created_at or time.time())
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def invalidate(self, stage=None):
+        with self._lock:
+            if stage is None:
+                self._items.clear()
+                return
+            for key in [k for k, item in self._items.items() if item[0] == stage]:
+                del self._items[key]
+
+
+class SqliteCache:
+    """
+    Кэш на диске (SQLite). Переживает перезапуск процесса в пределах одного диска/инстанса.
+    """
+
+    def __init__(self, path=GPT_CACHE_PATH, ttl=GPT_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpt_cache ("
+            "key TEXT PRIMARY KEY, stage TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS gpt_cache_stage ON gpt_cache (stage)")
+        self._conn.commit()
+
+    def get_item(self, key):
+        """
+        Возвращает запись (stage, value, created_at) или None, если её нет или истёк TTL.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stage, value, created_at FROM gpt_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl:
+            return None
+        return row
+
+    def get(self, key):
+        item = self.get_item(key)
+        return item[1] if item is not None else None
+
+    def set(self, key, stage, value, created_at=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gpt_cache (key, stage, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, stage, value, created_at or time.time())
+            )
+            self._conn.commit()
+
+    def invalidate(self, stage=None):
+        with self._lock:
+            if stage is None:
+                self._conn.execute("DELETE FROM gpt_cache")
+            else:
+                self._conn.execute("DELETE FROM gpt_cache WHERE stage = ?", (stage,))
+            self._conn.commit()
+
+
+class TieredCache:
+    """
+    Двухуровневый кэш: память перед SQLite. Попадание в SQLite поднимает запись в память
+    с исходными этапом и временем создания — TTL и invalidate(stage) работают как для SQLite.
+    """
+
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        item = self.disk.get_item(key)
+        if item is None:
+            return None
+        stage, value, created_at = item
+        self.memory.set(key, stage, value, created_at)
+        return value
+
+    def set(self, key, stage, value, created_at=None):
+        self.memory.set(key, stage, value, created_at)
+        self.disk.set(key, stage, value, created_at)
+
+    def invalidate(self, stage=None):
+        self.memory.invalidate(stage)
+        self.disk.invalidate(stage)
+
+
+def build_cache(backend=GPT_CACHE_BACKEND):
+    """
+    Создаёт кэш по имени бэкенда: off | memory | sqlite | tiered.
+    """
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return MemoryCache()
+    try:
+        disk = SqliteCache()
+    except sqlite3.Error as e:
+        logger.warning(f"SQLite-кэш недоступен ({e}), используется только кэш в памяти")
+        return MemoryCache()
+    if backend == "sqlite":
+        return disk
+    return TieredCache(MemoryCache(), disk)
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = build_cache() or False
+    return _cache or None
+
+
+def set_cache(cache):
+    """
+    Подменяет кэш процесса (например, на MemoryCache в бенчмарках). None — отключает кэш.
+    """
+    global _cache
+    _cache = cache or False
+
+
+@contextlib.contextmanager
+def bypass(enabled=True):
+    """
+    Внутри блока кэш не читается, но свежие ответы в него записываются.
+    """
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def _count(stage, outcome):
+    with _stats_lock:
+        counters = _stats.setdefault(stage, {"hits": 0, "misses": 0, "bypassed": 0})
+        counters[outcome] += 1
+
+
+def lookup(stage, key):
+    """
+    Возвращает закэшированный ответ этапа или None. Обновляет счётчики попаданий/промахов.
+    """
+    cache = get_cache()
+    if cache is None:
+        return None
+    if _bypass.get():
+        _count(stage, "bypassed")
+        return None
+    value = cache.get(key)
+    _count(stage, "hits" if value is not None else "misses")
+    return value
+
+
+def store(stage, key, value):
+    cache = get_cache()
+    if cache is not None:
+        cache.set(key, stage, value)
+
+
+def invalidate(stage=None):
+    """
+    Удаляет записи этапа (questions, logic, form, validate) или весь кэш, если stage не указан.
+    """
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(stage)
+    logger.info(f"Кэш OpenAI очищен: {stage or 'все этапы'}")
+
+
+def get_stats():
+    with _stats_lock:
+        return {stage: dict(counters) for stage, counters in _stats.items()}
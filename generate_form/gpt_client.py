@@ -0,0 +1,207 @@
+"""
+Модуль gpt_client: единая точка вызова OpenAI для этапов генерации (вопросы, логика, форма).
+"""
+
+import json
+import logging
+import threading
+import time
+from types import SimpleNamespace
+import gpt_archive
+import gpt_cache
+import prompt_builder
+import scheduler
+import tracing
+from clients import get_openai_client
+from json_stream import JsonStreamScanner, JsonStreamError
+from settings import (
+    GPT_MODEL, GPT_STREAMING, GPT_STREAM_RETRIES, GPT_MAX_PREAMBLE, OPENAI_EXPECTED_OUTPUT_TOKENS
+)
+
+logger = logging.getLogger("gpt_client")
+
+# Сколько фрагментов после закрытия JSON дочитывать ради usage в последнем чанке
+STREAM_TRAILING_CHUNKS = 16
+
+_metrics_lock = threading.Lock()
+_metrics = {}
+
+
+def build_messages(system_message, prompt):
+    messages = []
+    if system_message:
+        messages.append({"role": "system", "content": system_message})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def estimate_tokens(messages):
+    """
+    Оценка расхода токенов на запрос (prompt_builder.count_tokens) плюс ожидаемый ответ —
+    для квоты OpenAI TPM в scheduler.
+    """
+    return sum(prompt_builder.count_tokens(m["content"]) for m in messages) + OPENAI_EXPECTED_OUTPUT_TOKENS
+
+
+def _stage_metrics(stage):
+    return _metrics.setdefault(stage, {
+        "calls": 0, "aborted": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+        "last_ttft_ms": None, "last_total_ms": None,
+    })
+
+
+def _record(stage, ttft, duration, usage, chunks=0, aborted=False):
+    """
+    Учитывает вызов в метриках этапа и trace. Возвращает его тайминги и токены (для gpt_archive).
+    """
+    with _metrics_lock:
+        m = _stage_metrics(stage)
+        m["calls"] += 1
+        m["aborted"] += int(aborted)
+        if usage is not None:
+            m["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            m["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        else:
+            # Поток оборван до usage: один фрагмент потока ~ один токен
+            m["completion_tokens"] += chunks
+        if ttft is not None:
+            m["last_ttft_ms"] = round(ttft * 1000, 1)
+        m["last_total_ms"] = round(duration * 1000, 1)
+    if usage is not None:
+        tracing.add(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        )
+    else:
+        tracing.add(completion_tokens=chunks)
+    return {
+        "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+        "duration_ms": round(duration * 1000, 1),
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) if usage is not None else None,
+        "completion_tokens": getattr(usage, "completion_tokens", None) if usage is not None else chunks,
+    }
+
+
+def get_metrics():
+    """
+    Метрики по этапам за время жизни инстанса: вызовы, прерывания, повторы, токены,
+    time-to-first-token и длительность последнего вызова.
+    """
+    with _metrics_lock:
+        return {stage: dict(m) for stage, m in _metrics.items()}
+
+
+def _stream_content(stage, client, model, messages):
+    """
+    Читает потоковый ответ, разбирая JSON по мере поступления. Прерывает поток,
+    как только JSON закрыт или стало ясно, что он невалиден. Возвращает (content, stats).
+    """
+    start = time.perf_counter()
+    ttft, usage, chunks, trailing = None, None, 0, 0
+    scanner = JsonStreamScanner(GPT_MAX_PREAMBLE)
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=0,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            chunks += 1
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            if scanner.complete:
+                # JSON уже собран: дочитываем короткий хвост ради usage, длинный — обрываем
+                trailing += 1
+                if trailing > STREAM_TRAILING_CHUNKS:
+                    break
+                continue
+            scanner.feed(delta)
+        content = scanner.result()
+    except JsonStreamError:
+        _record(stage, ttft, time.perf_counter() - start, usage, chunks, aborted=True)
+        raise
+    finally:
+        stream.close()
+    return content, _record(stage, ttft, time.perf_counter() - start, usage, chunks)
+
+
+def _complete_content(stage, client, model, messages):
+    """
+    Обычный (не потоковый) вызов; JSON извлекается из ответа тем же сканером.
+    """
+    start = time.perf_counter()
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=0
+    )
+    stats = _record(stage, None, time.perf_counter() - start, getattr(response, "usage", None))
+    scanner = JsonStreamScanner(GPT_MAX_PREAMBLE)
+    scanner.feed(response.choices[0].message.content or "")
+    return scanner.result(), stats
+
+
+def _replay_content(stage, key):
+    """
+    Ответ из архива (GPT_RECORD_MODE=replay) с исходной длительностью; учитывается в метриках как вызов.
+    """
+    start = time.perf_counter()
+    content, stats = gpt_archive.replay(stage, key)
+    usage = None
+    if stats["prompt_tokens"] is not None:
+        usage = SimpleNamespace(prompt_tokens=stats["prompt_tokens"], completion_tokens=stats["completion_tokens"])
+    ttft = stats["ttft_ms"] / 1000 if stats["ttft_ms"] is not None else None
+    _record(stage, ttft, time.perf_counter() - start, usage, stats["completion_tokens"] or 0)
+    return content
+
+
+def complete_json(stage, system_message, prompt, openai_api_key, model=GPT_MODEL):
+    """
+    Вызывает OpenAI (temperature=0) и возвращает ответ, разобранный как JSON.
+    Ответ кэшируется по хэшу (модель, системное сообщение, промпт); в кэш попадает
+    только ответ, который удалось разобрать. При потоковом режиме ответ без валидного
+    JSON прерывается на первой структурной ошибке и запрашивается повторно.
+    В режимах record и replay (GPT_RECORD_MODE) кэш не читается: каждый вызов
+    записывается в архив или воспроизводится из него (gpt_archive).
+    """
+    key = gpt_cache.make_key(model, system_message, prompt)
+    messages = build_messages(system_message, prompt)
+    cost = estimate_tokens(messages)
+    if gpt_archive.REPLAY:
+        content = scheduler.call("openai", lambda: _replay_content(stage, key), cost=cost)
+        tracing.add(response_chars=len(content))
+        return json.loads(content)
+    cached = gpt_cache.lookup(stage, key) if not gpt_archive.RECORD else None
+    if cached is not None:
+        logger.info(f"Этап {stage}: ответ взят из кэша")
+        tracing.add(cache_hits=1, response_chars=len(cached))
+        return json.loads(cached)
+    tracing.add(cache_misses=1, prompt_chars=len(prompt))
+    client = get_openai_client(openai_api_key)
+    fetch = _stream_content if GPT_STREAMING else _complete_content
+    attempts = 1 + GPT_STREAM_RETRIES
+    for attempt in range(1, attempts + 1):
+        try:
+            content, stats = scheduler.call("openai", lambda: fetch(stage, client, model, messages), cost=cost)
+            result = json.loads(content)
+            break
+        except (JsonStreamError, json.JSONDecodeError) as e:
+            if attempt == attempts:
+                raise
+            logger.warning(f"Этап {stage}: ответ не JSON ({e}), повтор {attempt}/{attempts - 1}")
+            with _metrics_lock:
+                _stage_metrics(stage)["retries"] += 1
+    tracing.add(response_chars=len(content))
+    gpt_cache.store(stage, key, content)
+    if gpt_archive.RECORD:
+        gpt_archive.record_call(stage, key, model, system_message, prompt, content, stats)
+    return result
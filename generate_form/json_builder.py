@@ -2,11 +2,39 @@
 Модуль json_builder: сборка финального JSON для Typeform и отправка в API.
 """
 
+import hashlib
+import json
 import logging
-import requests
-from settings import REGION, PROJECT, PROCESS_SUBMISSION_URL, OPENAI_API_KEY
-import openai
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+import prompt_builder
+import scheduler
+import tracing
+from settings import (
+    REGION, PROJECT, PROCESS_SUBMISSION_URL, OPENAI_API_KEY, HTTP_TIMEOUT, TYPEFORM_WEBHOOK_URL, TYPEFORM_WEBHOOK_SECRET,
+    TYPEFORM_API_URL, TYPEFORM_CREATED_MAX_ITEMS
+)
+from clients import get_http_session
+from gpt_client import complete_json
+from form_validator import ensure_valid
+from question_builder import BUDGET_REF
 import re
+from urllib.parse import quote
+
+TYPEFORM_FORMS_URL = f"{TYPEFORM_API_URL.rstrip('/')}/forms"
+TYPEFORM_WEBHOOK_TAG = "process_submission"
+_FORM_LINK_RE = re.compile(r"/to/([A-Za-z0-9]+)")
+# Допуск на расхождение часов инстанса и Typeform при поиске уже созданной формы, секунды
+TYPEFORM_CLOCK_SKEW = 60
+# Скрытое поле с ключом идемпотентности: по нему после неоднозначной ошибки находится именно эта форма
+FORM_MARKER_PREFIX = "formkey_"
+
+# Формы, созданные этим инстансом (LRU): ключ идемпотентности -> {form_id, form_url}
+_created_lock = threading.Lock()
+_created_forms = OrderedDict()
 
 
 def validate_with_gpt(form_json, OPENAI_API_KEY):
@@ -19,31 +47,15 @@ def validate_with_gpt(form_json, OPENAI_API_KEY):
         "Если есть ошибки — исправь их. Верни только валидный JSON без пояснений.\n"
         f"{form_json}"
     )
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0
-    )
-    import json
-    return json.loads(response.choices[0].message.content)
+    return complete_json("validate", None, prompt, OPENAI_API_KEY)
 
 
 def basic_manual_check(form_json):
     """
-    Минимальная ручная проверка структуры формы.
+    Локальная проверка структуры формы (см. form_validator).
+    Бросает FormValidationError со списком всех нарушений.
     """
-    if not isinstance(form_json, dict):
-        raise ValueError("JSON формы должен быть словарём.")
-    if "fields" not in form_json or not isinstance(form_json["fields"], list):
-        raise ValueError("В JSON формы должен быть список fields.")
-    if "title" not in form_json or not isinstance(form_json["title"], str):
-        raise ValueError("В JSON формы должен быть строковый title.")
-    for i, field in enumerate(form_json["fields"]):
-        if not isinstance(field, dict):
-            raise ValueError(f"Field #{i+1} должен быть словарём.")
-        if "type" not in field or "title" not in field:
-            raise ValueError(f"Field #{i+1} должен содержать type и title.")
+    ensure_valid(form_json)
 
 
 def sanitize_redirect_url(form_json):
@@ -64,13 +76,44 @@ def sanitize_redirect_url(form_json):
     return form_json
 
 
-def build_final_redirect_url(fields, contact_refs=("email", "phone")):
+def redirect_refs(fields, contact_refs=("email", "phone")):
+    """
+    ref, ответы на которые передаются в process_submission, в порядке компактного redirect_url:
+    must-have, подтверждение бюджета, контакты (контакты — всегда, даже если поля нет).
+    """
+    refs = [field["ref"] for field in fields if field.get("ref", "").startswith("musthave")]
+    if any(field.get("ref") == BUDGET_REF for field in fields):
+        refs.append(BUDGET_REF)
+    refs += [ref for ref in contact_refs if ref not in refs]
+    return refs
+
+
+def ruleset_version(must_haves, refs):
+    """
+    Версия набора правил: хэш must-haves и порядка ref. Набор неизменяем —
+    process_submission кэширует его по версии без срока жизни.
+    """
+    digest = hashlib.sha256(must_haves.encode("utf-8") + b"\0" + "\0".join(refs).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def build_compact_redirect_url(version, refs):
+    """
+    Компактный redirect_url: v — версия набора правил, a — ответы через запятую в порядке refs.
+    Typeform кодирует подставленные значения, поэтому запятая внутри ответа приходит как %2C.
+    """
+    answers = ",".join(f"{{field:{ref}}}" for ref in refs)
+    return f"{PROCESS_SUBMISSION_URL.split('?')[0]}?v={version}&a={answers}"
+
+
+def build_final_redirect_url(fields, contact_refs=("email", "phone"), extra_params=None):
     """
     Формирует redirect_url для thankyou screen с подстановками по всем must-have ref и контактным ref.
     fields: список вопросов (dict), каждый с ref
     contact_refs: список ref для контактов
+    extra_params: dict статических параметров (например, pass и must_haves), добавляется в начало
     """
-    params = []
+    params = [f"{key}={quote(str(value), safe='')}" for key, value in (extra_params or {}).items()]
     for field in fields:
         ref = field.get("ref")
         if ref and (ref.startswith("musthave") or ref in contact_refs):
@@ -83,6 +126,25 @@ def build_final_redirect_url(fields, contact_refs=("email", "phone")):
     return base + '?' + '&'.join(params)
 
 
+def with_form_id(typeform_json, form_id):
+    """
+    Копия JSON формы, в которой redirect_url на process_submission несёт form_id: id известен
+    только после создания формы, а по нему process_submission относит отклик из redirect
+    к той же форме, что и ответ из вебхука.
+    """
+    base = PROCESS_SUBMISSION_URL.split('?')[0]
+    param = f"form_id={quote(form_id, safe='')}"
+    screens = []
+    for screen in typeform_json.get("thankyou_screens", []):
+        url = screen.get("properties", {}).get("redirect_url")
+        if isinstance(url, str) and url.startswith(base):
+            url = re.sub(r"([?&])form_id=[^&]*&?", r"\1", url).rstrip("?&")
+            url += ("&" if "?" in url else "?") + param
+            screen = {**screen, "properties": {**screen["properties"], "redirect_url": url}}
+        screens.append(screen)
+    return {**typeform_json, "thankyou_screens": screens} if screens else typeform_json
+
+
 def generate_form_json(questions, logic, prompt, openai_api_key):
     """
     Генерирует финальный JSON формы Typeform через OpenAI, используя вопросы, логику и промпт из B6.
@@ -92,56 +154,216 @@ def generate_form_json(questions, logic, prompt, openai_api_key):
     if not questions or not prompt:
         logger.error("Отсутствуют обязательные входные данные для генерации формы.")
         raise ValueError("Необходимо указать вопросы и промпт.")
-    prompt_full = (
-        prompt + "\n"
-        f"Вопросы: {questions}\n"
-        f"Логика: {logic if logic else 'нет логики'}"
-    )
+    prompt_full = prompt_builder.build("form", prompt, [
+        ("Вопросы", questions, False),
+        ("Логика", logic if logic else "нет логики", False),
+    ])
     try:
-        client = openai.OpenAI(api_key=openai_api_key)
-        messages = [
-            {"role": "system", "content": "Ты — генератор валидных JSON для Typeform API."},
-            {"role": "user", "content": prompt_full}
-        ]
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
-            temperature=0
+        form_json = complete_json(
+            "form", "Ты — генератор валидных JSON для Typeform API.", prompt_full, openai_api_key
         )
-        import json
-        form_json = json.loads(response.choices[0].message.content)
-        logger.info(f"Сгенерирован финальный JSON формы: {form_json}")
-        # Формируем redirect_url с подстановками
-        redirect_url = build_final_redirect_url(questions)
-        # ... используем redirect_url для thankyou screen ...
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Сгенерирован финальный JSON формы: {form_json}")
         return form_json
     except Exception as e:
         logger.error(f"Ошибка генерации финального JSON формы через OpenAI: {e}")
         raise
 
 
-def send_to_typeform(typeform_json, typeform_api_key):
-    """
-    Отправляет JSON в Typeform API, возвращает ответ с ID и URL формы.
-    """
-    logger = logging.getLogger("json_builder")
-    url = "https://api.typeform.com/forms"
-    headers = {
+def typeform_headers(typeform_api_key):
+    if not typeform_api_key:
+        raise ValueError("TYPEFORM_API_KEY не задан")
+    return {
         "Authorization": f"Bearer {typeform_api_key}",
         "Content-Type": "application/json"
     }
+
+
+def _trace_sizes(response):
+    tracing.add(request_bytes=len(response.request.body or b""), response_bytes=len(response.content))
+
+
+def idempotency_key(*parts):
+    """
+    Ключ идемпотентности создания формы: sha256 от того, что определяет запрос (строка таблицы
+    и её отпечаток), а не от JSON формы — у двух строк с одинаковой вакансией формы разные.
+    """
+    canonical = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _parse_time(value):
     try:
-        logger.info("Отправка формы в Typeform API...")
-        response = requests.post(url, headers=headers, json=typeform_json)
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def form_marker(key):
+    """
+    Имя скрытого поля с ключом идемпотентности (Typeform: латиница, цифры, подчёркивание).
+    """
+    return FORM_MARKER_PREFIX + key[:32]
+
+
+def with_marker(typeform_json, marker):
+    """
+    Копия JSON формы со скрытым полем marker вместо прежних отметок.
+    """
+    hidden = [name for name in typeform_json.get("hidden", []) if not name.startswith(FORM_MARKER_PREFIX)]
+    return {**typeform_json, "hidden": hidden + [marker]}
+
+
+def find_created_form(title, marker, created_after, headers):
+    """
+    Ищет форму со скрытым полем marker: после обрыва соединения или 5xx POST мог успеть
+    выполниться на стороне Typeform. Список отбирает кандидатов по заголовку и времени
+    создания (не раньше created_after, unix time), отметка сверяется по полному JSON кандидата.
+    """
+    session = get_http_session()
+    response = session.get(
+        TYPEFORM_FORMS_URL, headers=headers, params={"search": title, "page_size": 200}, timeout=HTTP_TIMEOUT
+    )
+    response.raise_for_status()
+    for item in response.json().get("items", []):
+        created = _parse_time(item.get("created_at") or item.get("last_updated_at"))
+        if item.get("title") != title or created is None or created < created_after - TYPEFORM_CLOCK_SKEW:
+            continue
+        form = session.get(f"{TYPEFORM_FORMS_URL}/{item.get('id')}", headers=headers, timeout=HTTP_TIMEOUT)
+        form.raise_for_status()
+        if marker in form.json().get("hidden", []):
+            return {"form_id": item.get("id"), "form_url": item.get("_links", {}).get("display")}
+    return None
+
+
+def send_to_typeform(typeform_json, typeform_api_key, key=None, force=False):
+    """
+    Отправляет JSON в Typeform API, возвращает ответ с ID и URL формы.
+    Создание идемпотентно по key (см. idempotency_key): форма с тем же ключом в пределах инстанса
+    не создаётся повторно (force — создать заново), а перед повтором после неоднозначной ошибки
+    проверяется, не создана ли она уже: форма несёт ключ в скрытом поле. Без key повторного
+    использования нет, ключ служит только для поиска после ошибки.
+    """
+    logger = logging.getLogger("json_builder")
+    headers = typeform_headers(typeform_api_key)
+    remember = key is not None
+    if not remember:
+        key = uuid.uuid4().hex
+    elif not force:
+        with _created_lock:
+            created = _created_forms.get(key)
+            if created is not None:
+                _created_forms.move_to_end(key)
+        if created is not None:
+            logger.info(f"Форма уже создана ранее: {created['form_id']}")
+            return created
+    marker = form_marker(key)
+    body = with_marker(typeform_json, marker)
+    started = time.time()
+
+    def post():
+        response = get_http_session().post(
+            TYPEFORM_FORMS_URL, headers=headers, json=body, timeout=HTTP_TIMEOUT
+        )
+        _trace_sizes(response)
         if not response.ok:
             logger.error(f"Ошибка Typeform API: {response.status_code} {response.text}")
             response.raise_for_status()
         data = response.json()
-        logger.info(f"Форма успешно создана: {data.get('id')}")
         return {
             "form_id": data.get("id"),
             "form_url": data.get("_links", {}).get("display")
         }
+
+    def recover(error):
+        try:
+            return find_created_form(typeform_json.get("title", ""), marker, started, headers)
+        except Exception as e:
+            logger.warning(f"Не удалось проверить, создана ли форма: {e}")
+            return None
+
+    try:
+        logger.info("Отправка формы в Typeform API...")
+        result = scheduler.call("typeform", post, recover=recover)
+        logger.info(f"Форма успешно создана: {result['form_id']}")
     except Exception as e:
         logger.error(f"Ошибка отправки в Typeform: {e}")
-        raise 
\ No newline at end of file
+        raise
+    if not remember:
+        return result
+    with _created_lock:
+        _created_forms[key] = result
+        _created_forms.move_to_end(key)
+        while len(_created_forms) > TYPEFORM_CREATED_MAX_ITEMS:
+            _created_forms.popitem(last=False)
+    return result
+
+
+def form_id_from_link(form_link):
+    """
+    ID формы из ссылки вида https://<account>.typeform.com/to/<id>; None, если ссылка не такая.
+    """
+    match = _FORM_LINK_RE.search(form_link or "")
+    return match.group(1) if match else None
+
+
+def update_typeform(form_id, typeform_json, typeform_api_key):
+    """
+    Заменяет содержимое существующей формы (PUT /forms/{id}) — ссылка для кандидатов не меняется.
+    Если форма удалена в Typeform, создаёт новую через send_to_typeform.
+    """
+    logger = logging.getLogger("json_builder")
+    headers = typeform_headers(typeform_api_key)
+
+    def put():
+        response = get_http_session().put(
+            f"{TYPEFORM_FORMS_URL}/{form_id}", headers=headers, json=typeform_json, timeout=HTTP_TIMEOUT
+        )
+        _trace_sizes(response)
+        if response.status_code == 404:
+            return None
+        if not response.ok:
+            logger.error(f"Ошибка Typeform API: {response.status_code} {response.text}")
+            response.raise_for_status()
+        data = response.json()
+        return {
+            "form_id": data.get("id", form_id),
+            "form_url": data.get("_links", {}).get("display")
+        }
+
+    logger.info(f"Обновление формы {form_id} в Typeform API...")
+    result = scheduler.call("typeform", put)
+    if result is None:
+        logger.warning(f"Форма {form_id} не найдена в Typeform, создаётся новая")
+        return send_to_typeform(typeform_json, typeform_api_key, force=True)
+    logger.info(f"Форма {form_id} обновлена")
+    return result
+
+
+def register_webhook(form_id, must_haves, typeform_api_key):
+    """
+    Создаёт или обновляет (PUT идемпотентен) вебхук формы на TYPEFORM_WEBHOOK_URL.
+    must_haves передаётся в query-параметре, как и в redirect_url.
+    """
+    logger = logging.getLogger("json_builder")
+    headers = typeform_headers(typeform_api_key)
+    separator = "&" if "?" in TYPEFORM_WEBHOOK_URL else "?"
+    body = {
+        "url": f"{TYPEFORM_WEBHOOK_URL}{separator}must_haves={quote(must_haves, safe='')}",
+        "enabled": True,
+        "verify_ssl": True,
+    }
+    if TYPEFORM_WEBHOOK_SECRET:
+        body["secret"] = TYPEFORM_WEBHOOK_SECRET
+
+    def put():
+        response = get_http_session().put(
+            f"{TYPEFORM_FORMS_URL}/{form_id}/webhooks/{TYPEFORM_WEBHOOK_TAG}",
+            headers=headers, json=body, timeout=HTTP_TIMEOUT
+        )
+        if not response.ok:
+            logger.error(f"Ошибка Typeform API: {response.status_code} {response.text}")
+            response.raise_for_status()
+
+    scheduler.call("typeform", put)
+    logger.info(f"Вебхук формы {form_id} зарегистрирован")
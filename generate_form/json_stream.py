@@ -0,0 +1,97 @@
+"""
+Модуль json_stream: инкрементальный разбор JSON из потокового ответа OpenAI.
+Находит начало JSON после пояснений или ```json, следит за скобками и строками
+и сообщает о структурной ошибке сразу, не дожидаясь конца генерации.
+"""
+
+import json
+
+_OPENERS = {"{": "}", "[": "]"}
+_CLOSERS = frozenset("}]")
+# Символы, допустимые в JSON вне строк: структура, числа, true/false/null, пробелы
+_BARE_CHARS = frozenset("{}[],:-+.0123456789eEtrufalsn \t\r\n")
+
+
+class JsonStreamError(ValueError):
+    """Поток точно не содержит валидного JSON — генерацию можно прерывать."""
+
+
+class JsonStreamScanner:
+    """
+    feed(chunk) — добавить фрагмент ответа; complete — JSON-значение закрыто;
+    result() — текст JSON без обёртки (код-блока, пояснений до и после).
+    """
+
+    def __init__(self, max_preamble=200):
+        self.max_preamble = max_preamble
+        self._parts = []
+        self._preamble = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.complete = False
+
+    def feed(self, chunk):
+        if self.complete:
+            return
+        for idx, ch in enumerate(chunk):
+            if not self._started:
+                if ch in _OPENERS:
+                    self._started = True
+                    self._stack.append(_OPENERS[ch])
+                    self._parts.append(chunk[idx:])
+                    self._scan(chunk, idx + 1)
+                    return
+                self._preamble += 1
+                if self._preamble > self.max_preamble:
+                    raise JsonStreamError(f"Нет начала JSON в первых {self.max_preamble} символах ответа")
+                continue
+        if self._started:
+            self._parts.append(chunk)
+            self._scan(chunk, 0)
+
+    def _scan(self, chunk, start):
+        for idx in range(start, len(chunk)):
+            ch = chunk[idx]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in _OPENERS:
+                self._stack.append(_OPENERS[ch])
+            elif ch in _CLOSERS:
+                if not self._stack or self._stack.pop() != ch:
+                    raise JsonStreamError(f"Непарная скобка '{ch}' в JSON")
+                if not self._stack:
+                    self.complete = True
+                    # Всё после закрывающей скобки (``` или пояснения) отбрасываем
+                    tail = len(chunk) - idx - 1
+                    if tail:
+                        self._parts[-1] = self._parts[-1][:-tail]
+                    return
+            elif ch not in _BARE_CHARS:
+                raise JsonStreamError(f"Недопустимый символ {ch!r} вне строки JSON")
+
+    def result(self):
+        """
+        Возвращает текст JSON. Бросает JsonStreamError, если значение не закрыто.
+        """
+        if not self.complete:
+            raise JsonStreamError("Ответ оборвался до конца JSON")
+        return "".join(self._parts)
+
+
+def extract_json(text, max_preamble=200):
+    """
+    Разбирает JSON из полного текста ответа, допуская обёртку ```json и пояснения вокруг.
+    """
+    scanner = JsonStreamScanner(max_preamble)
+    scanner.feed(text)
+    return json.loads(scanner.result())
@@ -1,96 +1,353 @@
+import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import jsonify, Request
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
+import gpt_archive
+import gpt_cache
+from gpt_client import get_metrics
+import config_loader
+import pipeline
+import prompt_builder
+import text_parsing
+import scheduler
+import tracing
+from pipeline import Stage, PipelineError
+from clients import get_sheets_service
 from question_builder import generate_questions_gpt
 from logic_generator import generate_logic_gpt
-from json_builder import generate_form_json, send_to_typeform, sanitize_redirect_url, basic_manual_check
+from json_builder import (
+    generate_form_json, send_to_typeform, update_typeform, form_id_from_link, register_webhook, idempotency_key,
+    sanitize_redirect_url, basic_manual_check, with_form_id
+)
+from form_compiler import build_form_shell, attach_logic, form_title, form_ruleset, FormCompileError
+from form_validator import FormValidationError
 from settings import (
-    SHEET_NAME, CONFIG_SHEET, COLUMN_JOB_DESC, COLUMN_MUST_HAVES, COLUMN_QUESTIONS, COLUMN_FORM_LINK,
+    SHEET_NAME, COLUMN_JOB_DESC, COLUMN_MUST_HAVES, COLUMN_QUESTIONS, COLUMN_FORM_LINK, COLUMN_FINGERPRINT,
     QUESTIONS_PROMPT_CELL, LOGIC_PROMPT_CELL, DEFAULT_QUESTIONS_PROMPT, DEFAULT_LOGIC_PROMPT,
     REGION, PROJECT, GOOGLE_SHEET_ID, GOOGLE_CREDS_PATH, OPENAI_API_KEY, TYPEFORM_API_KEY, PROCESS_SUBMISSION_URL,
-    FAIL_URL, FORM_PROMPT_CELL
+    FAIL_URL, FORM_PROMPT_CELL, BATCH_MAX_ROWS, BATCH_MAX_WORKERS, FORM_COMPILER, TYPEFORM_WEBHOOK_URL,
+    METRICS_ENDPOINT, RULESETS_SHEET
 )
 
-logging.basicConfig(level=logging.INFO)
+tracing.configure_logging()
 logger = logging.getLogger("main")
 
+# Версии наборов правил, уже записанные этим инстансом в RULESETS_SHEET
+_rulesets_lock = threading.Lock()
+_written_rulesets = set()
+
 # --- Cloud Function ---
-def get_sheets_service():
-    creds = service_account.Credentials.from_service_account_file(
-        GOOGLE_CREDS_PATH,
-        scopes=['https://www.googleapis.com/auth/spreadsheets']
-    )
-    service = build('sheets', 'v4', credentials=creds)
-    return service.spreadsheets()
-
-def read_row(row_id):
-    sheet = get_sheets_service()
-    ranges = [
-        f"{SHEET_NAME}!{COLUMN_JOB_DESC}{row_id}:{COLUMN_MUST_HAVES}{row_id}",  # C и D
-        f"{SHEET_NAME}!{COLUMN_FORM_LINK}{row_id}"  # H
-    ]
-    result = sheet.values().batchGet(spreadsheetId=GOOGLE_SHEET_ID, ranges=ranges).execute()
-    values = result.get('valueRanges', [])
-    job_desc = values[0]['values'][0][0] if len(values) > 0 and 'values' in values[0] else ''
-    must_haves = values[0]['values'][0][1] if len(values) > 0 and 'values' in values[0] and len(values[0]['values'][0]) > 1 else ''
-    form_link = values[1]['values'][0][0] if len(values) > 1 and 'values' in values[1] else ''
-    return job_desc, must_haves, form_link
-
-def write_to_sheet(cell, value):
+def parse_row_ids(value):
+    """
+    Разбирает row_ids: диапазон '5-180', список '5,7,9' или их комбинацию '5-10,12'.
+    Возвращает отсортированный список уникальных номеров строк.
+    """
+    row_ids = set()
+    for part in str(value).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(x) for x in part.split('-', 1))
+            if start > end:
+                raise ValueError(f"Некорректный диапазон строк: {part}")
+            # Размер проверяется до разворачивания: '1-999999999' не должен занять память инстанса
+            if len(row_ids) + end - start + 1 > BATCH_MAX_ROWS:
+                raise ValueError(f"Слишком много строк в пакете (максимум {BATCH_MAX_ROWS})")
+            row_ids.update(range(start, end + 1))
+        else:
+            row_ids.add(int(part))
+    if not row_ids:
+        raise ValueError("row_ids не содержит ни одной строки")
+    if min(row_ids) < 1:
+        raise ValueError("Номера строк должны быть положительными")
+    if len(row_ids) > BATCH_MAX_ROWS:
+        raise ValueError(f"Слишком много строк в пакете: {len(row_ids)} (максимум {BATCH_MAX_ROWS})")
+    return sorted(row_ids)
+
+def write_links(links):
+    """
+    Записывает ссылки на формы и их отпечатки для нескольких строк одним batchUpdate.
+    links: dict row_id -> (form_url, fingerprint)
+    """
+    if not links:
+        return
     sheet = get_sheets_service()
-    sheet.values().update(
-        spreadsheetId=GOOGLE_SHEET_ID,
-        range=cell,
-        valueInputOption='RAW',
-        body={'values': [[value]]}
-    ).execute()
-
-def read_config(cell):
+    data = []
+    for row_id, (form_url, fingerprint) in links.items():
+        data.append({"range": f"{COLUMN_FORM_LINK}{row_id}", "values": [[form_url]]})
+        data.append({"range": f"{COLUMN_FINGERPRINT}{row_id}", "values": [[fingerprint]]})
+    with tracing.span("sheet_write", cells=len(data)):
+        scheduler.call("sheets", sheet.values().batchUpdate(
+            spreadsheetId=GOOGLE_SHEET_ID,
+            body={"valueInputOption": "RAW", "data": data}
+        ).execute)
+
+def write_ruleset(version, must_haves, refs):
+    """
+    Дописывает набор правил формы (версия, must-haves, ref ответов) в RULESETS_SHEET —
+    по нему process_submission разбирает компактный redirect_url. Набор с той же версией
+    одинаков, поэтому повторная запись (другой инстанс) безвредна, а в пределах инстанса пропускается.
+    """
+    with _rulesets_lock:
+        if version in _written_rulesets:
+            return
     sheet = get_sheets_service()
-    range_ = f"{CONFIG_SHEET}!{cell}"
-    result = sheet.values().get(spreadsheetId=GOOGLE_SHEET_ID, range=range_).execute()
-    values = result.get('values', [[]])
-    return values[0][0] if values and values[0] else ''
+    with tracing.span("ruleset_write", version=version):
+        scheduler.call("sheets", sheet.values().append(
+            spreadsheetId=GOOGLE_SHEET_ID,
+            range=f"{RULESETS_SHEET}!A1",
+            valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
+            body={'values': [[version, must_haves, json.dumps(refs)]]}
+        ).execute)
+    with _rulesets_lock:
+        _written_rulesets.add(version)
+
+def build_stages(job_desc, must_haves, prompts, form_id=None, force=False, key=None):
+    """
+    Граф этапов генерации одной формы:
+
+        budget ─> questions ──┬─> logic ──────┐
+                              └─> form_shell ─┴─> form_json -> validation -> typeform -> webhook
+                                      └─> ruleset ───────────────────────────────┘
+
+    Вопросы по бюджету строятся локально (QUESTION_BUILDER=hybrid), поэтому questions
+    ждёт budget — мгновенный разбор must-haves. Каркас формы (поля, thankyou-экраны
+    с redirect_url) не зависит от логики и собирается параллельно с её генерацией. Квоты и параллельность внешних API
+    соблюдает scheduler на уровне отдельных запросов. С form_id существующая форма
+    обновляется на месте, иначе создаётся новая (force — даже если этот инстанс уже
+    создавал форму с тем же ключом идемпотентности key, см. generate_row); redirect_url формы
+    несёт её form_id (with_form_id), поэтому новая форма после создания обновляется ещё раз. Этап webhook регистрирует вебхук
+    process_submission, если задан TYPEFORM_WEBHOOK_URL. Этап ruleset записывает набор правил
+    компактного redirect_url до создания формы — кандидат не может ответить раньше.
+    """
+    def questions(budget):
+        return generate_questions_gpt(job_desc, must_haves, prompts["questions"], OPENAI_API_KEY, budget)
+
+    def logic(questions, budget):
+        return generate_logic_gpt(
+            questions, must_haves, prompts["logic"], OPENAI_API_KEY, budget, FAIL_URL, PROCESS_SUBMISSION_URL
+        )
+
+    def form_shell(questions):
+        if FORM_COMPILER != "local":
+            return None
+        try:
+            return build_form_shell(questions, form_title(job_desc), must_haves)
+        except FormCompileError as e:
+            logger.warning(f"Локальная сборка формы не удалась, используется GPT: {e}")
+            return None
+
+    def ruleset(form_shell):
+        rules = form_ruleset(form_shell["fields"], must_haves) if form_shell is not None else None
+        if rules:
+            write_ruleset(rules[0], must_haves, rules[1])
+            return rules[0]
+        return None
+
+    def form_json(questions, logic, form_shell):
+        # Локальная сборка; GPT по промпту B6 — запасной путь
+        if form_shell is not None:
+            return attach_logic(form_shell, logic)
+        return sanitize_redirect_url(generate_form_json(questions, logic, prompts["form"], OPENAI_API_KEY))
+
+    def validation(form_json):
+        basic_manual_check(form_json)
+
+    def typeform(form_json, validation, ruleset):
+        if form_id:
+            return update_typeform(form_id, with_form_id(form_json, form_id), TYPEFORM_API_KEY)
+        created = send_to_typeform(form_json, TYPEFORM_API_KEY, key=key, force=force)
+        # id новой формы известен только после создания — redirect_url получает его вторым запросом
+        final_json = with_form_id(form_json, created["form_id"])
+        if final_json == form_json:
+            return created
+        updated = update_typeform(created["form_id"], final_json, TYPEFORM_API_KEY)
+        return {"form_id": created["form_id"], "form_url": updated.get("form_url") or created["form_url"]}
+
+    def webhook(typeform):
+        if TYPEFORM_WEBHOOK_URL and typeform.get("form_id"):
+            register_webhook(typeform["form_id"], must_haves, TYPEFORM_API_KEY)
+
+    return [
+        Stage("budget", lambda: text_parsing.parse_must_haves(must_haves).budget_label),
+        Stage("questions", questions, deps=("budget",)),
+        Stage("logic", logic, deps=("questions", "budget")),
+        Stage("form_shell", form_shell, deps=("questions",)),
+        Stage("form_json", form_json, deps=("questions", "logic", "form_shell")),
+        Stage("validation", validation, deps=("form_json",)),
+        Stage("ruleset", ruleset, deps=("form_shell",)),
+        Stage("typeform", typeform, deps=("form_json", "validation", "ruleset")),
+        Stage("webhook", webhook, deps=("typeform",)),
+    ]
+
+def run_pipeline(job_desc, must_haves, prompts, form_id=None, force=False, key=None):
+    """
+    Генерирует форму для одной вакансии по графу build_stages.
+    Возвращает (form_url, timings). Запись в таблицу выполняет вызывающий код.
+    """
+    if gpt_archive.RECORD:
+        gpt_archive.record_input(job_desc, must_haves, prompts)
+    results, timings = pipeline.run(build_stages(job_desc, must_haves, prompts, form_id, force, key))
+    return results["typeform"].get('form_url'), timings
+
+def generate_row(row, prompts, use_cache=True, force=False, row_id=None):
+    """
+    Идемпотентная генерация формы для строки (job_desc, must_haves, form_link, fingerprint).
+    Отпечаток не изменился — возвращается существующая ссылка без вызова GPT и Typeform;
+    изменился — существующая форма обновляется, ссылки нет — создаётся новая. Создание
+    идемпотентно по (row_id, отпечаток): повтор запроса для той же строки не создаёт вторую форму.
+    Возвращает dict: action (skipped|updated|created), form_url, fingerprint, timings.
+    """
+    job_desc, must_haves, form_link, stored_fingerprint = row
+    fingerprint = config_loader.row_fingerprint(job_desc, must_haves, prompts)
+    form_id = form_id_from_link(form_link)
+    if form_id and fingerprint == stored_fingerprint and not force:
+        return {"action": "skipped", "form_url": form_link, "fingerprint": fingerprint, "timings": None}
+    with gpt_cache.bypass(not use_cache):
+        key = idempotency_key(row_id, fingerprint) if row_id is not None else None
+        form_url, timings = run_pipeline(job_desc, must_haves, prompts, form_id, force, key)
+    action = "updated" if form_id else "created"
+    return {"action": action, "form_url": form_url or form_link, "fingerprint": fingerprint, "timings": timings}
+
+def generate_forms_batch(row_ids, use_cache=True, refresh_prompts=False, force=False):
+    """
+    Пакетная генерация форм: одно чтение строк, параллельный пайплайн, одна запись ссылок.
+    Строки с неизменившимся отпечатком пропускаются (см. generate_row).
+    Ошибка в одной строке не прерывает пакет — она попадает в результаты этой строки.
+    """
+    rows, prompts = config_loader.load(row_ids, refresh_prompts)
+    return generate_rows(rows, prompts, use_cache, force)
+
+def generate_rows(rows, prompts, use_cache=True, force=False):
+    """
+    Генерирует формы для уже прочитанных строк (dict row_id -> row) и записывает ссылки
+    одним batchUpdate. Возвращает результаты по строкам в порядке row_id.
+    """
+    row_ids = sorted(rows)
+    if not row_ids:
+        return []
+
+    @tracing.propagate
+    def process(row_id):
+        try:
+            with tracing.span("row", row_id=row_id) as span:
+                result = generate_row(rows[row_id], prompts, use_cache, force, row_id)
+                span.attrs["action"] = result["action"]
+            return {"row_id": row_id, "ok": True, "error": None, **result}
+        except Exception as e:
+            logger.error(f"Ошибка генерации формы для строки {row_id}: {e}")
+            return {"row_id": row_id, "ok": False, "form_url": None, **error_details(e)}
+
+    with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(row_ids))) as pool:
+        results = list(pool.map(process, row_ids))
+
+    links = {
+        result["row_id"]: (result["form_url"], result["fingerprint"])
+        for result in results if result["ok"] and result["action"] != "skipped"
+    }
+    try:
+        write_links(links)
+    except Exception as e:
+        logger.error(f"Ошибка записи ссылок в таблицу: {e}")
+        for result in results:
+            if result["row_id"] in links:
+                result["write_error"] = str(e)
+    skipped = sum(1 for result in results if result.get("action") == "skipped")
+    logger.info(f"Пакет обработан: {len(links)} форм создано или обновлено, {skipped} без изменений, "
+                f"всего строк {len(row_ids)}")
+    return results
+
+def error_details(error):
+    """
+    Описание ошибки для JSON-ответа: этап, тайминги до сбоя и ошибки валидации формы.
+    """
+    details = {"error": str(error)}
+    if isinstance(error, PipelineError):
+        details.update({"error": str(error.error), "stage": error.stage, "timings": error.report})
+        error = error.error
+    if isinstance(error, FormValidationError):
+        details["validation_errors"] = error.errors
+    if isinstance(error, scheduler.CircuitOpenError):
+        details["retry_after"] = round(error.retry_after)
+    return details
 
 # --- Основная функция Cloud Function ---
 def generate_form(request: Request):
     args = request.args if request.method == 'GET' else request.form
+    with tracing.trace("generate_form", row_id=args.get("row_id"), row_ids=args.get("row_ids")) as trace:
+        response = handle_generate_form(args)
+        trace.attrs["status"] = response[1] if isinstance(response, tuple) else 200
+    return response
+
+def handle_generate_form(args):
     row_id = args.get("row_id")
+    row_ids = args.get("row_ids")
+    # no_cache=1 — не читать кэш OpenAI; invalidate_cache=all|questions|logic|form — очистить кэш
+    use_cache = args.get("no_cache") not in ("1", "true")
+    invalidate = args.get("invalidate_cache")
+    if invalidate:
+        gpt_cache.invalidate(None if invalidate == "all" else invalidate)
+    # refresh_prompts=1 — перечитать промпты из таблицы, не дожидаясь истечения PROMPTS_CACHE_TTL
+    refresh_prompts = args.get("refresh_prompts") in ("1", "true")
+    # force=1 — пересобрать форму, даже если отпечаток строки не изменился
+    force = args.get("force") in ("1", "true")
+    if row_ids:
+        try:
+            row_ids = parse_row_ids(row_ids)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        logger.info(f"Получен пакетный запрос: {len(row_ids)} строк")
+        try:
+            results = generate_forms_batch(row_ids, use_cache, refresh_prompts, force)
+            failed = sum(1 for result in results if not result["ok"])
+            return jsonify({
+                "ok": failed == 0, "total": len(results), "failed": failed, "results": results,
+                "gpt_cache": gpt_cache.get_stats(), "gpt_metrics": get_metrics(),
+                "prompt_tokens": prompt_builder.get_stats()
+            })
+        except Exception as e:
+            logger.error(f"Ошибка: {e}")
+            return jsonify({"error": str(e)}), 500
     if not row_id:
         return jsonify({"error": "row_id обязателен"}), 400
     logger.info(f"Получен запрос: row_id={row_id}")
     try:
-        job_desc, must_haves, form_link = read_row(row_id)
-        prompt_questions = read_config(QUESTIONS_PROMPT_CELL) or DEFAULT_QUESTIONS_PROMPT
-        prompt_logic = read_config(LOGIC_PROMPT_CELL) or ""
-        prompt_form = read_config(FORM_PROMPT_CELL) or DEFAULT_QUESTIONS_PROMPT
-        # 1. Генерируем вопросы через OpenAI
-        questions = generate_questions_gpt(job_desc, must_haves, prompt_questions, OPENAI_API_KEY)
-        # Получаем значения для логики
-        budget = None
-        for line in must_haves.split('\n'):
-            if 'budget' in line.lower() or 'бюджет' in line.lower():
-                import re
-                match = re.search(r'(\d+[\.,]?\d*)', line)
-                if match:
-                    budget = match.group(1)
-        fail_url = FAIL_URL
-        quiz_url = PROCESS_SUBMISSION_URL
-        # 2. Генерируем логику через OpenAI
-        logic = generate_logic_gpt(questions, must_haves, prompt_logic, OPENAI_API_KEY, budget, fail_url, quiz_url)
-        # 3. Генерируем финальный JSON формы через OpenAI
-        form_json = generate_form_json(questions, logic, prompt_form, OPENAI_API_KEY)
-        # 4. Минимальная ручная проверка и замена плейсхолдеров
-        form_json = sanitize_redirect_url(form_json)
-        basic_manual_check(form_json)
-        # 5. Отправляем в Typeform
-        response = send_to_typeform(form_json, TYPEFORM_API_KEY)
-        form_url = response.get('form_url')
-        form_link_cell = f"{COLUMN_FORM_LINK}{row_id}"
-        write_to_sheet(form_link_cell, form_url)
-        logger.info(f"Ссылка на форму записана в {form_link_cell}")
-        return jsonify({"ok": True, "form_url": form_url})
+        started = time.perf_counter()
+        rows, prompts = config_loader.load([row_id], refresh_prompts)
+        sheet_read_ms = round((time.perf_counter() - started) * 1000, 1)
+        result = generate_row(rows[row_id], prompts, use_cache, force, row_id)
+        timings = result["timings"] or {}
+        if result["action"] == "skipped":
+            logger.info(f"Строка {row_id} не изменилась, используется существующая форма")
+        else:
+            started = time.perf_counter()
+            write_links({row_id: (result["form_url"], result["fingerprint"])})
+            logger.info(f"Ссылка на форму записана в {COLUMN_FORM_LINK}{row_id}")
+            timings["sheet_write_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        timings["sheet_read_ms"] = sheet_read_ms
+        return jsonify({
+            "ok": True, "action": result["action"], "form_url": result["form_url"],
+            "prompts_version": prompts["version"], "timings": timings,
+            "gpt_cache": gpt_cache.get_stats(), "gpt_metrics": get_metrics(),
+            "prompt_tokens": prompt_builder.get_stats()
+        })
     except Exception as e:
         logger.error(f"Ошибка: {e}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        details = error_details(e)
+        if "validation_errors" in details:
+            return jsonify(details), 422
+        if "retry_after" in details:
+            return jsonify(details), 503, {"Retry-After": str(details["retry_after"])}
+        return jsonify(details), 500
+
+def metrics(request: Request):
+    """
+    Метрики инстанса в текстовом формате Prometheus (включается METRICS_ENDPOINT).
+    """
+    if not METRICS_ENDPOINT:
+        return jsonify({"error": "метрики отключены (METRICS_ENDPOINT)"}), 404
+    return tracing.render_prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
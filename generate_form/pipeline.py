@@ -0,0 +1,122 @@
+"""
+Модуль pipeline: выполнение этапов генерации как графа зависимостей.
+Независимые этапы идут параллельно в потоках; для каждого этапа замеряется время,
+а по завершении восстанавливается критический путь.
+"""
+
+import contextvars
+import time
+import tracing
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Stage:
+    """
+    Этап графа: fn вызывается с результатами этапов из deps в виде именованных аргументов.
+    """
+
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+
+class PipelineError(Exception):
+    """Этап упал; stage — его имя, report — тайминги уже выполненных этапов."""
+
+    def __init__(self, stage, error, report):
+        self.stage = stage
+        self.error = error
+        self.report = report
+        super().__init__(f"Этап {stage}: {error}")
+
+
+def _check_graph(stages):
+    names = {stage.name for stage in stages}
+    if len(names) != len(stages):
+        raise ValueError("Имена этапов должны быть уникальными")
+    for stage in stages:
+        missing = set(stage.deps) - names
+        if missing:
+            raise ValueError(f"Этап {stage.name} зависит от неизвестных этапов: {', '.join(sorted(missing))}")
+
+
+def critical_path(stages, timings):
+    """
+    Цепочка этапов, определившая общее время: от последнего завершившегося этапа назад
+    по зависимости, завершившейся позже остальных.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    done = [name for name in timings if "end" in timings[name]]
+    if not done:
+        return []
+    path = [max(done, key=lambda name: timings[name]["end"])]
+    while True:
+        deps = [dep for dep in by_name[path[-1]].deps if dep in timings]
+        if not deps:
+            break
+        path.append(max(deps, key=lambda name: timings[name]["end"]))
+    return path[::-1]
+
+
+def _report(stages, timings, started):
+    return {
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "stages": {
+            name: {
+                "start_ms": round(t["start"] * 1000, 1),
+                "duration_ms": round((t["end"] - t["start"]) * 1000, 1),
+            }
+            for name, t in timings.items() if "end" in t
+        },
+        "critical_path": critical_path(stages, timings),
+    }
+
+
+def run(stages, max_workers=4):
+    """
+    Выполняет граф этапов. Возвращает (results, report): results — dict имя -> результат,
+    report — total_ms, start_ms/duration_ms каждого этапа и critical_path.
+    При ошибке этапа новые этапы не запускаются, бросается PipelineError.
+    Этапы видят contextvars вызывающего потока (gpt_cache.bypass, текущий trace):
+    каждый выполняется в своей копии контекста на момент вызова run.
+    """
+    _check_graph(stages)
+    context = contextvars.copy_context()
+    started = time.perf_counter()
+    results, timings = {}, {}
+    pending = list(stages)
+    running = {}
+
+    def call(stage):
+        timings[stage.name] = {"start": time.perf_counter() - started}
+        try:
+            with tracing.span(stage.name):
+                return stage.fn(**{dep: results[dep] for dep in stage.deps})
+        finally:
+            timings[stage.name]["end"] = time.perf_counter() - started
+
+    def submit(pool, stage):
+        # Потоки пула не наследуют contextvars: без копии этап не увидит no_cache=1
+        # и запишет спаны мимо trace запроса
+        return pool.submit(context.copy().run, call, stage)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            ready = [stage for stage in pending if all(dep in results for dep in stage.deps)]
+            for stage in ready:
+                pending.remove(stage)
+                running[submit(pool, stage)] = stage
+            if not running:
+                raise ValueError("Граф этапов содержит цикл: " + ", ".join(stage.name for stage in pending))
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    for other in running:
+                        other.cancel()
+                    wait(running)
+                    raise PipelineError(stage.name, error, _report(stages, timings, started)) from error
+                results[stage.name] = future.result()
+    return results, _report(stages, timings, started)
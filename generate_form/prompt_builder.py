@@ -0,0 +1,183 @@
+"""
+Модуль prompt_builder: сборка промптов этапов с бюджетом токенов.
+Входные данные сериализуются компактным JSON, каждому этапу передаются только нужные ему поля
+(этапу логики — ref, заголовок, тип и варианты ответа), а длинные тексты (описание вакансии)
+сжимаются и обрезаются до бюджета этапа PROMPT_BUDGETS. Токены считаются локально:
+tiktoken, если установлен, иначе оценка по длине текста.
+"""
+
+import json
+import logging
+import re
+import threading
+import tracing
+from settings import GPT_MODEL, PROMPT_BUDGETS
+
+logger = logging.getLogger("prompt_builder")
+
+# Оценка без tiktoken: ~4 символа на токен
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARK = " …"
+
+_WHITESPACE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def compact_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _get_encoding():
+    """
+    Кодировка tiktoken для GPT_MODEL; False, если tiktoken не установлен.
+    """
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    try:
+                        _encoding = tiktoken.encoding_for_model(GPT_MODEL)
+                    except KeyError:
+                        _encoding = tiktoken.get_encoding("cl100k_base")
+                except ImportError:
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def squeeze(text):
+    """
+    Схлопывает пробелы и пустые строки, убирает повторяющиеся строки — без потери смысла.
+    """
+    seen = set()
+    lines = []
+    for line in _BLANK_LINES.sub("\n", _WHITESPACE.sub(" ", text or "")).split("\n"):
+        line = line.strip()
+        key = line.lower()
+        if line and key not in seen:
+            seen.add(key)
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def truncate(text, max_tokens):
+    """
+    Обрезает текст до max_tokens по границе строки или слова, с пометкой об обрезке.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    max_tokens = max(0, max_tokens - count_tokens(TRUNCATION_MARK))
+    encoding = _get_encoding()
+    if encoding:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        cut = text[:max_tokens * CHARS_PER_TOKEN]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+def logic_view(questions):
+    """
+    Вопросы для этапа логики: ref (тот же, что выдаст form_compiler), заголовок, тип и варианты.
+    Текстов подсказок, описаний и прочих свойств логике не нужно.
+    """
+    # Импорт здесь: form_compiler зависит от json_builder, который использует этот модуль
+    from form_compiler import compile_field, questions_list, FormCompileError
+    try:
+        items = questions_list(questions)
+    except FormCompileError:
+        return questions
+    view, used_refs = [], set()
+    for idx, question in enumerate(items):
+        try:
+            field = compile_field(question, idx, used_refs)
+        except FormCompileError:
+            view.append(question)
+            continue
+        item = {"ref": field["ref"], "title": field["title"], "type": field["type"]}
+        choices = field.get("properties", {}).get("choices")
+        if choices:
+            item["choices"] = [choice["label"] for choice in choices]
+        view.append(item)
+    return view
+
+
+def build(stage, template, sections):
+    """
+    Собирает промпт этапа: template (промпт из таблицы, не сокращается) и sections —
+    список (заголовок, значение, shrink). Значение-строка передаётся как есть, прочее —
+    компактным JSON. Секции с shrink=True сжимаются, а если промпт больше бюджета этапа,
+    самые длинные из них обрезаются до общей длины. Возвращает текст промпта.
+    """
+    budget = PROMPT_BUDGETS.get(stage)
+    parts = []
+    raw_tokens = count_tokens(template)
+    for title, value, shrink in sections:
+        text = value if isinstance(value, str) else compact_json(value)
+        # Прежний промпт: repr Python-объекта и нетронутый текст
+        raw_tokens += count_tokens(value if isinstance(value, str) else str(value))
+        if shrink:
+            text = squeeze(text)
+        parts.append([title, text, shrink])
+
+    def render():
+        return "\n".join([template] + [f"{title}: {text}" for title, text, _ in parts])
+
+    prompt = render()
+    tokens = count_tokens(prompt)
+    truncated = False
+    if budget and tokens > budget:
+        shrinkable = sorted((part for part in parts if part[2]), key=lambda part: -count_tokens(part[1]))
+        sizes = [count_tokens(part[1]) for part in shrinkable]
+        excess = tokens - budget
+        # Общая длина level, до которой обрезаются самые длинные секции: превышение делится между
+        # ними поровну, а секции короче level остаются целиком
+        level = total = 0
+        for n, size in enumerate(sizes):
+            total += size
+            level = (total - excess) // (n + 1)
+            if n + 1 == len(sizes) or level >= sizes[n + 1]:
+                break
+        for part, size in zip(shrinkable, sizes):
+            if size > level:
+                part[1] = truncate(part[1], level)
+                truncated = True
+        prompt = render()
+        tokens = count_tokens(prompt)
+        if tokens > budget:
+            logger.warning(f"Этап {stage}: промпт {tokens} токенов больше бюджета {budget} и после сокращения")
+    saved = max(0, raw_tokens - tokens)
+    with _stats_lock:
+        s = _stats.setdefault(stage, {"prompts": 0, "tokens": 0, "tokens_saved": 0, "truncated": 0})
+        s["prompts"] += 1
+        s["tokens"] += tokens
+        s["tokens_saved"] += saved
+        s["truncated"] += int(truncated)
+    tracing.add(prompt_tokens_local=tokens, prompt_tokens_saved=saved)
+    return prompt
+
+
+def get_stats():
+    """
+    По этапам за время жизни инстанса: prompts, tokens (локальный подсчёт), tokens_saved
+    (против repr и несжатых текстов) и truncated — сколько промптов обрезано до бюджета.
+    """
+    with _stats_lock:
+        return {stage: dict(s) for stage, s in _stats.items()}
@@ -1,56 +1,132 @@
 """
-Модуль question_builder: генерация вопросов для формы через OpenAI.
+Модуль question_builder: генерация вопросов для формы.
+В режиме hybrid (QUESTION_BUILDER) вопросы по must-haves, бюджету и контактам собираются
+локально по шаблону, а OpenAI генерирует только открытые вопросы по специфике вакансии.
 """
 
 import logging
-import openai
-from settings import DEFAULT_QUESTIONS_PROMPT, OPENAI_API_KEY
 import re
+import prompt_builder
+import text_parsing
+from gpt_client import complete_json
+from settings import DEFAULT_QUESTIONS_PROMPT, OPENAI_API_KEY, QUESTION_BUILDER
 
+MUSTHAVE_REF_PREFIX = "musthave_"
+SALARY_REF = "salary"
+BUDGET_REF = "budget_accept"
+YES_NO = ["Да", "Нет"]
+CONTACT_QUESTIONS = (
+    {"title": "Ваш email", "field_type": "email", "ref": "email", "required": True},
+    {"title": "Ваш телефон", "field_type": "phone_number", "ref": "phone", "required": True},
+)
+# Поля, которые строятся локально: от GPT такие вопросы отбрасываются как дубли
+TEMPLATED_REFS = {SALARY_REF, BUDGET_REF} | {q["ref"] for q in CONTACT_QUESTIONS}
+TEMPLATED_TYPES = {"email", "phone", "phone_number"}
+# Typeform ограничивает ref 255 символами
+MAX_REF_LENGTH = 240
 
-def ensure_must_have_questions(questions_list, must_haves):
+_WORD_RE = re.compile(r"\w+")
+
+OPEN_QUESTIONS_INSTRUCTION = (
+    "Вопросы про must haves (Да/Нет), зарплату, бюджет и контакты (email, телефон) уже есть в форме — "
+    "не добавляй их. Сгенерируй только открытые вопросы по специфике вакансии."
+)
+
+
+def must_have_ref(requirement, idx):
     """
-    Для каждого must-have, по которому нет вопроса, добавляет multiple_choice вопрос с Yes/No.
-    Убирает company name из вопросов.
+    Стабильный ref вопроса must-have: musthave_<slug требования> (кириллица — транслитом),
+    по нему process_submission находит ответ (rules.requirement_ref строит тот же ref).
     """
-    # Удаляем вопросы, которые совпадают с названием компании или формы
-    filtered_questions = [q for q in questions_list if not re.search(r'company|название компании|head of|e-commerce', q, re.IGNORECASE)]
-    # Добавляем must-have вопросы, если их нет
-    for must in must_haves:
-        found = any(must.lower() in q.lower() for q in filtered_questions)
-        if not found:
-            filtered_questions.append(f"Do you have: {must}? (Yes/No)")
-    return filtered_questions 
-
-def generate_questions_gpt(job_description, must_haves, prompt, openai_api_key):
+    slug = text_parsing.slugify(requirement)
+    return MUSTHAVE_REF_PREFIX + (slug[:MAX_REF_LENGTH] or str(idx + 1))
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def _mentions(title_words, requirement_words):
+    # Требование целиком, по границам слов: "Go" не находит "good", "R" — "algorithms"
+    size = len(requirement_words)
+    return size > 0 and any(
+        title_words[i:i + size] == requirement_words for i in range(len(title_words) - size + 1)
+    )
+
+
+def ensure_must_have_questions(questions_list, must_haves, budget=None):
+    """
+    Собирает итоговый список вопросов: must-have (Да/Нет, ref musthave_*), открытые вопросы
+    questions_list, зарплата и подтверждение бюджета (если в must-haves есть бюджет) и контакты.
+    Вопросы из questions_list, дублирующие шаблонные поля или требования, отбрасываются.
+    """
+    parsed = text_parsing.parse_must_haves(must_haves)
+    requirements = parsed.requirements
+    requirement_words = [_words(requirement) for requirement in requirements]
+    questions = [
+        {"title": f"{requirement}. Подходит?", "field_type": "multiple_choice",
+         "ref": must_have_ref(requirement, idx), "options": YES_NO, "required": True}
+        for idx, requirement in enumerate(requirements)
+    ]
+    for question in questions_list:
+        if isinstance(question, dict):
+            ref = str(question.get("ref") or "")
+            field_type = str(question.get("field_type") or question.get("type") or "").lower()
+            title = str(question.get("title") or question.get("question") or "")
+            if ref.startswith("musthave") or ref in TEMPLATED_REFS or field_type in TEMPLATED_TYPES:
+                continue
+        else:
+            title = str(question)
+        title_words = _words(title)
+        if any(_mentions(title_words, words) for words in requirement_words):
+            continue
+        questions.append(question)
+    budget = budget or parsed.budget_label
+    if budget is not None or parsed.has_budget:
+        questions.append({
+            "title": "Ваши ожидания по зарплате?", "field_type": "number", "ref": SALARY_REF, "required": True
+        })
+        questions.append({
+            "title": f"Наш бюджет {budget}, вы готовы на эти условия?" if budget else "Вы готовы на наш бюджет?",
+            "field_type": "multiple_choice", "ref": BUDGET_REF, "options": YES_NO, "required": True,
+        })
+    questions.extend(dict(question) for question in CONTACT_QUESTIONS)
+    return questions
+
+
+def _open_questions(result):
+    if isinstance(result, dict):
+        for key in ("questions", "fields"):
+            if isinstance(result.get(key), list):
+                return result[key]
+    return result if isinstance(result, list) else []
+
+
+def generate_questions_gpt(job_description, must_haves, prompt, openai_api_key, budget=None):
     """
-    Генерирует список вопросов для Typeform через OpenAI, используя промпт из B7.
-    Возвращает список вопросов (list of dict).
+    Генерирует список вопросов для Typeform, используя промпт из B7.
+    hybrid: OpenAI — только открытые вопросы, остальное — ensure_must_have_questions;
+    gpt: все вопросы генерирует OpenAI. Возвращает список вопросов (list of dict).
     """
     logger = logging.getLogger("question_builder")
     if not job_description or not must_haves or not prompt:
         logger.error("Отсутствуют обязательные входные данные для генерации вопросов.")
         raise ValueError("Необходимо указать описание вакансии, must-haves и промпт.")
-    must_have_list = [line.strip('-•: .').strip() for line in must_haves.split('\n') if line.strip()]
-    prompt_full = (
-        prompt + "\n"
-        f"Описание: {job_description}\nMust haves: {', '.join(must_have_list)}"
-    )
+    hybrid = QUESTION_BUILDER == "hybrid"
+    template = prompt + "\n" + OPEN_QUESTIONS_INSTRUCTION if hybrid else prompt
+    prompt_full = prompt_builder.build("questions", template, [
+        ("Описание", job_description, True),
+        ("Must haves", text_parsing.parse_must_haves(must_haves).lines, False),
+    ])
     try:
-        client = openai.OpenAI(api_key=openai_api_key)
-        messages = [
-            {"role": "system", "content": "Ты — генератор вопросов для Typeform API."},
-            {"role": "user", "content": prompt_full}
-        ]
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
-            temperature=0
+        questions = complete_json(
+            "questions", "Ты — генератор вопросов для Typeform API.", prompt_full, openai_api_key
         )
-        import json
-        questions = json.loads(response.choices[0].message.content)
-        logger.info(f"Сгенерирован список вопросов: {questions}")
+        if hybrid:
+            questions = ensure_must_have_questions(_open_questions(questions), must_haves, budget)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Сгенерирован список вопросов: {questions}")
         return questions
     except Exception as e:
         logger.error(f"Ошибка генерации вопросов через OpenAI: {e}")
-        raise 
\ No newline at end of file
+        raise
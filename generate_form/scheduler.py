@@ -0,0 +1,250 @@
+"""
+Модуль scheduler: общий планировщик исходящих запросов к OpenAI, Typeform и Google Sheets.
+Для каждого бэкенда — token bucket по квоте, лимит параллельности, повторы с джиттером
+и учётом Retry-After, circuit breaker.
+"""
+
+import logging
+import random
+import threading
+import time
+import tracing
+from settings import (
+    OPENAI_RPM, OPENAI_TPM, SHEETS_RPM, TYPEFORM_RPM,
+    OPENAI_MAX_CONCURRENCY, TYPEFORM_MAX_CONCURRENCY, SHEETS_MAX_CONCURRENCY,
+    SCHEDULER_MAX_RETRIES, SCHEDULER_BASE_DELAY, SCHEDULER_MAX_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+)
+
+logger = logging.getLogger("scheduler")
+
+RETRYABLE_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Сетевые ошибки requests/httpx/openai: запрос мог как дойти до сервера, так и нет
+_CONNECTION_ERROR_NAMES = frozenset((
+    "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "TimeoutError",
+    "APIConnectionError", "APITimeoutError", "RemoteDisconnected",
+))
+
+
+class CircuitOpenError(Exception):
+    """Бэкенд временно отключён после серии ошибок; retry_after — через сколько секунд пробовать."""
+
+    def __init__(self, backend, retry_after):
+        self.backend = backend
+        self.retry_after = retry_after
+        super().__init__(f"{backend} временно недоступен (circuit open), повторите через {retry_after:.0f} с")
+
+
+class TokenBucket:
+    """
+    rate токенов в секунду, не больше capacity накопленных. acquire блокирует, пока токенов не хватит.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold ошибок подряд) -> open -> (reset_timeout) -> half-open:
+    один пробный запрос; успех закрывает цепь, ошибка снова открывает.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Пропускает вызов или бросает CircuitOpenError. Возвращает True, если вызов — пробный (half-open).
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(self.name, max(remaining, 1.0))
+            self._trial = True
+            return True
+
+    def release_trial(self):
+        """
+        Пробный вызов завершился без вердикта (неповторяемая ошибка: 4xx, невалидный ответ) —
+        цепь остаётся открытой, следующий вызов снова может стать пробным.
+        """
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial:
+                    logger.warning(f"{self.name}: circuit open после {self._failures} ошибок подряд")
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self._trial else "open"
+
+
+class Backend:
+    def __init__(self, name, rpm, max_concurrency, tpm=None):
+        self.name = name
+        self.requests = TokenBucket(rpm / 60.0, max(1, rpm // 6))  # всплеск — до 10 секунд квоты
+        self.tokens = TokenBucket(tpm / 60.0, max(1, tpm // 6)) if tpm else None
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.breaker = CircuitBreaker(name)
+
+
+BACKENDS = {
+    "openai": Backend("openai", OPENAI_RPM, OPENAI_MAX_CONCURRENCY, tpm=OPENAI_TPM),
+    "typeform": Backend("typeform", TYPEFORM_RPM, TYPEFORM_MAX_CONCURRENCY),
+    "sheets": Backend("sheets", SHEETS_RPM, SHEETS_MAX_CONCURRENCY),
+}
+
+
+def _status(error):
+    # openai: status_code; requests.HTTPError: response.status_code; googleapiclient HttpError: resp.status
+    for status in (
+        getattr(error, "status_code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+        getattr(getattr(error, "resp", None), "status", None),
+    ):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def _retry_after(error):
+    """
+    Значение Retry-After (секунды) из ответа, если сервер его прислал.
+    """
+    for headers in (
+        getattr(getattr(error, "response", None), "headers", None),
+        getattr(error, "resp", None),
+    ):
+        if headers is None:
+            continue
+        try:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+        except AttributeError:
+            continue
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return None
+    return None
+
+
+def _is_connection_error(error):
+    return any(cls.__name__ in _CONNECTION_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def classify(error):
+    """
+    Возвращает (retryable, ambiguous): можно ли повторять и мог ли запрос всё-таки выполниться
+    на сервере (сетевой сбой или 5xx) — важно для неидемпотентных POST.
+    """
+    if _is_connection_error(error):
+        return True, True
+    status = _status(error)
+    if status in RETRYABLE_STATUSES:
+        return True, status != 429
+    return False, False
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Экспоненциальная задержка с джиттером; Retry-After от сервера имеет приоритет.
+    """
+    if retry_after is not None:
+        return min(retry_after, SCHEDULER_MAX_DELAY)
+    delay = min(SCHEDULER_MAX_DELAY, SCHEDULER_BASE_DELAY * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+def call(backend_name, fn, cost=1, recover=None, max_retries=SCHEDULER_MAX_RETRIES):
+    """
+    Выполняет fn() через планировщик бэкенда: квота, слот параллельности, повторы.
+    cost — расход по квоте токенов (для OpenAI — оценка токенов запроса и ответа).
+    recover(error) вызывается перед повтором после неоднозначной ошибки: если он вернул
+    не None, это значение считается результатом (запрос на самом деле выполнился).
+    """
+    backend = BACKENDS[backend_name]
+    attempt = 0
+    while True:
+        trial = backend.breaker.before_call()
+        recorded = False
+        try:
+            backend.requests.acquire()
+            if backend.tokens is not None:
+                backend.tokens.acquire(cost)
+            with backend.slots:
+                result = fn()
+        except Exception as e:
+            retryable, ambiguous = classify(e)
+            if not retryable:
+                raise
+            backend.breaker.record_failure()
+            recorded = True
+            if attempt >= max_retries:
+                logger.error(f"{backend_name}: попытки исчерпаны ({attempt + 1}): {e}")
+                raise
+            delay = backoff_delay(attempt, _retry_after(e))
+            logger.warning(f"{backend_name}: {e}; повтор {attempt + 1}/{max_retries} через {delay:.1f} с")
+            tracing.add(retries=1)
+            time.sleep(delay)
+            attempt += 1
+            if ambiguous and recover is not None:
+                recovered = recover(e)
+                if recovered is not None:
+                    logger.info(f"{backend_name}: запрос уже выполнен на сервере, повтор не нужен")
+                    backend.breaker.record_success()
+                    return recovered
+            continue
+        else:
+            backend.breaker.record_success()
+            recorded = True
+            return result
+        finally:
+            # Пробный вызов без вердикта (неповторяемая ошибка, исключение в quota/fn) не должен
+            # оставлять цепь в half-open навсегда
+            if trial and not recorded:
+                backend.breaker.release_trial()
+
+
+def get_state():
+    return {name: backend.breaker.state for name, backend in BACKENDS.items()}
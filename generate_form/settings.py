@@ -9,6 +9,7 @@ COLUMN_JOB_DESC = "C"
 COLUMN_MUST_HAVES = "D"
 COLUMN_QUESTIONS = "G"
 COLUMN_FORM_LINK = "H"  # Например, если ссылка справа от вопросов
+COLUMN_FINGERPRINT = "I"  # Отпечаток входных данных, по которым собрана форма из H
 
 # Фиксированные ячейки для промптов
 QUESTIONS_PROMPT_CELL = "B7"  # Вопросы
@@ -29,7 +30,88 @@ REGION = os.environ.get("REGION", "us-central1")
 PROJECT = os.environ.get("PROJECT", "qalearn")
 GOOGLE_SHEET_ID = os.environ.get("GOOGLE_SHEET_ID")
 GOOGLE_CREDS_PATH = os.environ.get("GOOGLE_CREDS_PATH", "creds.json")
-OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
-TYPEFORM_API_KEY = os.environ["TYPEFORM_API_KEY"]
+# Адреса API переопределяются для локальных стендов (benchmarks/fakes.py); по умолчанию — боевые
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")          # None — api.openai.com
+TYPEFORM_API_URL = os.environ.get("TYPEFORM_API_URL", "https://api.typeform.com")
+SHEETS_API_ENDPOINT = os.environ.get("SHEETS_API_ENDPOINT")  # None — sheets.googleapis.com
+# Без сервисного аккаунта (только для локального стенда Sheets)
+GOOGLE_ANONYMOUS_CREDENTIALS = os.environ.get("GOOGLE_ANONYMOUS_CREDENTIALS") in ("1", "true")
+# Ключи проверяются при первом обращении к API (clients, json_builder), а не при импорте
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+TYPEFORM_API_KEY = os.environ.get("TYPEFORM_API_KEY")
 PROCESS_SUBMISSION_URL = "https://us-central1-qalearn.cloudfunctions.net/process_submission"
-FAIL_URL = os.environ.get("FAIL_URL", "https://your-site.com/fail") 
+FAIL_URL = os.environ.get("FAIL_URL", "https://your-site.com/fail")
+# redirect_url thankyou-экрана: compact — версия набора правил и ответы одним параметром (v=...&a=...),
+# сам набор (must-haves и порядок ref) хранится в листе RULESETS_SHEET; full — прежний формат с must_haves в URL
+REDIRECT_FORMAT = os.environ.get("REDIRECT_FORMAT", "compact")
+RULESETS_SHEET = os.environ.get("RULESETS_SHEET", "rulesets")
+# Вебхук process_submission (typeform_webhook): если задан, регистрируется на каждой форме
+TYPEFORM_WEBHOOK_URL = os.environ.get("TYPEFORM_WEBHOOK_URL")
+TYPEFORM_WEBHOOK_SECRET = os.environ.get("TYPEFORM_WEBHOOK_SECRET")
+# Сколько созданных форм (отпечаток JSON -> form_id) инстанс помнит для идемпотентного создания
+TYPEFORM_CREATED_MAX_ITEMS = int(os.environ.get("TYPEFORM_CREATED_MAX_ITEMS", "512"))
+
+# Пакетная генерация (row_ids=5-180 или row_ids=5,7,9)
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", "500"))
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", "8"))
+# Синхронизация с таблицей (sync_worker.py): первая строка вакансий, период опроса и файл снимка хэшей строк
+SYNC_FIRST_ROW = int(os.environ.get("SYNC_FIRST_ROW", "2"))
+SYNC_INTERVAL = float(os.environ.get("SYNC_INTERVAL", "60"))  # секунды
+SYNC_STATE_PATH = os.environ.get("SYNC_STATE_PATH", "/tmp/sync_state.json")
+# Ограничения параллельных запросов к внешним API (на один инстанс)
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "4"))
+TYPEFORM_MAX_CONCURRENCY = int(os.environ.get("TYPEFORM_MAX_CONCURRENCY", "2"))
+SHEETS_MAX_CONCURRENCY = int(os.environ.get("SHEETS_MAX_CONCURRENCY", "4"))
+# Квоты (token bucket): запросов в минуту по бэкендам и токенов в минуту для OpenAI
+OPENAI_RPM = int(os.environ.get("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.environ.get("OPENAI_TPM", "40000"))
+OPENAI_EXPECTED_OUTPUT_TOKENS = int(os.environ.get("OPENAI_EXPECTED_OUTPUT_TOKENS", "1000"))
+SHEETS_RPM = int(os.environ.get("SHEETS_RPM", "60"))
+TYPEFORM_RPM = int(os.environ.get("TYPEFORM_RPM", "120"))
+# Повторы с экспоненциальной задержкой и circuit breaker
+SCHEDULER_MAX_RETRIES = int(os.environ.get("SCHEDULER_MAX_RETRIES", "5"))
+SCHEDULER_BASE_DELAY = float(os.environ.get("SCHEDULER_BASE_DELAY", "1.0"))  # секунды
+SCHEDULER_MAX_DELAY = float(os.environ.get("SCHEDULER_MAX_DELAY", "60"))     # секунды
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get("CIRCUIT_RESET_TIMEOUT", "30"))  # секунды
+
+# OpenAI
+GPT_MODEL = "gpt-4"
+# Кэш ответов OpenAI: off | memory | sqlite | tiered (память + SQLite)
+GPT_CACHE_BACKEND = os.environ.get("GPT_CACHE_BACKEND", "tiered")
+GPT_CACHE_PATH = os.environ.get("GPT_CACHE_PATH", "/tmp/gpt_cache.sqlite3")
+GPT_CACHE_TTL = int(os.environ.get("GPT_CACHE_TTL", str(7 * 24 * 3600)))  # секунды
+GPT_CACHE_MAX_ITEMS = int(os.environ.get("GPT_CACHE_MAX_ITEMS", "512"))
+
+# HTTP-клиенты (переиспользуются в пределах инстанса)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "60"))  # секунды
+
+# Кэш промптов B6/B7/B8 в памяти инстанса (секунды); версия промптов — контрольная сумма их текста
+PROMPTS_CACHE_TTL = int(os.environ.get("PROMPTS_CACHE_TTL", "60"))
+
+# Сборка финального JSON формы: local — локальный компилятор (GPT по промпту B6 — запасной путь), gpt — только GPT
+FORM_COMPILER = os.environ.get("FORM_COMPILER", "local")
+# Вопросы: hybrid — must-have, бюджет и контакты по шаблону, GPT — только открытые вопросы; gpt — все через GPT
+QUESTION_BUILDER = os.environ.get("QUESTION_BUILDER", "hybrid")
+# Архив вызовов OpenAI (gpt_archive): off | record — дописывать промпты и ответы этапов в GPT_ARCHIVE_PATH |
+# replay — отдавать ответы из архива без OpenAI с исходной длительностью, умноженной на GPT_REPLAY_SPEED (0 — сразу)
+GPT_RECORD_MODE = os.environ.get("GPT_RECORD_MODE", "off")
+GPT_ARCHIVE_PATH = os.environ.get("GPT_ARCHIVE_PATH", "/tmp/gpt_archive.jsonl")
+GPT_REPLAY_SPEED = float(os.environ.get("GPT_REPLAY_SPEED", "1.0"))
+# Потоковые ответы OpenAI с инкрементальным разбором JSON и ранним прерыванием
+GPT_STREAMING = os.environ.get("GPT_STREAMING", "1") not in ("0", "false")
+GPT_STREAM_RETRIES = int(os.environ.get("GPT_STREAM_RETRIES", "1"))
+GPT_MAX_PREAMBLE = int(os.environ.get("GPT_MAX_PREAMBLE", "200"))  # символов до начала JSON
+# Бюджет токенов промпта по этапам (prompt_builder): длинное описание вакансии сжимается и обрезается
+PROMPT_BUDGETS = {
+    "questions": int(os.environ.get("PROMPT_BUDGET_QUESTIONS", "3000")),
+    "logic": int(os.environ.get("PROMPT_BUDGET_LOGIC", "3000")),
+    "form": int(os.environ.get("PROMPT_BUDGET_FORM", "6000")),
+}
+
+# Наблюдаемость: уровень и формат логов (text | json), trace запроса в лог, эндпоинт метрик Prometheus
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()  # DEBUG — полные вопросы, логика и JSON формы в логе
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+TRACE_LOG = os.environ.get("TRACE_LOG", "1") not in ("0", "false")
+METRICS_ENDPOINT = os.environ.get("METRICS_ENDPOINT") in ("1", "true")
@@ -0,0 +1,132 @@
+"""
+Модуль sync_worker: инкрементальная синхронизация форм с листом journeys.
+Лист читается одним диапазоном (config_loader.load_sheet), хэши описания и must-haves
+сравниваются со снимком предыдущего опроса, и генерация запускается только для строк,
+которые изменились. Снимок хранится в файле SYNC_STATE_PATH; строка, которой в снимке нет
+(первый запуск, новая строка), генерируется, только если её форма отсутствует или отпечаток
+в столбце I не совпадает с текущим. Запуск из командной строки:
+
+    python sync_worker.py [--interval 60] [--once]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+import config_loader
+import main as generate_form_main
+import tracing
+from settings import BATCH_MAX_ROWS, SYNC_FIRST_ROW, SYNC_INTERVAL, SYNC_STATE_PATH
+
+logger = logging.getLogger("sync_worker")
+
+
+def content_hash(job_desc, must_haves):
+    """
+    Хэш входных данных строки, которые правят люди: описание и must-haves.
+    Ссылка и отпечаток (H, I) не входят — собственная запись воркера не делает строку изменённой.
+    """
+    digest = hashlib.sha256(job_desc.encode("utf-8") + b"\0" + must_haves.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class Snapshot:
+    """
+    Хэши строк на момент последней успешной генерации: row_id -> content_hash.
+    Сохраняется целиком во временный файл с атомарной заменой.
+    """
+
+    def __init__(self, path=SYNC_STATE_PATH):
+        self.path = path
+        self.rows = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.rows = {int(row_id): value for row_id, value in json.load(f)["rows"].items()}
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Снимок {path} не прочитан, строки будут сверены по отпечаткам: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"rows": {str(row_id): value for row_id, value in sorted(self.rows.items())}}, f)
+        os.replace(tmp_path, self.path)
+
+
+def changed_rows(rows, snapshot, prompts):
+    """
+    Строки, для которых нужна генерация: хэш отличается от снимка, а строки без снимка —
+    если у них нет формы или отпечаток в таблице устарел. Возвращает dict row_id -> row.
+    """
+    changed = {}
+    for row_id, row in rows.items():
+        job_desc, must_haves, form_link, fingerprint = row
+        previous = snapshot.rows.get(row_id)
+        if previous is not None:
+            if previous != content_hash(job_desc, must_haves):
+                changed[row_id] = row
+        elif not form_link or fingerprint != config_loader.row_fingerprint(job_desc, must_haves, prompts):
+            changed[row_id] = row
+    return changed
+
+
+def sync_once(snapshot, refresh_prompts=False):
+    """
+    Один опрос: чтение листа, сверка со снимком, генерация изменившихся строк пачками
+    по BATCH_MAX_ROWS. Успешно обработанные строки попадают в снимок после каждой пачки,
+    упавшие остаются изменёнными и повторяются при следующем опросе.
+    Возвращает счётчики rows, changed, created, updated, skipped, failed.
+    """
+    summary = {"rows": 0, "changed": 0, "created": 0, "updated": 0, "skipped": 0, "failed": 0}
+    with tracing.trace("sync_sheet") as trace:
+        rows, prompts = config_loader.load_sheet(SYNC_FIRST_ROW, refresh_prompts)
+        for row_id in set(snapshot.rows) - set(rows):
+            del snapshot.rows[row_id]
+        changed = changed_rows(rows, snapshot, prompts)
+        unchanged = {row_id: row for row_id, row in rows.items() if row_id not in changed}
+        for row_id, (job_desc, must_haves, _, _) in unchanged.items():
+            snapshot.rows.setdefault(row_id, content_hash(job_desc, must_haves))
+        summary["rows"], summary["changed"] = len(rows), len(changed)
+        row_ids = sorted(changed)
+        for start in range(0, len(row_ids), BATCH_MAX_ROWS):
+            batch = {row_id: changed[row_id] for row_id in row_ids[start:start + BATCH_MAX_ROWS]}
+            for result in generate_form_main.generate_rows(batch, prompts):
+                if not result["ok"] or result.get("write_error"):
+                    summary["failed"] += 1
+                    continue
+                summary[result["action"]] += 1
+                job_desc, must_haves, _, _ = batch[result["row_id"]]
+                snapshot.rows[result["row_id"]] = content_hash(job_desc, must_haves)
+            snapshot.save()
+        if not row_ids:
+            snapshot.save()
+        trace.attrs.update(summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", type=float, default=SYNC_INTERVAL, help="пауза между опросами, с")
+    parser.add_argument("--once", action="store_true", help="один опрос и выход")
+    args = parser.parse_args()
+    snapshot = Snapshot()
+    while True:
+        try:
+            summary = sync_once(snapshot)
+            if summary["changed"]:
+                logger.info(f"Синхронизация: {summary}")
+        except Exception as e:
+            logger.error(f"Ошибка синхронизации с таблицей: {e}")
+            if args.once:
+                raise
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули функции плоские (from settings import ...), как в Cloud Functions
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
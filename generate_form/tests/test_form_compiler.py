@@ -0,0 +1,118 @@
+import pytest
+import form_compiler
+from form_compiler import (
+    FAIL_SCREEN_REF, QUIZ_SCREEN_REF, FormCompileError, _fix_jumps, _unique_ref, build_form_shell, compile_field,
+    compile_logic,
+)
+from settings import FAIL_URL, PROCESS_SUBMISSION_URL
+
+
+def jump(target_type, value, condition=None):
+    action = {"action": "jump", "details": {"to": {"type": target_type, "value": value}}}
+    if condition:
+        action["condition"] = condition
+    return action
+
+
+@pytest.mark.parametrize("raw_type, field_type", [
+    ("text", "short_text"), ("textarea", "long_text"), ("boolean", "yes_no"), ("phone", "phone_number"),
+    ("url", "website"), (" Numeric ", "number"),
+])
+def test_field_type_aliases(raw_type, field_type):
+    assert compile_field({"title": "Вопрос", "type": raw_type}, 0, set())["type"] == field_type
+
+
+def test_field_type_defaults_and_unknown():
+    assert compile_field("Опыт работы?", 0, set())["type"] == "short_text"
+    assert compile_field({"title": "Готовы?", "options": ["Да", "Нет"]}, 0, set())["type"] == "multiple_choice"
+    with pytest.raises(FormCompileError):
+        compile_field({"title": "Вопрос", "type": "matrix"}, 0, set())
+
+
+def test_choice_refs_keep_gpt_refs_and_derive_the_rest():
+    field = compile_field({"title": "Python?", "ref": "musthave_python", "type": "choice",
+                           "choices": [{"label": "Да", "ref": "py_yes"}, "Нет", "No", "no"]}, 0, set())
+    refs = [choice["ref"] for choice in field["properties"]["choices"]]
+    # Метка без латиницы даёт номер варианта, повтор ref получает суффикс
+    assert refs == ["py_yes", "musthave_python_2", "musthave_python_no", "musthave_python_no_2"]
+
+
+def test_choices_from_comma_separated_string():
+    field = compile_field({"title": "Город", "type": "select", "choices": "Москва, , Казань"}, 0, set())
+    assert [choice["label"] for choice in field["properties"]["choices"]] == ["Москва", "Казань"]
+    with pytest.raises(FormCompileError):
+        compile_field({"title": "Город", "type": "dropdown"}, 0, set())
+
+
+def test_unique_ref():
+    used = {"email", "email_2"}
+    assert _unique_ref("email", used) == "email_3"
+    assert _unique_ref("phone", used) == "phone"
+    assert used == {"email", "email_2", "email_3", "phone"}
+
+
+def test_repeated_contact_field_gets_ref_from_title():
+    used = set()
+    assert compile_field({"title": "Email", "type": "email"}, 0, used)["ref"] == "email"
+    assert compile_field({"title": "Запасной email", "type": "email"}, 1, used)["ref"] == "email_2"
+    assert compile_field({"title": "Backup email", "type": "email"}, 2, used)["ref"] == "backup_email"
+
+
+def test_fix_jumps_maps_screens_and_choice_labels():
+    actions = [
+        jump("thankyou", "reject_screen", {"op": "is", "vars": [{"type": "field", "value": "q1"},
+                                                                {"type": "choice", "value": " Нет "}]}),
+        jump("thankyou", "the_end"),
+        jump("thankyou", FAIL_SCREEN_REF),
+    ]
+    assert _fix_jumps(actions, {"q1"}, {"нет": "q1_no"})
+    assert [action["details"]["to"]["value"] for action in actions] == [FAIL_SCREEN_REF, QUIZ_SCREEN_REF, FAIL_SCREEN_REF]
+    assert actions[0]["condition"]["vars"][1]["value"] == "q1_no"
+
+
+def test_fix_jumps_rejects_unknown_field_target():
+    assert _fix_jumps([jump("field", "q1")], {"q1"}, {})
+    assert not _fix_jumps([jump("field", "q9")], {"q1"}, {})
+
+
+def test_compile_logic_drops_unknown_refs_and_targets():
+    fields = [
+        compile_field({"title": "Python?", "ref": "musthave_python", "choices": ["Да", "Нет"]}, 0, set()),
+        {"ref": "email", "title": "Email", "type": "email"},
+    ]
+    logic = {"logic": [
+        {"type": "field", "ref": "musthave_python", "actions": [jump("thankyou", "fail", {
+            "op": "is", "vars": [{"type": "field", "value": "musthave_python"}, {"type": "choice", "value": "Нет"}]})]},
+        {"type": "field", "ref": "musthave_python", "actions": [jump("field", "salary")]},
+        {"type": "field", "ref": "unknown", "actions": [jump("field", "email")]},
+        "не правило",
+    ]}
+    compiled = compile_logic(logic, fields)
+    assert len(compiled) == 1
+    action = compiled[0]["actions"][0]
+    assert action["details"]["to"]["value"] == FAIL_SCREEN_REF
+    assert action["condition"]["vars"][1]["value"] == "musthave_python_2"
+    assert compile_logic(None, fields) == []
+    with pytest.raises(FormCompileError):
+        compile_logic("jump", fields)
+
+
+def test_shell_thankyou_screens_compact_redirect():
+    shell = build_form_shell({"questions": [
+        {"title": "Python?", "ref": "musthave_python", "type": "yes_no"},
+        {"title": "Email", "type": "email"},
+    ]}, "Вакансия", "- Python")
+    quiz, fail = shell["thankyou_screens"]
+    assert (quiz["ref"], fail["ref"]) == (QUIZ_SCREEN_REF, FAIL_SCREEN_REF)
+    assert quiz["properties"]["redirect_url"].startswith(PROCESS_SUBMISSION_URL + "?v=")
+    assert quiz["properties"]["redirect_url"].endswith("&a={field:musthave_python},{field:email},{field:phone}")
+    assert fail["properties"]["redirect_url"] == FAIL_URL
+
+
+def test_shell_thankyou_screens_full_redirect(monkeypatch):
+    monkeypatch.setattr(form_compiler, "REDIRECT_FORMAT", "full")
+    shell = build_form_shell([{"title": "Python?", "ref": "musthave_python", "type": "yes_no"}], "Вакансия", "- Python")
+    redirect_url = shell["thankyou_screens"][0]["properties"]["redirect_url"]
+    assert "pass=true&must_haves=-%20Python&musthave_python={field:musthave_python}" in redirect_url
+    with pytest.raises(FormCompileError):
+        build_form_shell({"questions": []}, "Вакансия")
@@ -0,0 +1,72 @@
+import pytest
+from form_validator import FormValidationError, ensure_valid, validate_form
+
+
+def build_form(n_fields):
+    fields, logic = [], []
+    for i in range(n_fields):
+        if i % 3 == 2:
+            fields.append({"ref": f"q{i}", "title": f"Вопрос {i}", "type": "multiple_choice", "properties": {
+                "choices": [{"ref": f"q{i}_yes", "label": "Да"}, {"ref": f"q{i}_no", "label": "Нет"}],
+            }})
+            logic.append({"type": "field", "ref": f"q{i}", "actions": [{
+                "action": "jump", "details": {"to": {"type": "thankyou", "value": "thankyou_fail"}},
+                "condition": {"op": "is", "vars": [{"type": "field", "value": f"q{i}"},
+                                                   {"type": "choice", "value": f"q{i}_no"}]},
+            }]})
+        else:
+            fields.append({"ref": f"q{i}", "title": f"Вопрос {i}", "type": "short_text",
+                           "validations": {"required": True}})
+    return {
+        "title": "Вакансия",
+        "fields": fields,
+        "logic": logic,
+        "thankyou_screens": [
+            {"ref": "thankyou_ok", "title": "Спасибо", "properties": {"redirect_url": "https://example.com/ok?e={field:q0}"}},
+            {"ref": "thankyou_fail", "title": "Спасибо"},
+        ],
+    }
+
+
+def codes(form):
+    return [error["code"] for error in validate_form(form)]
+
+
+def test_valid_form():
+    assert validate_form(build_form(30)) == []
+
+
+def test_group_fields_checked():
+    form = build_form(3)
+    form["fields"].append({"ref": "g", "title": "Группа", "type": "group", "properties": {"fields": [
+        {"ref": "g1", "title": "", "type": "short_text"},
+    ]}})
+    assert validate_form(form) == [{
+        "path": "fields[3].properties.fields[0].title", "code": "missing_title", "message": "у поля нужен непустой title",
+    }]
+
+
+def test_all_errors_collected():
+    form = build_form(7)
+    form["fields"][0]["type"] = "slider"
+    form["fields"][1]["ref"] = form["fields"][0]["ref"]
+    form["fields"][2]["properties"]["choices"][0]["label"] = " "
+    form["thankyou_screens"][0]["properties"]["redirect_url"] = "{post_submit_url}"
+    form["logic"][0]["actions"][0]["details"]["to"]["value"] = "missing"
+    assert codes(form) == [
+        "unknown_type", "duplicate_ref", "missing_label", "invalid_redirect_url", "unknown_jump_target",
+    ]
+
+
+def test_unhashable_values_reported():
+    form = build_form(3)
+    form["fields"][0]["type"] = ["short_text"]
+    form["logic"] = [{"ref": {"q": 0}, "actions": [{"action": ["jump"]}]}]
+    assert codes(form) == ["unknown_type", "unknown_field_ref", "invalid_action"]
+
+
+def test_not_a_form():
+    assert codes([]) == ["invalid_form"]
+    with pytest.raises(FormValidationError) as info:
+        ensure_valid({"title": "", "fields": []})
+    assert [error["code"] for error in info.value.errors] == ["missing_title", "missing_fields"]
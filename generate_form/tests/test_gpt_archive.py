@@ -0,0 +1,56 @@
+import functools
+import time
+import pytest
+import gpt_archive
+from gpt_archive import ReplayMissError, record_call, record_input, replay
+
+STATS = {"ttft_ms": 120, "duration_ms": 800, "prompt_tokens": 300, "completion_tokens": 50}
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    path = str(tmp_path / "archive.jsonl")
+    monkeypatch.setattr(gpt_archive, "_append", functools.partial(gpt_archive._append, path=path))
+    monkeypatch.setattr(gpt_archive, "load", functools.partial(gpt_archive.load, path=path))
+    monkeypatch.setattr(gpt_archive, "_recorded_inputs", set())
+    monkeypatch.setattr(gpt_archive, "_calls", None)
+    monkeypatch.setattr(gpt_archive, "GPT_REPLAY_SPEED", 0)
+    return path
+
+
+def test_replay_hit_returns_recorded_content(archive):
+    record_call("logic", "k1", "gpt-4o", "system", "prompt", '{"logic": []}', STATS)
+    record_call("logic", "k1", "gpt-4o", "system", "prompt", '{"logic": [1]}', STATS)
+    content, stats = replay("logic", "k1")
+    # Повторная запись того же ключа заменяет прежнюю
+    assert content == '{"logic": [1]}'
+    assert stats == STATS
+
+
+def test_replay_miss_for_unknown_key_or_other_stage(archive):
+    record_call("questions", "k1", "gpt-4o", "system", "prompt", "[]", STATS)
+    with pytest.raises(ReplayMissError):
+        replay("questions", "k2")
+    with pytest.raises(ReplayMissError):
+        replay("logic", "k1")
+
+
+def test_replay_keeps_recorded_duration(archive, monkeypatch):
+    monkeypatch.setattr(gpt_archive, "GPT_REPLAY_SPEED", 0.5)
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    record_call("questions", "k1", "gpt-4o", "system", "prompt", "[]", STATS)
+    replay("questions", "k1")
+    assert sleeps == [0.4]
+
+
+def test_record_input_once_per_process(archive):
+    prompts = {"version": "p1", "questions": "B6"}
+    record_input("Backend", "- Python", prompts)
+    record_input("Backend", "- Python", prompts)
+    record_input("Frontend", "- JS", prompts)
+    calls, inputs = gpt_archive.load()
+    assert calls == {}
+    assert [(item["job_desc"], item["must_haves"], item["prompts"]) for item in inputs] == [
+        ("Backend", "- Python", prompts), ("Frontend", "- JS", prompts),
+    ]
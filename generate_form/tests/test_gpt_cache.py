@@ -0,0 +1,27 @@
+import time
+import gpt_cache
+
+
+def tiered(tmp_path, ttl=3600):
+    return gpt_cache.TieredCache(
+        gpt_cache.MemoryCache(ttl=ttl), gpt_cache.SqliteCache(str(tmp_path / "cache.sqlite3"), ttl=ttl)
+    )
+
+
+def test_disk_hit_keeps_stage_and_created_at(tmp_path):
+    cache = tiered(tmp_path)
+    created_at = time.time() - 100
+    cache.disk.set("key", "logic", "value", created_at)
+    assert cache.get("key") == "value"
+    assert cache.memory._items["key"] == ("logic", "value", created_at)
+
+
+def test_invalidate_stage_keeps_other_promoted_entries(tmp_path):
+    cache = tiered(tmp_path)
+    cache.disk.set("questions", "questions", "q")
+    cache.disk.set("logic", "logic", "l")
+    cache.get("questions")
+    cache.get("logic")
+    cache.invalidate("logic")
+    assert cache.memory.get("questions") == "q"
+    assert cache.get("logic") is None
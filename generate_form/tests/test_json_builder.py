@@ -0,0 +1,143 @@
+import time
+import pytest
+import requests
+import json_builder
+import scheduler
+
+
+class Response:
+    def __init__(self, data, status_code=200):
+        self._data = data
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = str(data)
+        self.content = self.text.encode("utf-8")
+        self.request = type("Request", (), {"body": b""})()
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class TypeformSession:
+    """
+    Typeform в памяти: POST создаёт форму, drop_response — обрыв соединения после создания.
+    """
+
+    def __init__(self):
+        self.forms = {}
+        self.posts = 0
+        self.drop_response = False
+
+    def _item(self, form_id):
+        return {"id": form_id, "title": self.forms[form_id]["title"],
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "_links": {"display": f"https://example.typeform.com/to/{form_id}"}}
+
+    def create(self, body):
+        form_id = f"f{len(self.forms) + 1}"
+        self.forms[form_id] = body
+        return form_id
+
+    def post(self, url, json=None, **kwargs):
+        self.posts += 1
+        form_id = self.create(json)
+        if self.drop_response:
+            self.drop_response = False
+            raise requests.ConnectionError("connection reset")
+        return Response(self._item(form_id), 201)
+
+    def get(self, url, params=None, **kwargs):
+        if params is not None:
+            items = [self._item(form_id) for form_id, form in self.forms.items() if params["search"] in form["title"]]
+            return Response({"items": items})
+        form_id = url.rsplit("/", 1)[1]
+        return Response({**self.forms[form_id], "id": form_id})
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = TypeformSession()
+    monkeypatch.setattr(json_builder, "get_http_session", lambda: session)
+    monkeypatch.setattr(json_builder, "_created_forms", json_builder.OrderedDict())
+    monkeypatch.setattr(scheduler, "backoff_delay", lambda attempt, retry_after=None: 0)
+    monkeypatch.setitem(scheduler.BACKENDS, "typeform", scheduler.Backend("typeform", 60000, 4))
+    return session
+
+
+FORM = {"title": "Backend developer", "fields": [{"ref": "email", "type": "email", "title": "Email"}]}
+KEY = json_builder.idempotency_key(5, "fingerprint")
+
+
+def test_recovery_matches_marker_not_title(session):
+    other = session.create({**FORM, "hidden": [json_builder.form_marker("0" * 64)]})
+    session.drop_response = True
+    result = json_builder.send_to_typeform(FORM, "api-key", key=KEY)
+    assert session.posts == 1
+    assert result["form_id"] != other
+    assert json_builder.form_marker(KEY) in session.forms[result["form_id"]]["hidden"]
+
+
+def test_recovery_without_created_form_retries_post(session, monkeypatch):
+    session.create({**FORM, "hidden": [json_builder.form_marker("0" * 64)]})
+    post = session.post
+
+    def refused(url, json=None, **kwargs):
+        # Первый POST не дошёл до Typeform: формы нет, нужен повтор
+        monkeypatch.setattr(session, "post", post)
+        raise requests.ConnectionError("connection refused")
+
+    monkeypatch.setattr(session, "post", refused)
+    json_builder.send_to_typeform(FORM, "api-key", key=KEY)
+    assert session.posts == 1
+    assert len(session.forms) == 2
+
+
+def test_created_form_reused_unless_forced(session):
+    first = json_builder.send_to_typeform(FORM, "api-key", key=KEY)
+    assert json_builder.send_to_typeform(FORM, "api-key", key=KEY) == first
+    assert session.posts == 1
+    forced = json_builder.send_to_typeform(FORM, "api-key", key=KEY, force=True)
+    assert forced["form_id"] != first["form_id"]
+    assert session.posts == 2
+
+
+def test_same_form_for_other_row_is_created(session):
+    first = json_builder.send_to_typeform(FORM, "api-key", key=json_builder.idempotency_key(5, "fingerprint"))
+    second = json_builder.send_to_typeform(FORM, "api-key", key=json_builder.idempotency_key(6, "fingerprint"))
+    assert first["form_id"] != second["form_id"]
+    assert session.posts == 2
+
+
+def test_without_key_not_remembered(session):
+    json_builder.send_to_typeform(FORM, "api-key")
+    json_builder.send_to_typeform(FORM, "api-key")
+    assert session.posts == 2
+    assert not json_builder._created_forms
+
+
+def test_created_forms_bounded(session, monkeypatch):
+    monkeypatch.setattr(json_builder, "TYPEFORM_CREATED_MAX_ITEMS", 2)
+    for idx in range(3):
+        json_builder.send_to_typeform(FORM, "api-key", key=json_builder.idempotency_key(idx, "fingerprint"))
+    assert len(json_builder._created_forms) == 2
+    json_builder.send_to_typeform(FORM, "api-key", key=json_builder.idempotency_key(0, "fingerprint"))
+    assert session.posts == 4
+
+
+def test_with_form_id_only_touches_process_submission_redirect():
+    base = json_builder.PROCESS_SUBMISSION_URL
+    form = {**FORM, "thankyou_screens": [
+        {"ref": "thankyou_pass", "properties": {"redirect_url": f"{base}?v=abc&a={{field:email}}"}},
+        {"ref": "thankyou_fail", "properties": {"redirect_url": "https://example.com/fail"}},
+    ]}
+    result = json_builder.with_form_id(form, "F1")
+    assert result["thankyou_screens"][0]["properties"]["redirect_url"] == f"{base}?v=abc&a={{field:email}}&form_id=F1"
+    assert result["thankyou_screens"][1] == form["thankyou_screens"][1]
+    assert json_builder.with_form_id(result, "F2")["thankyou_screens"][0]["properties"]["redirect_url"].endswith(
+        "&a={field:email}&form_id=F2"
+    )
+    assert "form_id" not in form["thankyou_screens"][0]["properties"]["redirect_url"]
@@ -0,0 +1,64 @@
+import json
+import pytest
+from json_stream import JsonStreamError, JsonStreamScanner, extract_json
+
+PAYLOAD = {"questions": [{"title": "Опыт с \"Python\" [лет]?", "ref": "q1", "options": ["Да", "Нет"]}], "n": -1.5e3}
+
+
+def feed(text, size, **kwargs):
+    scanner = JsonStreamScanner(**kwargs)
+    for start in range(0, len(text), size):
+        scanner.feed(text[start:start + size])
+    return scanner
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+@pytest.mark.parametrize("wrapped", [
+    "{json}",
+    "```json\n{json}\n```",
+    "Вот форма:\n```json\n{json}\n```\nЕсли нужно, уточню вопросы.",
+])
+def test_fenced_or_wrapped_json(wrapped, size):
+    text = wrapped.replace("{json}", json.dumps(PAYLOAD, ensure_ascii=False, indent=1))
+    scanner = feed(text, size)
+    assert scanner.complete
+    assert json.loads(scanner.result()) == PAYLOAD
+
+
+def test_trailing_text_is_trimmed_and_ignored():
+    scanner = JsonStreamScanner()
+    scanner.feed('[1, {"a": "}"}]\n``` и ещё {')
+    assert scanner.complete
+    assert scanner.result() == '[1, {"a": "}"}]'
+    # После закрытия JSON остальной поток не разбирается
+    scanner.feed("} мусор ]")
+    assert scanner.result() == '[1, {"a": "}"}]'
+
+
+def test_structural_error_aborts_early():
+    scanner = JsonStreamScanner()
+    scanner.feed('{"questions": [{"title": "a"')
+    with pytest.raises(JsonStreamError, match="Непарная"):
+        scanner.feed("]")
+    with pytest.raises(JsonStreamError, match="Недопустимый"):
+        JsonStreamScanner().feed('{"a": yes}')
+
+
+def test_overlong_preamble_aborts_before_json():
+    scanner = JsonStreamScanner(max_preamble=10)
+    scanner.feed("Конечно!")
+    with pytest.raises(JsonStreamError, match="10"):
+        scanner.feed(" Вот JSON: {}")
+
+
+def test_unfinished_json():
+    scanner = feed('```json\n{"a": [1, 2', 4)
+    assert not scanner.complete
+    with pytest.raises(JsonStreamError, match="оборвался"):
+        scanner.result()
+    with pytest.raises(JsonStreamError):
+        extract_json("Извините, не могу помочь.")
+
+
+def test_extract_json():
+    assert extract_json('Ответ:\n```json\n{"logic": []}\n```') == {"logic": []}
@@ -0,0 +1,12 @@
+import pytest
+import main
+
+
+def test_parse_row_ids_ranges_and_lists():
+    assert main.parse_row_ids("5-7, 9,6") == [5, 6, 7, 9]
+
+
+@pytest.mark.parametrize("value", ["1-999999999", f"1-{main.BATCH_MAX_ROWS},{main.BATCH_MAX_ROWS + 5}", "10-5", "0", ""])
+def test_parse_row_ids_rejects(value):
+    with pytest.raises(ValueError):
+        main.parse_row_ids(value)
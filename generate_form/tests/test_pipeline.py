@@ -0,0 +1,56 @@
+import contextvars
+import threading
+import pytest
+import gpt_cache
+import pipeline
+from pipeline import Stage
+
+_request = contextvars.ContextVar("request", default=None)
+
+
+def test_dependencies_and_report():
+    stages = [
+        Stage("a", lambda: 1),
+        Stage("b", lambda a: a + 1, deps=("a",)),
+        Stage("c", lambda a: a * 10, deps=("a",)),
+        Stage("d", lambda b, c: b + c, deps=("b", "c")),
+    ]
+    results, report = pipeline.run(stages)
+    assert results == {"a": 1, "b": 2, "c": 10, "d": 12}
+    assert set(report["stages"]) == {"a", "b", "c", "d"}
+    assert report["critical_path"][0] == "a" and report["critical_path"][-1] == "d"
+
+
+def test_stage_error():
+    def boom(a):
+        raise RuntimeError("boom")
+
+    with pytest.raises(pipeline.PipelineError) as info:
+        pipeline.run([Stage("a", lambda: 1), Stage("b", boom, deps=("a",))])
+    assert info.value.stage == "b"
+    assert "a" in info.value.report["stages"]
+
+
+def test_stages_see_caller_context():
+    token = _request.set("row-7")
+    try:
+        with gpt_cache.bypass():
+            results, _ = pipeline.run([
+                Stage("request", _request.get),
+                Stage("bypass", gpt_cache._bypass.get),
+                Stage("thread", threading.get_ident),
+            ])
+    finally:
+        _request.reset(token)
+    assert results["request"] == "row-7"
+    assert results["bypass"] is True
+    assert results["thread"] != threading.get_ident()
+
+
+def test_stage_context_changes_stay_in_stage():
+    def set_request():
+        _request.set("stage")
+
+    results, _ = pipeline.run([Stage("set", set_request), Stage("get", lambda set: _request.get(), deps=("set",))])
+    assert results["get"] is None
+    assert _request.get() is None
@@ -0,0 +1,64 @@
+import pytest
+import prompt_builder
+from prompt_builder import TRUNCATION_MARK, build, count_tokens, logic_view, squeeze, truncate
+
+JOB_DESC = " ".join(f"обязанность{i}" for i in range(400))
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "_stats", {})
+    monkeypatch.setitem(prompt_builder.PROMPT_BUDGETS, "test", 200)
+    return 200
+
+
+def test_truncate_fits_budget_on_word_boundary():
+    text = truncate(JOB_DESC, 50)
+    assert count_tokens(text) <= 50
+    assert text.endswith(TRUNCATION_MARK)
+    assert JOB_DESC.startswith(text[:-len(TRUNCATION_MARK)] + " ")
+    assert truncate("коротко", 50) == "коротко"
+    assert truncate(JOB_DESC, 0) == ""
+
+
+def test_squeeze_drops_blank_and_repeated_lines():
+    assert squeeze("  Python   3 \n\n\n python 3\nSQL\t\tбазы\n") == "Python 3\nSQL базы"
+
+
+def test_build_within_budget_keeps_sections(budget):
+    prompt = build("test", "Шаблон", [("Вопросы", [{"ref": "q1", "title": "Опыт?"}], False), ("Описание", "Python", True)])
+    assert prompt == 'Шаблон\nВопросы: [{"ref":"q1","title":"Опыт?"}]\nОписание: Python'
+    assert prompt_builder.get_stats()["test"]["truncated"] == 0
+
+
+def test_build_truncates_only_shrinkable_sections(budget):
+    template = "Шаблон из таблицы " * 10
+    must_haves = "- Python\n- SQL"
+    prompt = build("test", template, [("Описание", JOB_DESC, True), ("Must haves", must_haves, False)])
+    assert count_tokens(prompt) <= budget
+    assert prompt.startswith(template + "\nОписание: обязанность0 ")
+    assert TRUNCATION_MARK + "\nMust haves: " + must_haves in prompt
+    stats = prompt_builder.get_stats()["test"]
+    assert stats["truncated"] == 1 and stats["tokens"] == count_tokens(prompt)
+    assert stats["tokens_saved"] > 0
+
+
+def test_build_splits_cut_between_long_sections(budget):
+    prompt = build("test", "Шаблон", [("A", JOB_DESC, True), ("B", JOB_DESC, True), ("C", "коротко", True)])
+    assert count_tokens(prompt) <= budget
+    a, b, c = (line.split(": ", 1)[1] for line in prompt.split("\n")[1:])
+    assert a.endswith(TRUNCATION_MARK) and b.endswith(TRUNCATION_MARK)
+    assert abs(count_tokens(a) - count_tokens(b)) <= 3
+    assert c == "коротко"
+
+
+def test_logic_view_uses_compiled_refs():
+    view = logic_view({"questions": [
+        {"title": "Email", "type": "email", "description": "рабочий"},
+        {"title": "Python?", "ref": "musthave_python", "options": ["Да", "Нет"], "required": True},
+    ]})
+    assert view == [
+        {"ref": "email", "title": "Email", "type": "email"},
+        {"ref": "musthave_python", "title": "Python?", "type": "multiple_choice", "choices": ["Да", "Нет"]},
+    ]
+    assert logic_view("не список") == "не список"
@@ -0,0 +1,28 @@
+import question_builder
+
+
+def open_titles(questions):
+    return [
+        question if isinstance(question, str) else question["title"]
+        for question in questions if isinstance(question, str) or not question.get("ref", "").startswith("musthave")
+    ]
+
+
+def test_short_requirements_match_whole_words():
+    questions = question_builder.ensure_must_have_questions(
+        [{"title": "Describe a good project you led", "field_type": "long_text"},
+         {"title": "Which algorithms do you like?", "field_type": "long_text"}],
+        "- Go\n- R",
+    )
+    assert open_titles(questions)[:2] == ["Describe a good project you led", "Which algorithms do you like?"]
+
+
+def test_question_repeating_requirement_dropped():
+    questions = question_builder.ensure_must_have_questions(
+        [{"title": "Есть ли у вас опыт Python 3?", "field_type": "long_text"},
+         {"title": "How many years of Go do you have?", "field_type": "number"},
+         "Расскажите о себе"],
+        "- Python 3\n- Go",
+    )
+    assert [question["ref"] for question in questions[:2]] == ["musthave_python_3", "musthave_go"]
+    assert open_titles(questions)[0] == "Расскажите о себе"
@@ -0,0 +1,86 @@
+import time
+import pytest
+import scheduler
+
+
+class HttpError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = scheduler.Backend("test", rpm=60000, max_concurrency=4)
+    backend.breaker = scheduler.CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    monkeypatch.setitem(scheduler.BACKENDS, "test", backend)
+    monkeypatch.setattr(scheduler, "backoff_delay", lambda attempt, retry_after=None: 0)
+    return backend
+
+
+def fail(status):
+    def fn():
+        raise HttpError(status)
+    return fn
+
+
+def open_circuit(backend):
+    with pytest.raises(HttpError):
+        scheduler.call("test", fail(503), max_retries=1)
+    assert backend.breaker.state == "open"
+
+
+def test_retryable_errors_open_circuit(backend):
+    open_circuit(backend)
+    with pytest.raises(scheduler.CircuitOpenError):
+        scheduler.call("test", lambda: "ok")
+
+
+def test_half_open_success_closes_circuit(backend):
+    open_circuit(backend)
+    time.sleep(0.06)
+    assert scheduler.call("test", lambda: "ok") == "ok"
+    assert backend.breaker.state == "closed"
+
+
+def test_half_open_retryable_failure_reopens_circuit(backend):
+    open_circuit(backend)
+    time.sleep(0.06)
+    with pytest.raises(HttpError):
+        scheduler.call("test", fail(503), max_retries=0)
+    assert backend.breaker.state == "open"
+
+
+def test_half_open_non_retryable_error_releases_trial(backend):
+    open_circuit(backend)
+    time.sleep(0.06)
+    with pytest.raises(HttpError):
+        scheduler.call("test", fail(400))
+    assert backend.breaker.state == "open"
+    # Следующий вызов снова пробный, а не CircuitOpenError до перезапуска инстанса
+    assert scheduler.call("test", lambda: "ok") == "ok"
+    assert backend.breaker.state == "closed"
+
+
+def test_non_retryable_error_is_not_retried(backend):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise HttpError(404)
+
+    with pytest.raises(HttpError):
+        scheduler.call("test", fn)
+    assert len(calls) == 1
+    assert backend.breaker.state == "closed"
+
+
+def test_recover_after_ambiguous_error(backend):
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        raise HttpError(502)
+
+    assert scheduler.call("test", fn, recover=lambda error: "created") == "created"
+    assert len(attempts) == 1
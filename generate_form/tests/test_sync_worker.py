@@ -0,0 +1,63 @@
+import config_loader
+import sync_worker
+from sync_worker import Snapshot, changed_rows, content_hash
+
+PROMPTS = {"version": "p1"}
+
+
+def row(job_desc, must_haves="- Python", form_link="https://form.typeform.com/to/F1", fingerprint=None):
+    if fingerprint is None:
+        fingerprint = config_loader.row_fingerprint(job_desc, must_haves, PROMPTS)
+    return [job_desc, must_haves, form_link, fingerprint]
+
+
+def test_changed_rows_compares_snapshot_hashes(tmp_path):
+    snapshot = Snapshot(str(tmp_path / "state.json"))
+    snapshot.rows = {2: content_hash("Backend", "- Python"), 3: content_hash("Frontend", "- JS")}
+    rows = {
+        2: row("Backend", form_link="", fingerprint="stale"),  # есть в снимке и не менялась
+        3: row("Frontend", "- JS, - TS"),                       # must-haves поправили
+    }
+    assert changed_rows(rows, snapshot, PROMPTS) == {3: rows[3]}
+
+
+def test_changed_rows_without_snapshot_uses_fingerprint(tmp_path):
+    snapshot = Snapshot(str(tmp_path / "state.json"))
+    rows = {
+        2: row("Backend"),
+        3: row("Frontend", form_link=""),
+        4: row("QA", fingerprint="stale"),
+    }
+    assert changed_rows(rows, snapshot, PROMPTS) == {3: rows[3], 4: rows[4]}
+    # Новая версия промптов меняет отпечаток всех строк
+    assert set(changed_rows(rows, snapshot, {"version": "p2"})) == {2, 3, 4}
+
+
+def test_snapshot_roundtrip_and_broken_file(tmp_path):
+    path = str(tmp_path / "state.json")
+    snapshot = Snapshot(path)
+    snapshot.rows = {10: "a", 2: "b"}
+    snapshot.save()
+    assert Snapshot(path).rows == {2: "b", 10: "a"}
+    (tmp_path / "state.json").write_text("{", encoding="utf-8")
+    assert Snapshot(path).rows == {}
+
+
+def test_sync_once_regenerates_changed_rows_only(tmp_path, monkeypatch):
+    rows = {2: row("Backend"), 3: row("Frontend", form_link=""), 4: row("QA", form_link="")}
+    monkeypatch.setattr(config_loader, "load_sheet", lambda first_row, refresh: (rows, PROMPTS))
+    generated = []
+
+    def generate_rows(batch, prompts):
+        generated.append(sorted(batch))
+        results = {3: {"row_id": 3, "ok": True, "action": "created"}, 4: {"row_id": 4, "ok": False, "error": "OpenAI"}}
+        return [results[row_id] for row_id in sorted(batch)]
+    monkeypatch.setattr(sync_worker.generate_form_main, "generate_rows", generate_rows)
+    snapshot = Snapshot(str(tmp_path / "state.json"))
+    summary = sync_worker.sync_once(snapshot)
+    assert generated == [[3, 4]]
+    assert summary == {"rows": 3, "changed": 2, "created": 1, "updated": 0, "skipped": 0, "failed": 1}
+    # Упавшая строка не попадает в снимок и повторяется при следующем опросе
+    assert set(Snapshot(snapshot.path).rows) == {2, 3}
+    sync_worker.sync_once(snapshot)
+    assert generated[-1] == [4]
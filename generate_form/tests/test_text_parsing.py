@@ -0,0 +1,30 @@
+import hashlib
+import os
+import text_parsing
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+
+def _digest(function):
+    with open(os.path.join(ROOT, function, "text_parsing.py"), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_copies_identical():
+    # Функции деплоятся раздельно, поэтому модуль скопирован; правка только одной копии —
+    # расхождение разбора must-haves между генерацией формы и проверкой ответов
+    assert _digest("generate_form") == _digest("process_submission"), (
+        "generate_form/text_parsing.py и process_submission/text_parsing.py различаются — правки вносятся в обе копии"
+    )
+
+
+def test_parse_must_haves():
+    parsed = text_parsing.parse_must_haves("- Python 3+\n• Английский B2\nБюджет до 300 000 руб\nEmail")
+    assert parsed.requirements == ("Python 3+", "Английский B2")
+    assert (parsed.budget, parsed.currency, parsed.budget_label) == (300000, "RUB", "300000 RUB")
+    assert parsed.contacts == ("email",)
+
+
+def test_slugify():
+    assert text_parsing.slugify("3 года Python!") == "3_goda_python"
+    assert text_parsing.slugify("★★★") == ""
@@ -0,0 +1,145 @@
+"""
+Модуль text_parsing: разбор блока must-haves в типизированную структуру.
+Блок разбирается один раз на текст (кэш по содержимому): требования, бюджет (сумма и валюта)
+и контакты. Одинаковая копия модуля лежит в generate_form и process_submission —
+функции деплоятся раздельно; правки вносятся в обе копии (совпадение проверяет tests/test_text_parsing.py).
+"""
+
+import re
+from functools import lru_cache
+
+MUST_HAVES_CACHE_SIZE = 512
+LIST_MARKERS = "-•*–—: ."
+BUDGET_KEYWORDS = ("бюджет", "budget")
+
+_BUDGET_NUMBER = re.compile(
+    r"(\d{1,3}(?:[ \u00a0]\d{3})+|\d+)(?:[.,](\d+))?(?:\s*(k|к|тыс(?:яч[аи]?)?|thousand)(?![a-zа-яё]))?", re.IGNORECASE
+)
+_SPACES = re.compile(r"\s")
+_CURRENCIES = (
+    ("EUR", re.compile(r"eur|€|евро", re.IGNORECASE)),
+    ("USD", re.compile(r"usd|\$|dollar|долл", re.IGNORECASE)),
+    ("RUB", re.compile(r"rub|руб|₽", re.IGNORECASE)),
+)
+# Строка целиком — контакт, а не требование ("Email", "Телефон для связи")
+_CONTACT_LINE = re.compile(
+    r"(?P<email>e-?mail|(?:электронная |эл\. ?)?почта)|(?P<phone>phone(?: number)?|(?:номер )?телефона?)"
+    r"|(?P<telegram>telegram|телеграм)",
+    re.IGNORECASE,
+)
+_CONTACT_SUFFIX = re.compile(r"\s*(?:для связи|обязател\w*|required)?", re.IGNORECASE)
+_SLUG_INVALID = re.compile(r"[^a-z0-9]+")
+_TRANSLIT = dict(zip(
+    "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+    ["a", "b", "v", "g", "d", "e", "e", "zh", "z", "i", "y", "k", "l", "m", "n", "o", "p", "r", "s", "t",
+     "u", "f", "h", "ts", "ch", "sh", "sch", "", "y", "", "e", "yu", "ya"],
+))
+
+
+class MustHaves:
+    """
+    Разобранный блок must-haves. items — (текст, kind) по строкам, kind — musthave | budget | contact;
+    requirements — тексты musthave; budget/currency — верхняя граница бюджета и валюта
+    (None, если не указаны); contacts — контакты, перечисленные в блоке (email, phone, telegram).
+    """
+
+    __slots__ = ("items", "requirements", "budget", "currency", "contacts")
+
+    def __init__(self, items, budget, currency):
+        self.items = items
+        self.requirements = tuple(text for text, kind in items if kind == "musthave")
+        self.budget = budget
+        self.currency = currency
+        self.contacts = tuple(dict.fromkeys(_contact_kind(text) for text, kind in items if kind == "contact"))
+
+    @property
+    def lines(self):
+        return tuple(text for text, _ in self.items)
+
+    @property
+    def has_budget(self):
+        return any(kind == "budget" for _, kind in self.items)
+
+    @property
+    def budget_label(self):
+        """
+        Бюджет для текста вопроса: '2000 EUR', '300000' или None.
+        """
+        if self.budget is None:
+            return None
+        return f"{self.budget} {self.currency}" if self.currency else str(self.budget)
+
+
+def split_lines(text):
+    """
+    Непустые строки блока без маркеров списка.
+    """
+    lines = []
+    for line in (text or "").split("\n"):
+        line = line.strip(LIST_MARKERS).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def is_budget(text):
+    lowered = text.lower()
+    return any(keyword in lowered for keyword in BUDGET_KEYWORDS)
+
+
+def _contact_kind(text):
+    match = _CONTACT_LINE.match(text)
+    if match and _CONTACT_SUFFIX.fullmatch(text, match.end()):
+        return match.lastgroup
+    return None
+
+
+def parse_budget(text):
+    """
+    (сумма, валюта) из строки бюджета: '2000 EUR' -> (2000, 'EUR'), 'до 300 000 руб' -> (300000, 'RUB'),
+    '150-200k €' -> (200000, 'EUR'). Для диапазона — верхняя граница.
+    """
+    amounts = []
+    for whole, fraction, multiplier in _BUDGET_NUMBER.findall(text):
+        amount = float(_SPACES.sub("", whole) + ("." + fraction if fraction else ""))
+        if multiplier:
+            amount *= 1000
+        amounts.append(amount)
+    currency = next((code for code, pattern in _CURRENCIES if pattern.search(text)), None)
+    if not amounts:
+        return None, currency
+    amount = max(amounts)
+    return (int(amount) if amount.is_integer() else amount), currency
+
+
+@lru_cache(maxsize=MUST_HAVES_CACHE_SIZE)
+def parse_must_haves(text):
+    """
+    Разбирает блок must-haves в MustHaves. Результат кэшируется по тексту — повторный разбор
+    того же блока на другом этапе или запросе бесплатен. Несколько строк бюджета — действует последняя.
+    """
+    items = []
+    budget, currency = None, None
+    for line in split_lines(text):
+        if is_budget(line):
+            items.append((line, "budget"))
+            amount, code = parse_budget(line)
+            if amount is not None:
+                budget, currency = amount, code
+        elif _contact_kind(line):
+            items.append((line, "contact"))
+        else:
+            items.append((line, "musthave"))
+    return MustHaves(tuple(items), budget, currency)
+
+
+def slugify(text):
+    """
+    slug для ref: нижний регистр, кириллица — транслитом, всё кроме латиницы и цифр — '_'.
+    """
+    translit = "".join(_TRANSLIT.get(char, char) for char in text.lower())
+    return _SLUG_INVALID.sub("_", translit).strip("_")
+
+
+def cache_info():
+    return parse_must_haves.cache_info()._asdict()
@@ -0,0 +1,240 @@
+"""
+Модуль tracing: спаны этапов запроса и метрики инстанса.
+Запрос — trace, этап (чтение таблицы, промпты, вопросы, логика, JSON формы, валидация,
+Typeform, запись ссылок) — span с длительностью и числовыми атрибутами: токены, размеры
+данных, попадания в кэш. Завершённый trace пишется одной JSON-записью в лог, спаны
+агрегируются в гистограммы и счётчики для текстового формата Prometheus (render_prometheus).
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from settings import LOG_LEVEL, LOG_FORMAT, TRACE_LOG
+
+logger = logging.getLogger("tracing")
+
+# Границы корзин гистограммы длительности спанов, секунды
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRICS_PREFIX = "generate_form"
+
+_current = contextvars.ContextVar("tracing_current", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """
+    Спан этапа: name, parent (id родителя), attrs — описание (set_attrs), counts — счётчики
+    (add: токены, байты, попадания в кэш), которые также суммируются в метрики.
+    """
+
+    __slots__ = ("id", "name", "parent", "start", "end", "attrs", "counts", "error")
+
+    def __init__(self, name, parent, attrs):
+        self.id = next(_span_ids)
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end = None
+        self.attrs = dict(attrs)
+        self.counts = {}
+        self.error = None
+
+    def to_dict(self, origin):
+        record = {
+            "id": self.id,
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 1),
+            "duration_ms": round(((self.end or time.perf_counter()) - self.start) * 1000, 1),
+        }
+        if self.parent:
+            record["parent"] = self.parent
+        if self.attrs or self.counts:
+            record["attrs"] = {**self.attrs, **self.counts}
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+class Trace:
+    """
+    Trace одного запроса: спаны из всех потоков (пайплайн, пакет строк) под одной блокировкой.
+    """
+
+    def __init__(self, name, attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = dict(attrs)
+        self.start = time.perf_counter()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def to_dict(self):
+        with self.lock:
+            spans = [span.to_dict(self.start) for span in sorted(self.spans, key=lambda span: span.start)]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 1),
+            "attrs": self.attrs,
+            "spans": spans,
+        }
+
+
+class _Metrics:
+    """
+    Агрегаты по спанам за время жизни инстанса: гистограмма длительности, ошибки
+    и суммы счётчиков (Span.counts) по имени спана.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = {}  # span -> [counts по корзинам..., +Inf], sum
+        self.errors = {}
+        self.counters = {}   # (attr, span) -> сумма
+
+    def observe(self, span):
+        seconds = span.end - span.start
+        with self.lock:
+            counts, total = self.durations.get(span.name, ([0] * (len(DURATION_BUCKETS) + 1), 0.0))
+            for idx, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    counts[idx] += 1
+            counts[-1] += 1
+            self.durations[span.name] = (counts, total + seconds)
+            if span.error:
+                self.errors[span.name] = self.errors.get(span.name, 0) + 1
+            for attr, value in span.counts.items():
+                key = (attr, span.name)
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def render(self):
+        lines = []
+        with self.lock:
+            name = f"{METRICS_PREFIX}_span_duration_seconds"
+            lines += [f"# HELP {name} Длительность этапов", f"# TYPE {name} histogram"]
+            for span, (counts, total) in sorted(self.durations.items()):
+                for bound, count in zip(DURATION_BUCKETS + ("+Inf",), counts):
+                    lines.append(f'{name}_bucket{{span="{span}",le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{span="{span}"}} {round(total, 6)}')
+                lines.append(f'{name}_count{{span="{span}"}} {counts[-1]}')
+            name = f"{METRICS_PREFIX}_span_errors_total"
+            lines += [f"# TYPE {name} counter"]
+            lines += [f'{name}{{span="{span}"}} {n}' for span, n in sorted(self.errors.items())]
+            for attr in sorted({attr for attr, _ in self.counters}):
+                name = f"{METRICS_PREFIX}_{attr}_total"
+                lines.append(f"# TYPE {name} counter")
+                lines += [
+                    f'{name}{{span="{span}"}} {value}'
+                    for (counter, span), value in sorted(self.counters.items()) if counter == attr
+                ]
+        return "\n".join(lines) + "\n"
+
+
+_metrics = _Metrics()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Запись лога одной строкой JSON (severity/message — поля, которые разбирает Cloud Logging);
+    trace из extra попадает в запись как есть.
+    """
+
+    def format(self, record):
+        entry = {"severity": record.levelname, "logger": record.name, "message": record.getMessage()}
+        trace = getattr(record, "trace", None)
+        if trace is not None:
+            entry.update(trace)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging():
+    """
+    Уровень из LOG_LEVEL; при LOG_FORMAT=json — структурированные записи вместо текста.
+    """
+    logging.basicConfig(level=LOG_LEVEL)
+    if LOG_FORMAT == "json":
+        for handler in logging.getLogger().handlers:
+            handler.setFormatter(JsonFormatter())
+
+
+@contextmanager
+def trace(name, **attrs):
+    """
+    Корневой контекст запроса. По выходе trace пишется в лог (TRACE_LOG) одной записью.
+    """
+    current = Trace(name, attrs)
+    token = _current.set((current, None))
+    try:
+        yield current
+    except Exception as e:
+        current.attrs["error"] = str(e)
+        raise
+    finally:
+        _current.reset(token)
+        if TRACE_LOG:
+            record = current.to_dict()
+            if LOG_FORMAT == "json":
+                logger.info(f"trace {name}", extra={"trace": record})
+            else:
+                logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Спан этапа внутри текущего trace; вне trace только собирает метрики.
+    """
+    current, parent = _current.get() or (None, None)
+    item = Span(name, parent.id if parent else None, attrs)
+    token = _current.set((current, item))
+    try:
+        yield item
+    except Exception as e:
+        item.error = str(e)[:200]
+        raise
+    finally:
+        _current.reset(token)
+        item.end = time.perf_counter()
+        if current is not None:
+            with current.lock:
+                current.spans.append(item)
+        _metrics.observe(item)
+
+
+def add(**values):
+    """
+    Прибавляет числовые атрибуты (токены, байты, попадания в кэш) к текущему спану.
+    """
+    _, item = _current.get() or (None, None)
+    if item is not None:
+        for key, value in values.items():
+            item.counts[key] = item.counts.get(key, 0) + value
+
+
+def set_attrs(**attrs):
+    _, item = _current.get() or (None, None)
+    if item is not None:
+        item.attrs.update(attrs)
+
+
+def propagate(fn):
+    """
+    Оборачивает fn для запуска в пуле потоков: вызов идёт в копии контекста, где fn обёрнута,
+    чтобы спаны попадали в тот же trace.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def render_prometheus():
+    return _metrics.render()
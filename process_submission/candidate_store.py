@@ -0,0 +1,306 @@
+"""
+Модуль candidate_store: сохранение результатов проверки кандидатов.
+Каждый кандидат сразу пишется в локальную SQLite (индексы по form_id и email),
+которая же служит outbox для листа результатов: невыгруженные строки уходят в Google Sheets
+одним values.append на пачку и помечаются выгруженными только после успешной записи
+(доставка at-least-once; id строки есть в листе для дедупликации). Outbox лежит на диске инстанса,
+поэтому выгружает его тот же инстанс: фоновый поток (flush_in_background) после записи
+и drain_submissions по расписанию.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from settings import (
+    CANDIDATE_DB_PATH, RESULTS_SHEET, CANDIDATE_SHEET_EXPORT, CANDIDATE_FLUSH_SIZE, CANDIDATE_FLUSH_INTERVAL,
+    GOOGLE_SHEET_ID, GOOGLE_CREDS_PATH, SHEETS_API_ENDPOINT, GOOGLE_ANONYMOUS_CREDENTIALS, HTTP_TIMEOUT
+)
+
+logger = logging.getLogger("candidate_store")
+
+SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    token TEXT UNIQUE,
+    form_id TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    must_haves TEXT NOT NULL DEFAULT '',
+    verdicts TEXT NOT NULL DEFAULT '[]',
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    exported INTEGER NOT NULL DEFAULT 0,
+    candidate_key TEXT,
+    superseded INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS candidates_form ON candidates (form_id);
+CREATE INDEX IF NOT EXISTS candidates_email ON candidates (email);
+CREATE INDEX IF NOT EXISTS candidates_outbox ON candidates (exported, id);
+CREATE INDEX IF NOT EXISTS candidates_key ON candidates (candidate_key, superseded);
+"""
+
+_COLUMNS = (
+    "id", "token", "form_id", "email", "phone", "status", "must_haves", "verdicts", "source", "created_at",
+    "candidate_key", "superseded",
+)
+
+# У каждого потока свои соединения SQLite и HTTP-соединение Sheets: httplib2 внутри
+# googleapiclient не потокобезопасен, общими остаются сервис и учётные данные
+_local = threading.local()
+_flush_lock = threading.Lock()
+_sheets_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_credentials = None
+_sheets = None
+# Фоновая выгрузка: не больше одного потока на инстанс
+_flusher_lock = threading.Lock()
+_flusher = None
+
+
+def _connect(path=None):
+    path = path or CANDIDATE_DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+def save(candidates, source, path=None):
+    """
+    Сохраняет пачку кандидатов одной транзакцией. candidate — dict со status, candidate_data,
+    verdicts и необязательными form_id, token (по token повторная запись игнорируется),
+    candidate_key (см. dedup_index): прежние записи того же кандидата помечаются superseded,
+    актуальной остаётся последняя.
+    """
+    now = time.time()
+    rows = [
+        (
+            candidate.get("token"),
+            candidate.get("form_id") or "",
+            (candidate["candidate_data"].get("email") or "").strip().lower(),
+            candidate["candidate_data"].get("phone") or "",
+            candidate["status"],
+            candidate["candidate_data"].get("must_haves") or "",
+            json.dumps(candidate.get("verdicts") or [], ensure_ascii=False),
+            source,
+            now,
+            candidate.get("candidate_key"),
+        )
+        for candidate in candidates
+    ]
+    conn = _connect(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for row in rows:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO candidates "
+                "(token, form_id, email, phone, status, must_haves, verdicts, source, created_at, candidate_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            if cursor.rowcount == 1 and row[-1] is not None:
+                conn.execute(
+                    "UPDATE candidates SET superseded = 1 WHERE candidate_key = ? AND superseded = 0 AND id < ?",
+                    (row[-1], cursor.lastrowid),
+                )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def find(form_id=None, email=None, limit=100, latest_only=True, path=None):
+    """
+    Кандидаты по form_id и/или email (индексированный поиск), новые первыми.
+    latest_only — только последний отклик каждого кандидата.
+    """
+    clauses = ["superseded = 0"] if latest_only else []
+    params = []
+    if form_id:
+        clauses.append("form_id = ?")
+        params.append(form_id)
+    if email:
+        clauses.append("email = ?")
+        params.append(email.strip().lower())
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    rows = _connect(path).execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM candidates {where}ORDER BY id DESC LIMIT ?", (*params, limit)
+    ).fetchall()
+    return [dict(zip(_COLUMNS, row)) for row in rows]
+
+
+def _get_credentials():
+    """
+    Учётные данные читаются один раз; истёкший токен обновляется под блокировкой, одним потоком.
+    """
+    global _credentials
+    if _credentials is None:
+        with _sheets_lock:
+            if _credentials is None and GOOGLE_ANONYMOUS_CREDENTIALS:
+                from google.auth.credentials import AnonymousCredentials
+                _credentials = AnonymousCredentials()
+            elif _credentials is None:
+                from google.oauth2 import service_account
+                _credentials = service_account.Credentials.from_service_account_file(
+                    GOOGLE_CREDS_PATH, scopes=SHEETS_SCOPES
+                )
+    if not _credentials.valid:
+        with _refresh_lock:
+            if not _credentials.valid:
+                import httplib2
+                import google_auth_httplib2
+                _credentials.refresh(google_auth_httplib2.Request(httplib2.Http(timeout=HTTP_TIMEOUT)))
+                logger.info("Токен Google обновлён")
+    return _credentials
+
+
+def _thread_http():
+    http = getattr(_local, "http", None)
+    if http is None:
+        import httplib2
+        import google_auth_httplib2
+        http = _local.http = google_auth_httplib2.AuthorizedHttp(
+            _get_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT)
+        )
+    return http
+
+
+def _build_request(http, *args, **kwargs):
+    """
+    requestBuilder для googleapiclient: запрос выполняется через соединение текущего потока.
+    """
+    from googleapiclient.http import HttpRequest
+    return HttpRequest(_thread_http(), *args, **kwargs)
+
+
+def get_sheets_service():
+    """
+    spreadsheets()-ресурс Sheets API, один на инстанс (выгрузка кандидатов и чтение наборов правил).
+    """
+    global _sheets
+    _get_credentials()
+    if _sheets is None:
+        with _sheets_lock:
+            if _sheets is None:
+                # Импорт здесь: без выгрузки в таблицу функции не нужны клиенты Google
+                from googleapiclient.discovery import build
+                _sheets = build(
+                    'sheets', 'v4', http=_thread_http(), requestBuilder=_build_request, cache_discovery=False,
+                    client_options={"api_endpoint": SHEETS_API_ENDPOINT} if SHEETS_API_ENDPOINT else None
+                ).spreadsheets()
+    return _sheets
+
+
+def _sheet_row(row):
+    record = dict(zip(_COLUMNS, row))
+    failed = [v["requirement"] for v in json.loads(record["verdicts"]) if v.get("status") == "fail"]
+    created = datetime.fromtimestamp(record["created_at"], timezone.utc).isoformat(timespec="seconds")
+    return [
+        record["id"], created, record["form_id"], record["email"], record["phone"],
+        record["status"], ", ".join(failed), record["source"], record["candidate_key"] or "",
+    ]
+
+
+def append_rows(values):
+    """
+    Дописывает строки в лист результатов одним values.append.
+    """
+    get_sheets_service().values().append(
+        spreadsheetId=GOOGLE_SHEET_ID,
+        range=f"{RESULTS_SHEET}!A1",
+        valueInputOption="RAW",
+        insertDataOption="INSERT_ROWS",
+        body={"values": values},
+    ).execute()
+
+
+def flush(force=False, flush_size=CANDIDATE_FLUSH_SIZE, flush_interval=CANDIDATE_FLUSH_INTERVAL,
+          writer=append_rows, path=None):
+    """
+    Выгружает невыгруженных кандидатов пачками по flush_size. Неполная пачка выгружается,
+    только если самая старая строка ждёт дольше flush_interval (или force).
+    Ошибка записи не бросается: строки остаются в outbox. Возвращает количество выгруженных строк.
+    """
+    if not CANDIDATE_SHEET_EXPORT or not GOOGLE_SHEET_ID:
+        return 0
+    conn = _connect(path)
+    exported = 0
+    with _flush_lock:
+        while True:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM candidates WHERE exported = 0 ORDER BY id LIMIT ?",
+                (flush_size,),
+            ).fetchall()
+            if not rows:
+                break
+            oldest = rows[0][_COLUMNS.index("created_at")]
+            if len(rows) < flush_size and not force and time.time() - oldest < flush_interval:
+                break
+            try:
+                writer([_sheet_row(row) for row in rows])
+            except Exception as e:
+                # Строки остаются невыгруженными и уйдут при следующем flush
+                logger.error(f"Ошибка выгрузки кандидатов в лист {RESULTS_SHEET}: {e}")
+                break
+            conn.execute("UPDATE candidates SET exported = 1 WHERE exported = 0 AND id <= ?", (rows[-1][0],))
+            exported += len(rows)
+            logger.info(f"В лист {RESULTS_SHEET} выгружено {len(rows)} кандидатов")
+    return exported
+
+
+def _oldest_pending():
+    return _connect().execute("SELECT MIN(created_at) FROM candidates WHERE exported = 0").fetchone()[0]
+
+
+def _flush_loop():
+    global _flusher
+    while True:
+        try:
+            flush()
+            oldest = _oldest_pending()
+        except Exception as e:
+            logger.error(f"Ошибка фоновой выгрузки кандидатов: {e}")
+            oldest = time.time()
+        if oldest is None:
+            with _flusher_lock:
+                # Повторная проверка под блокировкой: save, закоммитивший строку после неё,
+                # увидит _flusher = None и запустит новый поток
+                if _oldest_pending() is None:
+                    _flusher = None
+                    return
+            continue
+        delay = oldest + CANDIDATE_FLUSH_INTERVAL - time.time()
+        # Срок уже прошёл, а строки остались — запись не удалась, повтор через интервал
+        time.sleep(delay if delay > 0 else CANDIDATE_FLUSH_INTERVAL)
+
+
+def flush_in_background():
+    """
+    Запускает выгрузку outbox в фоновом потоке инстанса, записавшего строки: поток выгружает
+    пачки по мере наступления их срока (flush_size / flush_interval) и завершается, когда outbox пуст.
+    Запрос, сохранивший кандидата, выгрузку не ждёт.
+    """
+    global _flusher
+    if not CANDIDATE_SHEET_EXPORT or not GOOGLE_SHEET_ID:
+        return
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="candidate_flush", daemon=True)
+            _flusher.start()
+
+
+def pending(path=None):
+    return _connect(path).execute("SELECT COUNT(*) FROM candidates WHERE exported = 0").fetchone()[0]
@@ -0,0 +1,213 @@
+"""
+Модуль dedup_index: индекс повторных откликов кандидатов.
+Ключи — нормализованные email и телефон в пределах формы; проверка — поиск в dict.
+Индекс живёт в памяти и восстанавливается при старте из append-only файла JSON lines,
+без обращений к внешним хранилищам на пути запроса.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from settings import DEDUP_INDEX_PATH, DEDUP_TOKEN_TTL
+
+logger = logging.getLogger("dedup_index")
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def normalize_phone(phone):
+    """
+    Только цифры; международный префикс 00 и российская 8 в начале приводятся к единому виду.
+    """
+    digits = _NON_DIGITS.sub("", phone or "")
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if len(digits) == 11 and digits.startswith("8"):
+        digits = "7" + digits[1:]
+    return digits
+
+
+def form_scope(form_id, must_haves=""):
+    """
+    Область уникальности: form_id, а если его нет (redirect без id формы) — хэш must-haves.
+    """
+    if form_id:
+        return form_id
+    return "mh:" + hashlib.sha1(must_haves.encode("utf-8")).hexdigest()[:12]
+
+
+class DedupIndex:
+    """
+    observe(scope, email, phone, token) -> (candidate_key, duplicate). Отклик с тем же email или
+    телефоном в той же форме — тот же кандидат; новый контакт привязывается к нему же.
+    Повторный observe с тем же token (повторная обработка ответа из очереди) возвращает
+    прежний результат и не считается новым откликом; token помнится token_ttl секунд.
+    Файл: строка на отклик {"f", "e", "p", "t", "s"}; после сжатия — строка на кандидата
+    {"f", "c", "keys", "n"}, на форму {"f", "anon"} для откликов без контактов
+    и на живой token {"f", "t", "c", "d", "s"}.
+    """
+
+    def __init__(self, path=None, token_ttl=DEDUP_TOKEN_TTL):
+        self.path = path
+        self.token_ttl = token_ttl
+        self._keys = {}        # (scope, "e"|"p", value) -> id кандидата
+        self._candidates = {}  # id -> [scope, число откликов]
+        self._anonymous = {}   # scope -> число откликов без контактов
+        # token ответа -> (scope, id кандидата или None, duplicate, время); в порядке появления
+        self._tokens = OrderedDict()
+        self._next_id = 1
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            self._load()
+            self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # недописанная строка после падения
+                self._replay(record)
+                self._lines += 1
+        self._prune_tokens()
+        # Строки истёкших token — мусор, живые token учитываются как записи индекса
+        if self._lines > 2 * (len(self._candidates) + len(self._tokens)) + 1000:
+            self._compact()
+
+    def _prune_tokens(self):
+        cutoff = time.time() - self.token_ttl
+        while self._tokens and next(iter(self._tokens.values()))[3] < cutoff:
+            self._tokens.popitem(last=False)
+
+    def _replay(self, record):
+        scope = record["f"]
+        if "keys" in record:
+            candidate_id = record["c"]
+            self._candidates[candidate_id] = [scope, record["n"]]
+            for kind, value in record["keys"]:
+                self._keys[(scope, kind, value)] = candidate_id
+            self._next_id = max(self._next_id, candidate_id + 1)
+        elif "anon" in record:
+            self._anonymous[scope] = self._anonymous.get(scope, 0) + record["anon"]
+        elif "c" in record:
+            self._tokens[record["t"]] = (scope, record["c"], record["d"], record.get("s", time.time()))
+        elif record.get("e") or record.get("p"):
+            candidate_id, duplicate = self._observe(scope, record.get("e", ""), record.get("p", ""))
+            if record.get("t"):
+                self._tokens[record["t"]] = (scope, candidate_id, duplicate, record.get("s", time.time()))
+        else:
+            self._anonymous[scope] = self._anonymous.get(scope, 0) + 1
+            if record.get("t"):
+                self._tokens[record["t"]] = (scope, None, False, record.get("s", time.time()))
+
+    def _compact(self):
+        keys = {}
+        for (scope, kind, value), candidate_id in self._keys.items():
+            keys.setdefault(candidate_id, []).append([kind, value])
+        records = [
+            {"f": scope, "c": candidate_id, "keys": keys.get(candidate_id, []), "n": n}
+            for candidate_id, (scope, n) in self._candidates.items()
+        ]
+        records += [{"f": scope, "anon": n} for scope, n in self._anonymous.items()]
+        records += [
+            {"f": scope, "t": token, "c": candidate_id, "d": duplicate, "s": seen_at}
+            for token, (scope, candidate_id, duplicate, seen_at) in self._tokens.items()
+        ]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        logger.info(f"Индекс дублей сжат: {self._lines} -> {len(records)} строк")
+        self._lines = len(records)
+
+    def _observe(self, scope, email, phone):
+        keys = [(scope, "e", email)] if email else []
+        if phone:
+            keys.append((scope, "p", phone))
+        candidate_id = next((self._keys[key] for key in keys if key in self._keys), None)
+        duplicate = candidate_id is not None
+        if duplicate:
+            self._candidates[candidate_id][1] += 1
+        else:
+            candidate_id = self._next_id
+            self._next_id += 1
+            self._candidates[candidate_id] = [scope, 1]
+        for key in keys:
+            self._keys.setdefault(key, candidate_id)
+        return candidate_id, duplicate
+
+    def _append(self, record):
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._lines += 1
+
+    def observe(self, scope, email, phone, token=None):
+        email, phone = normalize_email(email), normalize_phone(phone)
+        with self._lock:
+            self._prune_tokens()
+            seen = self._tokens.get(token) if token else None
+            now = round(time.time(), 1)
+            if seen is not None:
+                scope, candidate_id, duplicate, _ = seen
+            elif not email and not phone:
+                # Без контактов кандидата не опознать — каждый такой отклик считается новым
+                self._anonymous[scope] = self._anonymous.get(scope, 0) + 1
+                candidate_id, duplicate = None, False
+                self._append({"f": scope, "t": token, "s": now} if token else {"f": scope})
+            else:
+                candidate_id, duplicate = self._observe(scope, email, phone)
+                record = {"f": scope, "e": email, "p": phone}
+                self._append({**record, "t": token, "s": now} if token else record)
+            if token and seen is None:
+                self._tokens[token] = (scope, candidate_id, duplicate, now)
+        if candidate_id is None:
+            return None, False
+        return f"{scope}:{candidate_id}", duplicate
+
+    def stats(self):
+        """
+        По формам: submissions, candidates (уникальные), duplicates и duplicate_rate.
+        """
+        with self._lock:
+            forms = {}
+            for scope, n in self._candidates.values():
+                s = forms.setdefault(scope, {"submissions": 0, "candidates": 0})
+                s["submissions"] += n
+                s["candidates"] += 1
+            for scope, n in self._anonymous.items():
+                s = forms.setdefault(scope, {"submissions": 0, "candidates": 0})
+                s["submissions"] += n
+                s["candidates"] += n
+        for s in forms.values():
+            s["duplicates"] = s["submissions"] - s["candidates"]
+            s["duplicate_rate"] = round(s["duplicates"] / s["submissions"], 4)
+        return forms
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DedupIndex(DEDUP_INDEX_PATH)
+    return _index
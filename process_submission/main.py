@@ -1,9 +1,16 @@
 import logging
 from flask import jsonify, Request
-from urllib.parse import parse_qs, urlparse
+from functools import lru_cache
+from urllib.parse import unquote_plus
 import json
-import re
-from settings import PROCESS_SUBMISSION_URL
+import candidate_store
+import dedup_index
+import rules
+import ruleset_store
+import submission_queue
+import worker
+from webhook import verify_signature, SIGNATURE_HEADER
+from settings import PROCESS_SUBMISSION_URL, TYPEFORM_WEBHOOK_SECRET, QUEUE_BATCH_SIZE
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("process_submission")
@@ -18,51 +25,63 @@ logger = logging.getLogger("process_submission")
 # --- Cloud Function ---
 def validate_must_haves(must_haves_text, form_data):
     """
-    Валидирует must-have параметры на основе ответов из формы.
-    Возвращает True если все требования выполнены, False иначе.
+    Валидирует must-have параметры на основе ответов из формы (см. rules.evaluate).
+    Возвращает (passed, report): passed — True, если все требования выполнены,
+    report — вердикт по каждому правилу.
     Особое правило: если есть вопрос budget_accept, именно его ответ считается must-have по бюджету.
     """
     logger.info(f"Валидация must-haves: {must_haves_text}")
-    
-    # Парсим must-haves из текста
-    must_have_list = [line.strip('-•: .').strip() for line in must_haves_text.split('\n') if line.strip()]
-    
-    # Проверяем каждый must-have параметр
-    for requirement in must_have_list:
-        if not requirement:
-            continue
-        # Особая обработка для бюджета
-        if 'бюджет' in requirement.lower() or 'budget' in requirement.lower():
-            # Проверяем только ответ на budget_accept
-            answer = form_data.get('budget_accept')
-            if answer is None:
-                logger.warning("Нет ответа на вопрос budget_accept (подтверждение бюджета)")
-                return False
-            if answer.lower() in ['yes', 'да', 'true', '1']:
-                logger.info(f"✓ Требование по бюджету подтверждено (budget_accept: {answer})")
-                continue
-            else:
-                logger.warning(f"✗ Требование по бюджету НЕ выполнено (budget_accept: {answer})")
-                return False
-        # Обычная проверка для остальных must-have
-        found_match = False
-        for field_ref, answer in form_data.items():
-            if 'musthave' in field_ref.lower() and requirement.lower() in field_ref.lower():
-                if answer.lower() in ['yes', 'да', 'true', '1']:
-                    found_match = True
-                    logger.info(f"✓ Требование '{requirement}' выполнено")
-                    break
-                else:
-                    logger.warning(f"✗ Требование '{requirement}' НЕ выполнено (ответ: {answer})")
-                    return False
-        if not found_match and not ('бюджет' in requirement.lower() or 'budget' in requirement.lower()):
-            logger.warning(f"⚠ Требование '{requirement}' не найдено в ответах формы")
-    return True
+    passed, report = rules.evaluate(must_haves_text, form_data)
+    for verdict in report:
+        if verdict["status"] == "fail":
+            logger.warning(f"✗ Требование '{verdict['requirement']}' НЕ выполнено (ответ: {verdict['answer']})")
+        elif verdict["status"] == "missing" and verdict["kind"] != "contact":
+            logger.warning(f"⚠ Требование '{verdict['requirement']}' не найдено в ответах формы")
+    return passed, report
+
+# Ответы повторяются ("Да", "Нет"): декодированное значение берётся из кэша
+_unquote = lru_cache(maxsize=256)(unquote_plus)
+
+def split_compact(query_string):
+    """
+    Компактный redirect_url: v=<версия набора правил>&a=<ответ>,<ответ>,...&form_id=<id формы>.
+    Строка запроса разбирается за один проход без декодирования остальных параметров; ответы делятся
+    по запятой до декодирования — запятая внутри ответа приходит закодированной (%2C).
+    Возвращает (версия, ответы, form_id) или None, если это прежний формат.
+    """
+    version = answers = None
+    form_id = ""
+    for part in query_string.split("&"):
+        key, _, value = part.partition("=")
+        if key == "v":
+            version = value
+        elif key == "a":
+            answers = value
+        elif key == "form_id":
+            form_id = _unquote(value)
+    if not version or answers is None:
+        return None
+    answers = [_unquote(answer) if "%" in answer or "+" in answer else answer for answer in answers.split(",")]
+    return version, answers, form_id
 
-def extract_form_data(url_params):
+def extract_form_data(url_params, query_string=""):
     """
-    Извлекает данные формы из URL параметров Typeform.
+    Извлекает данные формы из URL параметров Typeform. Компактный redirect_url сопоставляется
+    с ref по набору правил версии (ruleset_store), must_haves берутся из него же. form_id в обоих
+    форматах добавляет generate_form (json_builder.with_form_id) — по нему отклик попадает в ту же
+    область dedup_index, что и ответ из вебхука.
     """
+    compact = split_compact(query_string) if query_string else None
+    if compact:
+        version, answers, form_id = compact
+        ruleset = ruleset_store.get(version)
+        if len(answers) != len(ruleset.refs):
+            raise ValueError(f"Ожидалось ответов: {len(ruleset.refs)}, получено: {len(answers)}")
+        form_data = dict(zip(ruleset.refs, answers))
+        # Компактный redirect_url стоит только на экране успешного прохождения формы
+        form_data.update({"pass": "true", "must_haves": ruleset.must_haves, "ruleset": version, "form_id": form_id})
+        return form_data
+
     form_data = {}
     
     # Typeform передает данные в формате field:ref=value
@@ -75,6 +94,38 @@ def extract_form_data(url_params):
     
     return form_data
 
+def save_candidate(is_valid, form_data, must_haves, verdicts):
+    """
+    Сохраняет результат проверки (candidate_store). В лист результатов строку выгружает фоновый
+    поток этого инстанса (candidate_store.flush_in_background) — ответ кандидату не ждёт Sheets.
+    Повторный отклик того же кандидата (dedup_index) заменяет прежний.
+    Ошибка сохранения не должна ломать ответ кандидату — только логируется.
+    Возвращает True, если кандидат уже откликался на эту форму.
+    """
+    scope = dedup_index.form_scope(form_data.get('form_id', ''), must_haves)
+    candidate_key, duplicate = dedup_index.get_index().observe(
+        scope, form_data.get('email', ''), form_data.get('phone', '')
+    )
+    if duplicate:
+        logger.info(f"Повторный отклик кандидата {candidate_key}")
+    candidate = {
+        "status": "success" if is_valid else "rejected",
+        "form_id": form_data.get('form_id', ''),
+        "candidate_data": {
+            "email": form_data.get('email', ''),
+            "phone": form_data.get('phone', ''),
+            "must_haves": must_haves
+        },
+        "verdicts": verdicts,
+        "candidate_key": candidate_key
+    }
+    try:
+        candidate_store.save([candidate], "redirect")
+        candidate_store.flush_in_background()
+    except Exception as e:
+        logger.error(f"Ошибка сохранения кандидата: {e}")
+    return duplicate
+
 def process_submission(request: Request):
     """
     Обрабатывает данные из формы Typeform и выполняет финальную валидацию.
@@ -83,13 +134,17 @@ def process_submission(request: Request):
     
     try:
         # Получаем параметры из URL
-        args = request.args
+        try:
+            form_data = extract_form_data(request.args, request.query_string.decode("utf-8", "replace"))
+        except (ruleset_store.UnknownRulesetError, ValueError) as e:
+            logger.warning(f"Некорректный redirect: {e}")
+            return jsonify({"error": str(e)}), 400
         
         # Проверяем обязательные параметры
-        if 'pass' not in args:
+        if 'pass' not in form_data:
             return jsonify({"error": "Отсутствует параметр pass"}), 400
         
-        pass_status = args.get('pass')
+        pass_status = form_data.get('pass')
         
         if pass_status != 'true':
             logger.info("Кандидат не прошел предварительную проверку")
@@ -98,23 +153,20 @@ def process_submission(request: Request):
                 "message": "Кандидат не соответствует требованиям"
             }), 200
         
-        # Извлекаем данные формы
-        form_data = extract_form_data(args)
         logger.info(f"Данные формы: {form_data}")
         
         # Получаем must-haves
-        must_haves = args.get('must_haves', '')
+        must_haves = form_data.get('must_haves', '')
         if not must_haves:
             logger.warning("Отсутствуют must-have параметры")
             return jsonify({"error": "Отсутствуют must-have параметры"}), 400
         
         # Выполняем финальную валидацию
-        is_valid = validate_must_haves(must_haves, form_data)
+        is_valid, verdicts = validate_must_haves(must_haves, form_data)
+        duplicate = save_candidate(is_valid, form_data, must_haves, verdicts)
         
         if is_valid:
             logger.info("Кандидат прошел финальную валидацию")
-            # Здесь можно добавить логику для сохранения данных в БД
-            # или отправки уведомлений
             
             # Редирект на финальную ссылку из settings
             redirect_url = PROCESS_SUBMISSION_URL
@@ -127,19 +179,62 @@ def process_submission(request: Request):
                     "email": form_data.get('email', ''),
                     "phone": form_data.get('phone', ''),
                     "must_haves": must_haves
-                }
+                },
+                "verdicts": verdicts,
+                "duplicate": duplicate
             }), 200
         else:
             logger.info("Кандидат не прошел финальную валидацию")
             return jsonify({
                 "status": "rejected",
-                "message": "Кандидат не прошел финальную валидацию must-have параметров"
+                "message": "Кандидат не прошел финальную валидацию must-have параметров",
+                "verdicts": verdicts,
+                "duplicate": duplicate
             }), 200
             
     except Exception as e:
         logger.error(f"Ошибка обработки данных: {e}")
         return jsonify({"error": str(e)}), 500
 
+def typeform_webhook(request: Request):
+    """
+    Вебхук Typeform: проверяет подпись, кладёт ответ в очередь и сразу отвечает 200.
+    Валидация выполняется воркером (drain_submissions). must_haves передаётся
+    в query-параметре URL вебхука, как и в redirect_url.
+    """
+    if not TYPEFORM_WEBHOOK_SECRET:
+        logger.error("TYPEFORM_WEBHOOK_SECRET не задан, вебхук отключён")
+        return jsonify({"error": "Вебхук не настроен"}), 503
+    body = request.get_data()
+    if not verify_signature(body, request.headers.get(SIGNATURE_HEADER), TYPEFORM_WEBHOOK_SECRET):
+        logger.warning("Вебхук с неверной подписью отклонён")
+        return jsonify({"error": "Неверная подпись"}), 401
+    try:
+        event_id = json.loads(body).get("event_id")
+    except (ValueError, AttributeError):
+        return jsonify({"error": "Тело вебхука не JSON-объект"}), 400
+    queued = submission_queue.enqueue(body.decode("utf-8"), event_id, request.args.get("must_haves", ""))
+    return jsonify({"status": "queued" if queued else "duplicate", "event_id": event_id}), 200
+
+def drain_submissions(request: Request):
+    """
+    Разбирает очередь ответов из вебхука пачками (вызывается по расписанию) и выгружает
+    в лист результатов всех сохранённых кандидатов, включая пришедших через redirect.
+    Параметры: batch_size, max_batches.
+    """
+    try:
+        batch_size = int(request.args.get("batch_size", QUEUE_BATCH_SIZE))
+        max_batches = request.args.get("max_batches")
+        summary = worker.drain(batch_size, int(max_batches) if max_batches else None)
+        summary["exported"] += candidate_store.flush()
+        return jsonify({
+            "summary": summary, "queue": submission_queue.stats(), "pending_export": candidate_store.pending(),
+            "duplicates": dedup_index.get_index().stats()
+        }), 200
+    except Exception as e:
+        logger.error(f"Ошибка разбора очереди: {e}")
+        return jsonify({"error": str(e)}), 500
+
 #@app.route("/")
 #def index():
 #    return "OK" 
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+Модуль rules: must-have требования формы, скомпилированные в набор правил.
+Текст must_haves разбирается один раз на форму (text_parsing, кэш по тексту; правила — по тексту
+и набору musthave-ref), дальше каждая отправка проверяется поиском ответов в dict по ref.
+"""
+
+from functools import lru_cache
+import text_parsing
+from settings import REQUIRED_FIELDS
+
+ACCEPTED_ANSWERS = frozenset(("yes", "да", "true", "1"))
+BUDGET_REF = "budget_accept"
+MUSTHAVE_MARKER = "musthave"
+# ref вопроса требования — как в generate_form/question_builder.must_have_ref
+MUSTHAVE_REF_PREFIX = "musthave_"
+MAX_REF_LENGTH = 240
+RULES_CACHE_SIZE = 256
+
+
+class Rule:
+    """
+    Одно правило: kind — musthave | budget | contact; ref — поле формы с ответом
+    (None, если в форме нет подходящего вопроса); blocking — проваленное правило отклоняет кандидата.
+    """
+
+    __slots__ = ("requirement", "kind", "ref", "blocking")
+
+    def __init__(self, requirement, kind, ref, blocking=True):
+        self.requirement = requirement
+        self.kind = kind
+        self.ref = ref
+        self.blocking = blocking
+
+
+def musthave_refs(form_data):
+    """
+    ref вопросов must-have в порядке параметров redirect_url.
+    """
+    return tuple(ref for ref in form_data if MUSTHAVE_MARKER in ref.lower())
+
+
+def requirement_ref(requirement, idx):
+    """
+    ref вопроса требования: musthave_<slug> (кириллица — транслитом), для требования
+    без латиницы и цифр — musthave_<номер требования с 1>.
+    """
+    slug = text_parsing.slugify(requirement)
+    return MUSTHAVE_REF_PREFIX + (slug[:MAX_REF_LENGTH] or str(idx + 1))
+
+
+def _contains_words(ref, requirement):
+    # Слова slug требования идут подряд среди слов ref: "python" находит
+    # musthave_python_experience, но "java" не находит musthave_javascript
+    words = text_parsing.slugify(requirement).split("_")
+    ref_words = text_parsing.slugify(ref).split("_")
+    if not words[0]:
+        return False
+    size = len(words)
+    return any(ref_words[i:i + size] == words for i in range(len(ref_words) - size + 1))
+
+
+@lru_cache(maxsize=RULES_CACHE_SIZE)
+def compile_rules(must_haves_text, refs):
+    """
+    Компилирует must-haves формы в кортеж правил. refs — musthave-ref формы (см. musthave_refs).
+    Ответ на требование ищется сначала точным совпадением ref (requirement_ref), затем — для ref,
+    выбранных GPT, и форм, созданных до requirement_ref, — по словам требования среди слов ещё
+    не занятых ref. Требование про бюджет проверяется только ответом budget_accept; контакты из
+    REQUIRED_FIELDS и перечисленные в must-haves не блокируют.
+    """
+    rules = []
+    parsed = text_parsing.parse_must_haves(must_haves_text)
+    by_ref = {ref.lower(): ref for ref in refs}
+    requirements = [requirement for requirement, kind in parsed.items if kind == "musthave"]
+    matched = {}
+    for idx, requirement in enumerate(requirements):
+        ref = by_ref.get(requirement_ref(requirement, idx))
+        if ref is not None and ref not in matched.values():
+            matched[idx] = ref
+    free = [ref for ref in refs if ref not in matched.values()]
+    for idx, requirement in enumerate(requirements):
+        if idx in matched:
+            continue
+        ref = next((ref for ref in free if _contains_words(ref, requirement)), None)
+        if ref is not None:
+            matched[idx] = ref
+            free.remove(ref)
+    musthaves = 0
+    for requirement, kind in parsed.items:
+        if kind == "budget":
+            rules.append(Rule(requirement, "budget", BUDGET_REF))
+        elif kind == "musthave":
+            rules.append(Rule(requirement, "musthave", matched.get(musthaves)))
+            musthaves += 1
+    for contact in dict.fromkeys([*REQUIRED_FIELDS, *parsed.contacts]):
+        rules.append(Rule(contact, "contact", contact, blocking=False))
+    return tuple(rules)
+
+
+def _verdict(rule, answer):
+    if rule.ref is None or answer is None or (rule.kind == "contact" and not answer):
+        # Нет вопроса в форме — не блокирует; нет ответа на budget_accept — отказ
+        return "fail" if rule.kind == "budget" else "missing"
+    if rule.kind == "contact":
+        return "pass"
+    return "pass" if answer.strip().lower() in ACCEPTED_ANSWERS else "fail"
+
+
+def evaluate(must_haves_text, form_data):
+    """
+    Проверяет ответы формы по правилам. Возвращает (passed, report):
+    report — список {requirement, kind, ref, answer, status}, status — pass | fail | missing.
+    """
+    rules = compile_rules(must_haves_text, musthave_refs(form_data))
+    passed = True
+    report = []
+    for rule in rules:
+        answer = form_data.get(rule.ref) if rule.ref is not None else None
+        status = _verdict(rule, answer)
+        if status == "fail" and rule.blocking:
+            passed = False
+        report.append({
+            "requirement": rule.requirement, "kind": rule.kind, "ref": rule.ref, "answer": answer, "status": status
+        })
+    return passed, report
+
+
+def cache_info():
+    return compile_rules.cache_info()._asdict()
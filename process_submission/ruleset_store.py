@@ -0,0 +1,82 @@
+"""
+Модуль ruleset_store: наборы правил форм для компактного redirect_url (v=<версия>&a=<ответы>).
+generate_form дописывает в лист RULESETS_SHEET строку на версию: версия, must-haves, ref ответов
+по порядку (JSON). Версия — хэш содержимого, набор неизменяем, поэтому хранится в памяти
+инстанса без срока жизни. Неизвестная версия — лист перечитывается целиком одним запросом,
+но не чаще RULESETS_REFRESH_INTERVAL секунд.
+"""
+
+import json
+import logging
+import threading
+import time
+from candidate_store import get_sheets_service
+from settings import GOOGLE_SHEET_ID, RULESETS_SHEET, RULESETS_REFRESH_INTERVAL
+
+logger = logging.getLogger("ruleset_store")
+
+_lock = threading.Lock()
+_rulesets = {}
+_refreshed_at = None
+
+
+class UnknownRulesetError(LookupError):
+    pass
+
+
+class Ruleset:
+    """
+    Набор правил формы: must_haves — текст требований, refs — ref ответов в порядке параметра a.
+    """
+
+    __slots__ = ("version", "must_haves", "refs")
+
+    def __init__(self, version, must_haves, refs):
+        self.version = version
+        self.must_haves = must_haves
+        self.refs = refs
+
+
+def read_sheet():
+    result = get_sheets_service().values().get(spreadsheetId=GOOGLE_SHEET_ID, range=f"{RULESETS_SHEET}!A:C").execute()
+    return result.get("values", [])
+
+
+def load(rows):
+    """
+    Добавляет наборы из строк листа [версия, must-haves, refs JSON]; битые строки пропускаются.
+    Возвращает количество новых наборов.
+    """
+    added = 0
+    for row in rows:
+        if len(row) < 3 or row[0] in _rulesets:
+            continue
+        try:
+            refs = tuple(json.loads(row[2]))
+        except ValueError:
+            logger.warning(f"Набор правил {row[0]}: ref не JSON, строка пропущена")
+            continue
+        _rulesets[row[0]] = Ruleset(row[0], row[1], refs)
+        added += 1
+    return added
+
+
+def get(version, reader=read_sheet):
+    """
+    Набор правил по версии. Неизвестная версия после перечитывания листа — UnknownRulesetError.
+    """
+    ruleset = _rulesets.get(version)
+    if ruleset is not None:
+        return ruleset
+    global _refreshed_at
+    with _lock:
+        ruleset = _rulesets.get(version)
+        stale = _refreshed_at is None or time.monotonic() - _refreshed_at >= RULESETS_REFRESH_INTERVAL
+        if ruleset is None and stale:
+            added = load(reader())
+            _refreshed_at = time.monotonic()
+            logger.info(f"Лист {RULESETS_SHEET} перечитан: новых наборов правил {added}, всего {len(_rulesets)}")
+            ruleset = _rulesets.get(version)
+    if ruleset is None:
+        raise UnknownRulesetError(f"Неизвестная версия набора правил: {version}")
+    return ruleset
@@ -28,6 +28,10 @@ REGION = os.environ.get("REGION", "us-central1")
 PROJECT = os.environ.get("PROJECT", "qalearn")
 GOOGLE_SHEET_ID = os.environ.get("GOOGLE_SHEET_ID")
 GOOGLE_CREDS_PATH = os.environ.get("GOOGLE_CREDS_PATH", "creds.json")
+# Локальный стенд Sheets (benchmarks/fakes.py): свой адрес API и запросы без сервисного аккаунта
+SHEETS_API_ENDPOINT = os.environ.get("SHEETS_API_ENDPOINT")
+GOOGLE_ANONYMOUS_CREDENTIALS = os.environ.get("GOOGLE_ANONYMOUS_CREDENTIALS") in ("1", "true")
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "60"))  # секунды, запросы к Sheets
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 TYPEFORM_API_KEY = os.environ.get("TYPEFORM_API_KEY")
 
@@ -37,3 +41,27 @@ LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 # Настройки валидации
 REQUIRED_FIELDS = ["email", "phone"]
 PROCESS_SUBMISSION_URL = "https://us-central1-qalearn.cloudfunctions.net/process_submission"
+
+# Вебхук Typeform: секрет подписи (Typeform-Signature) и локальная очередь ответов
+TYPEFORM_WEBHOOK_SECRET = os.environ.get("TYPEFORM_WEBHOOK_SECRET")
+SUBMISSION_QUEUE_PATH = os.environ.get("SUBMISSION_QUEUE_PATH", "/tmp/submission_queue.sqlite3")
+QUEUE_BATCH_SIZE = int(os.environ.get("QUEUE_BATCH_SIZE", "200"))
+QUEUE_LEASE_SECONDS = float(os.environ.get("QUEUE_LEASE_SECONDS", "300"))  # после — ответ снова в очереди
+QUEUE_MAX_ATTEMPTS = int(os.environ.get("QUEUE_MAX_ATTEMPTS", "5"))
+
+# Сохранение кандидатов: локальная SQLite и пакетная выгрузка в лист результатов
+CANDIDATE_DB_PATH = os.environ.get("CANDIDATE_DB_PATH", "/tmp/candidates.sqlite3")
+RESULTS_SHEET = os.environ.get("RESULTS_SHEET", "candidates")
+CANDIDATE_SHEET_EXPORT = os.environ.get("CANDIDATE_SHEET_EXPORT", "1") not in ("0", "false")
+CANDIDATE_FLUSH_SIZE = int(os.environ.get("CANDIDATE_FLUSH_SIZE", "200"))          # строк на один values.append
+CANDIDATE_FLUSH_INTERVAL = float(os.environ.get("CANDIDATE_FLUSH_INTERVAL", "60"))  # секунды до выгрузки неполной пачки
+
+# Наборы правил компактного redirect_url (v=<версия>&a=<ответы>): лист, который пишет generate_form,
+# и через сколько секунд перечитывать лист при запросе неизвестной версии
+RULESETS_SHEET = os.environ.get("RULESETS_SHEET", "rulesets")
+RULESETS_REFRESH_INTERVAL = float(os.environ.get("RULESETS_REFRESH_INTERVAL", "5"))
+
+# Индекс повторных откликов (email/телефон + форма), восстанавливается из файла при старте
+DEDUP_INDEX_PATH = os.environ.get("DEDUP_INDEX_PATH", "/tmp/dedup_index.jsonl")
+# Сколько секунд помнить token ответа: дольше, чем ответ может вернуться в очередь (аренда × попытки)
+DEDUP_TOKEN_TTL = float(os.environ.get("DEDUP_TOKEN_TTL", str(24 * 3600)))
@@ -0,0 +1,123 @@
+"""
+Модуль submission_queue: долговременная очередь ответов из вебхука Typeform на SQLite.
+Вебхук только кладёт ответ в очередь (одна вставка), воркер забирает пачками с арендой:
+если воркер упал, не подтвердив пачку, по истечении аренды ответы снова доступны.
+"""
+
+import sqlite3
+import threading
+import time
+from settings import SUBMISSION_QUEUE_PATH, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    must_haves TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    enqueued_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS submissions_status ON submissions (status, id);
+"""
+
+_local = threading.local()
+
+
+def _connect(path=None):
+    path = path or SUBMISSION_QUEUE_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+def enqueue(payload, event_id=None, must_haves="", path=None):
+    """
+    Кладёт ответ в очередь. Повторная доставка того же event_id игнорируется.
+    Возвращает True, если ответ добавлен, False — если это дубль.
+    """
+    cursor = _connect(path).execute(
+        "INSERT OR IGNORE INTO submissions (event_id, payload, must_haves, enqueued_at) VALUES (?, ?, ?, ?)",
+        (event_id, payload, must_haves or "", time.time()),
+    )
+    return cursor.rowcount == 1
+
+
+def claim(batch_size, lease_seconds=QUEUE_LEASE_SECONDS, max_attempts=QUEUE_MAX_ATTEMPTS, path=None):
+    """
+    Забирает до batch_size ответов: новые и те, чья аренда истекла (пока не исчерпаны попытки).
+    Ответы с истёкшей арендой и исчерпанными попытками (воркер падал на них max_attempts раз)
+    в той же транзакции помечаются failed. Возвращает список (id, payload, must_haves).
+    """
+    conn = _connect(path)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE submissions SET status = 'failed', error = ?, lease_until = NULL "
+            "WHERE status = 'processing' AND lease_until < ? AND attempts >= ?",
+            (f"аренда истекла, попыток: {max_attempts}", now, max_attempts),
+        )
+        rows = conn.execute(
+            "SELECT id, payload, must_haves FROM submissions "
+            "WHERE status = 'queued' OR (status = 'processing' AND lease_until < ? AND attempts < ?) "
+            "ORDER BY id LIMIT ?",
+            (now, max_attempts, batch_size),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE submissions SET status = 'processing', lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+            [(now + lease_seconds, row[0]) for row in rows],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return rows
+
+
+def complete(results, path=None):
+    """
+    Подтверждает обработку пачки одной транзакцией. results — список (id, result_json).
+    """
+    conn = _connect(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "UPDATE submissions SET status = 'done', result = ?, error = NULL, lease_until = NULL WHERE id = ?",
+            [(result, item_id) for item_id, result in results],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def fail(item_id, error, max_attempts=QUEUE_MAX_ATTEMPTS, path=None):
+    """
+    Возвращает ответ в очередь; после max_attempts попыток — помечает failed.
+    """
+    _connect(path).execute(
+        "UPDATE submissions SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+        "error = ?, lease_until = NULL WHERE id = ?",
+        (max_attempts, str(error), item_id),
+    )
+
+
+def stats(path=None):
+    """
+    Количество ответов по статусам: queued, processing, done, failed.
+    """
+    rows = _connect(path).execute("SELECT status, COUNT(*) FROM submissions GROUP BY status").fetchall()
+    return {status: count for status, count in rows}
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Модули функции плоские (from settings import ...), как в Cloud Functions
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Локальные хранилища функции — во временном каталоге, а не в /tmp инстанса
+_data_dir = tempfile.mkdtemp(prefix="process_submission_tests_")
+os.environ.setdefault("CANDIDATE_DB_PATH", os.path.join(_data_dir, "candidates.sqlite3"))
+os.environ.setdefault("SUBMISSION_QUEUE_PATH", os.path.join(_data_dir, "submission_queue.sqlite3"))
+os.environ.setdefault("DEDUP_INDEX_PATH", os.path.join(_data_dir, "dedup_index.jsonl"))
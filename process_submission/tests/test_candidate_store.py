@@ -0,0 +1,59 @@
+import threading
+import time
+import pytest
+import candidate_store
+import main
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    path = str(tmp_path / "candidates.sqlite3")
+    monkeypatch.setattr(candidate_store, "CANDIDATE_DB_PATH", path)
+    monkeypatch.setattr(candidate_store, "CANDIDATE_SHEET_EXPORT", True)
+    monkeypatch.setattr(candidate_store, "GOOGLE_SHEET_ID", "sheet")
+    return path
+
+
+def wait_flusher(timeout=5):
+    deadline = time.time() + timeout
+    while candidate_store._flusher is not None and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_redirect_flushes_in_background(store, monkeypatch):
+    release = threading.Event()
+    written = []
+    flush = candidate_store.flush
+
+    def slow_flush(*args, **kwargs):
+        release.wait(5)
+        return flush(force=True, writer=written.extend)
+
+    monkeypatch.setattr(candidate_store, "flush", slow_flush)
+    # Ответ кандидату не ждёт выгрузку
+    main.save_candidate(True, {"form_id": "f1", "email": "a@example.com"}, "Python", [])
+    assert candidate_store.pending() == 1
+    release.set()
+    wait_flusher()
+    assert candidate_store._flusher is None
+    assert [row[3] for row in written] == ["a@example.com"]
+    assert candidate_store.pending() == 0
+
+
+def test_flush_exports_redirect_candidates(store, monkeypatch):
+    monkeypatch.setattr(candidate_store, "flush_in_background", lambda: None)
+    main.save_candidate(False, {"form_id": "f2", "email": "b@example.com"}, "Python", [])
+    written = []
+    assert candidate_store.flush(force=True, writer=written.extend) == 1
+    assert written[0][2:6] == ["f2", "b@example.com", "", "rejected"]
+    assert candidate_store.pending() == 0
+
+
+def test_flush_keeps_rows_on_write_error(store):
+    candidate_store.save([{"status": "success", "candidate_data": {"email": "c@example.com"}}], "webhook")
+
+    def writer(values):
+        raise OSError("Sheets недоступен")
+
+    assert candidate_store.flush(force=True, writer=writer) == 0
+    assert candidate_store.pending() == 1
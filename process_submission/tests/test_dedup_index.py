@@ -0,0 +1,68 @@
+import dedup_index
+
+
+def test_contacts_identify_candidate(tmp_path):
+    index = dedup_index.DedupIndex(str(tmp_path / "index.jsonl"))
+    first, duplicate = index.observe("f1", "A@Example.com", "")
+    assert not duplicate
+    assert index.observe("f1", "", "8 (999) 123-45-67") != (first, True)
+    assert index.observe("f1", "a@example.com", "+7 999 123 45 67") == (first, True)
+    assert index.observe("f2", "a@example.com", "")[1] is False
+
+
+def test_observe_idempotent_per_token(tmp_path):
+    path = str(tmp_path / "index.jsonl")
+    index = dedup_index.DedupIndex(path)
+    first = index.observe("f1", "a@example.com", "", "tok1")
+    # Повторная обработка того же ответа после сбоя воркера
+    assert index.observe("f1", "a@example.com", "", "tok1") == first
+    assert index.observe("f1", "", "", "tok2") == (None, False)
+    assert index.observe("f1", "", "", "tok2") == (None, False)
+    assert index.stats()["f1"] == {"submissions": 2, "candidates": 2, "duplicates": 0, "duplicate_rate": 0.0}
+    second = index.observe("f1", "a@example.com", "", "tok3")
+    assert second == (first[0], True)
+
+    restored = dedup_index.DedupIndex(path)
+    assert restored.observe("f1", "a@example.com", "", "tok1") == first
+    assert restored.observe("f1", "a@example.com", "", "tok3") == second
+    assert restored.stats() == index.stats()
+
+
+def test_tokens_survive_compaction(tmp_path):
+    path = str(tmp_path / "index.jsonl")
+    index = dedup_index.DedupIndex(path)
+    first = index.observe("f1", "a@example.com", "", "tok1")
+    index.observe("f1", "", "", "tok2")
+    index._compact()
+    restored = dedup_index.DedupIndex(path)
+    assert restored.observe("f1", "a@example.com", "", "tok1") == first
+    assert restored.observe("f1", "", "", "tok2") == (None, False)
+    assert restored.stats() == index.stats()
+
+
+def test_live_tokens_do_not_force_compaction_on_every_start(tmp_path, monkeypatch):
+    path = str(tmp_path / "index.jsonl")
+    index = dedup_index.DedupIndex(path)
+    for n in range(1500):
+        index.observe("f1", "a@example.com", "", f"tok{n}")
+    compactions = []
+    monkeypatch.setattr(dedup_index.DedupIndex, "_compact", lambda self: compactions.append(self._lines))
+    dedup_index.DedupIndex(path)
+    dedup_index.DedupIndex(path)
+    assert compactions == []
+
+
+def test_expired_tokens_pruned_and_compacted(tmp_path, monkeypatch):
+    path = str(tmp_path / "index.jsonl")
+    index = dedup_index.DedupIndex(path, token_ttl=60)
+    for n in range(1500):
+        index.observe("f1", f"c{n}@example.com" if n < 10 else "", "", f"tok{n}")
+    now = dedup_index.time.time()
+    monkeypatch.setattr(dedup_index.time, "time", lambda: now + 61)
+    restored = dedup_index.DedupIndex(path, token_ttl=60)
+    assert not restored._tokens
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 11
+    assert restored.stats() == index.stats()
+    # Истёкший token снова считается новым ответом
+    assert restored.observe("f1", "c0@example.com", "", "tok0")[1] is True
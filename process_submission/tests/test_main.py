@@ -0,0 +1,46 @@
+import json
+import pytest
+import candidate_store
+import dedup_index
+import main
+import ruleset_store
+import worker
+
+
+@pytest.fixture
+def ruleset(monkeypatch):
+    monkeypatch.setattr(ruleset_store, "_rulesets", {})
+    ruleset_store.load([["v1", "- Python", json.dumps(["musthave_python", "email", "phone"])]])
+    return "v1"
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    index = dedup_index.DedupIndex(str(tmp_path / "index.jsonl"))
+    monkeypatch.setattr(dedup_index, "get_index", lambda: index)
+    return index
+
+
+def test_compact_redirect_carries_form_id(ruleset):
+    form_data = main.extract_form_data({}, "v=v1&a=%D0%94%D0%B0,a%40example.com,&form_id=F1")
+    assert form_data["form_id"] == "F1"
+    assert form_data["musthave_python"] == "Да"
+    assert form_data["email"] == "a@example.com"
+
+
+def test_redirect_and_webhook_share_candidate_key(ruleset, index, monkeypatch):
+    saved = []
+    monkeypatch.setattr(candidate_store, "save", lambda candidates, source: saved.extend(candidates))
+    monkeypatch.setattr(candidate_store, "flush_in_background", lambda: None)
+    form_data = main.extract_form_data({}, "v=v1&a=%D0%94%D0%B0,a%40example.com,&form_id=F1")
+    main.save_candidate(True, form_data, form_data["must_haves"], [])
+    payload = {"form_response": {
+        "form_id": "F1", "token": "tok1",
+        "answers": [
+            {"type": "choice", "choice": {"label": "Да"}, "field": {"ref": "musthave_python"}},
+            {"type": "email", "email": "a@example.com", "field": {"ref": "email"}},
+        ],
+    }}
+    result = worker.evaluate_submission(json.dumps(payload), "- Python")
+    assert result["candidate_key"] == saved[0]["candidate_key"]
+    assert saved[0]["form_id"] == "F1"
@@ -0,0 +1,100 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+import pytest
+from flask import Flask, request
+import candidate_store
+import dedup_index
+import main
+import ruleset_store
+
+GENERATE_FORM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "generate_form")
+MUST_HAVES = "- Опыт с Python\n- Английский B2"
+
+# generate_form — отдельная функция со своими settings и main, поэтому форма собирается в подпроцессе
+BUILD_FORM = """
+import json, sys
+from form_compiler import build_form_shell, form_ruleset
+from json_builder import with_form_id
+from question_builder import ensure_must_have_questions
+must_haves = sys.argv[1]
+questions = ensure_must_have_questions([{"title": "Расскажите о последнем проекте", "field_type": "long_text"}], must_haves)
+shell = with_form_id(build_form_shell(questions, "Вакансия", must_haves), "F1")
+version, refs = form_ruleset(shell["fields"], must_haves)
+print(json.dumps({"row": [version, must_haves, json.dumps(refs)], "refs": refs,
+                  "redirect_url": shell["thankyou_screens"][0]["properties"]["redirect_url"]}))
+"""
+
+
+@pytest.fixture(scope="module")
+def generated():
+    env = {**os.environ, "REDIRECT_FORMAT": "compact"}
+    output = subprocess.run([sys.executable, "-c", BUILD_FORM, MUST_HAVES], cwd=GENERATE_FORM_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+@pytest.fixture
+def submit(generated, monkeypatch, tmp_path):
+    monkeypatch.setattr(ruleset_store, "_rulesets", {})
+    # Лист наборов правил только что перечитан: неизвестная версия не идёт в Sheets
+    monkeypatch.setattr(ruleset_store, "_refreshed_at", time.monotonic())
+    ruleset_store.load([generated["row"]])
+    index = dedup_index.DedupIndex(str(tmp_path / "index.jsonl"))
+    monkeypatch.setattr(dedup_index, "get_index", lambda: index)
+    monkeypatch.setattr(candidate_store, "save", lambda candidates, source: None)
+    monkeypatch.setattr(candidate_store, "flush_in_background", lambda: None)
+    app = Flask(__name__)
+
+    def submit(url):
+        with app.test_request_context("/?" + url.split("?", 1)[1]):
+            response, status = main.process_submission(request)
+            return status, response.get_json()
+    return submit
+
+
+def fill(redirect_url, answers):
+    """
+    Подставляет ответы вместо {field:ref}, кодируя их, как это делает Typeform.
+    """
+    return re.sub(r"\{field:([^}]+)\}", lambda match: quote(answers.get(match.group(1), ""), safe=""), redirect_url)
+
+
+def answers(generated, *must_have_answers, **contacts):
+    must_have_refs = [ref for ref in generated["refs"] if ref.startswith("musthave_")]
+    return {**dict(zip(must_have_refs, must_have_answers)), **contacts}
+
+
+def test_compact_redirect_roundtrip(generated, submit):
+    assert generated["refs"][-2:] == ["email", "phone"]
+    url = fill(generated["redirect_url"], answers(generated, "Да", "Да", email="a@example.com", phone="+7 900, доб. 1"))
+    status, body = submit(url)
+    assert status == 200
+    assert body["status"] == "success"
+    assert body["candidate_data"] == {"email": "a@example.com", "phone": "+7 900, доб. 1", "must_haves": MUST_HAVES}
+    assert [verdict["status"] for verdict in body["verdicts"] if verdict["kind"] != "contact"] == ["pass", "pass"]
+
+
+def test_compact_redirect_roundtrip_rejects_failed_must_have(generated, submit):
+    url = fill(generated["redirect_url"], answers(generated, "Да", "Нет", email="a@example.com"))
+    status, body = submit(url)
+    assert status == 200
+    assert body["status"] == "rejected"
+
+
+def test_unknown_ruleset_version_is_400(generated, submit):
+    url = fill(generated["redirect_url"], answers(generated, "Да", "Да"))
+    status, body = submit(re.sub(r"v=\w+", "v=000000000000", url))
+    assert status == 400
+    assert "000000000000" in body["error"]
+
+
+def test_answer_count_mismatch_is_400(generated, submit):
+    url = fill(generated["redirect_url"], answers(generated, "Да", "Да"))
+    status, body = submit(url.replace("&a=", "&a=%D0%94%D0%B0,"))
+    assert status == 400
+    assert "Ожидалось ответов: 4" in body["error"]
@@ -0,0 +1,52 @@
+import rules
+
+
+def refs_for(must_haves):
+    parsed = rules.text_parsing.parse_must_haves(must_haves)
+    return tuple(rules.requirement_ref(requirement, idx) for idx, requirement in enumerate(parsed.requirements))
+
+
+def test_exact_ref_match():
+    form = {"musthave_javascript": "Да", "musthave_java": "Нет", "email": "a@example.com"}
+    compiled = rules.compile_rules("JavaScript\nJava", rules.musthave_refs(form))
+    assert [(rule.requirement, rule.ref) for rule in compiled if rule.kind == "musthave"] == [
+        ("JavaScript", "musthave_javascript"), ("Java", "musthave_java"),
+    ]
+
+
+def test_substring_does_not_match():
+    compiled = rules.compile_rules("Java", ("musthave_javascript",))
+    assert compiled[0].ref is None
+    passed, report = rules.evaluate("Java", {"musthave_javascript": "Да", "email": "a@example.com"})
+    assert report[0]["status"] == "missing"
+
+
+def test_refs_built_like_generate_form():
+    must_haves = "3 года Python\nАнглийский B2\n★★★\nБюджет до 300 000 руб"
+    refs = refs_for(must_haves)
+    assert refs == ("musthave_3_goda_python", "musthave_angliyskiy_b2", "musthave_3")
+    form = {ref: "Да" for ref in refs}
+    form.update({"budget_accept": "Да", "email": "a@example.com", "phone": "+79990000000"})
+    passed, report = rules.evaluate(must_haves, form)
+    assert passed
+    assert [item["status"] for item in report if item["kind"] != "contact"] == ["pass"] * 4
+
+
+def test_failed_requirement_rejects():
+    passed, report = rules.evaluate("Python", {"musthave_python": "Нет", "email": "a@example.com"})
+    assert not passed
+    assert report[0]["status"] == "fail"
+
+
+def test_gpt_ref_with_suffix_falls_back_to_words():
+    form = {"musthave_python_experience": "Нет", "musthave_java": "Да", "email": "a@example.com"}
+    compiled = rules.compile_rules("Python\nJava", rules.musthave_refs(form))
+    assert [rule.ref for rule in compiled if rule.kind == "musthave"] == ["musthave_python_experience", "musthave_java"]
+    passed, report = rules.evaluate("Python\nJava", form)
+    assert not passed
+    assert report[0]["status"] == "fail"
+
+
+def test_fallback_skips_refs_claimed_by_exact_match():
+    compiled = rules.compile_rules("Python\nPython Django", ("musthave_python_django", "musthave_python_3"))
+    assert [rule.ref for rule in compiled if rule.kind == "musthave"] == ["musthave_python_3", "musthave_python_django"]
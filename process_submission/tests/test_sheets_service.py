@@ -0,0 +1,29 @@
+import threading
+import pytest
+import candidate_store
+
+
+@pytest.fixture
+def anonymous(monkeypatch):
+    monkeypatch.setattr(candidate_store, "GOOGLE_ANONYMOUS_CREDENTIALS", True)
+    monkeypatch.setattr(candidate_store, "_credentials", None)
+    monkeypatch.setattr(candidate_store, "_sheets", None)
+
+
+def test_service_shared_http_per_thread(anonymous):
+    barrier = threading.Barrier(4)
+    seen = []
+
+    def worker():
+        barrier.wait()
+        service = candidate_store.get_sheets_service()
+        request = service.values().get(spreadsheetId="sheet", range="A1")
+        seen.append((service, request.http))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(service) for service, _ in seen}) == 1
+    assert len({id(http) for _, http in seen}) == 4
@@ -0,0 +1,41 @@
+import pytest
+import submission_queue
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "queue.sqlite3")
+
+
+def test_claim_leases_and_complete(path):
+    assert submission_queue.enqueue("{}", "e1", path=path)
+    assert not submission_queue.enqueue("{}", "e1", path=path)
+    [(item_id, payload, must_haves)] = submission_queue.claim(10, path=path)
+    assert submission_queue.claim(10, path=path) == []
+    submission_queue.complete([(item_id, "{}")], path=path)
+    assert submission_queue.stats(path=path) == {"done": 1}
+
+
+def test_expired_lease_is_reclaimed(path):
+    submission_queue.enqueue("{}", "e1", path=path)
+    first = submission_queue.claim(10, lease_seconds=-1, path=path)
+    assert submission_queue.claim(10, lease_seconds=-1, path=path) == first
+
+
+def test_exhausted_expired_lease_marked_failed(path):
+    submission_queue.enqueue("{}", "e1", path=path)
+    for _ in range(2):
+        assert submission_queue.claim(10, lease_seconds=-1, max_attempts=2, path=path)
+    # Воркер дважды упал, не подтвердив ответ: он не должен остаться в processing навсегда
+    assert submission_queue.claim(10, lease_seconds=-1, max_attempts=2, path=path) == []
+    assert submission_queue.stats(path=path) == {"failed": 1}
+
+
+def test_fail_requeues_until_max_attempts(path):
+    submission_queue.enqueue("{}", "e1", path=path)
+    [(item_id, _, _)] = submission_queue.claim(10, path=path)
+    submission_queue.fail(item_id, "boom", max_attempts=2, path=path)
+    assert submission_queue.stats(path=path) == {"queued": 1}
+    submission_queue.claim(10, path=path)
+    submission_queue.fail(item_id, "boom", max_attempts=2, path=path)
+    assert submission_queue.stats(path=path) == {"failed": 1}
@@ -0,0 +1,59 @@
+import base64
+import hashlib
+import hmac
+import json
+from webhook import SIGNATURE_HEADER, parse_form_response, verify_signature
+
+SECRET = "s3cret"
+BODY = json.dumps({"event_id": "e1", "form_response": {"form_id": "F1"}}).encode("utf-8")
+
+
+def sign(body, secret=SECRET):
+    return "sha256=" + base64.b64encode(hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()).decode("ascii")
+
+
+def test_verify_signature_valid():
+    assert SIGNATURE_HEADER == "Typeform-Signature"
+    assert verify_signature(BODY, sign(BODY), SECRET)
+
+
+def test_verify_signature_tampered_body():
+    assert not verify_signature(BODY.replace(b"F1", b"F2"), sign(BODY), SECRET)
+    assert not verify_signature(BODY, sign(BODY, "other"), SECRET)
+
+
+def test_verify_signature_missing_header_or_secret():
+    assert not verify_signature(BODY, None, SECRET)
+    assert not verify_signature(BODY, "", SECRET)
+    assert not verify_signature(BODY, sign(BODY)[len("sha256="):], SECRET)
+    assert not verify_signature(BODY, sign(BODY), None)
+
+
+def test_parse_form_response_form_data():
+    parsed = parse_form_response({"form_response": {
+        "form_id": "F1", "token": "tok1", "submitted_at": "2026-10-18T10:00:00Z",
+        "hidden": {"must_haves": "- Python", "utm": 5},
+        "ending": {"id": "e1", "ref": "thankyou_fail"},
+        "answers": [
+            {"type": "choice", "choice": {"label": "Да"}, "field": {"ref": "musthave_python"}},
+            {"type": "choice", "choice": {"other": "Свой вариант"}, "field": {"ref": "source"}},
+            {"type": "choices", "choices": {"labels": ["Python", "Go"]}, "field": {"ref": "stack"}},
+            {"type": "boolean", "boolean": False, "field": {"ref": "relocation"}},
+            {"type": "number", "number": 150000, "field": {"ref": "salary"}},
+            {"type": "email", "email": "a@example.com", "field": {"ref": "email"}},
+            {"type": "phone_number", "phone_number": "+79000000000", "field": {"ref": "phone"}},
+            {"type": "text", "text": "без ref", "field": {"id": "abc"}},
+        ],
+    }})
+    assert (parsed["form_id"], parsed["token"], parsed["ending_ref"]) == ("F1", "tok1", "thankyou_fail")
+    assert parsed["form_data"] == {
+        "must_haves": "- Python", "utm": "5", "musthave_python": "Да", "source": "Свой вариант",
+        "stack": "Python, Go", "relocation": "no", "salary": "150000", "email": "a@example.com",
+        "phone": "+79000000000",
+    }
+
+
+def test_parse_form_response_empty_payload():
+    assert parse_form_response({}) == {
+        "form_id": None, "token": None, "submitted_at": None, "ending_ref": None, "form_data": {},
+    }
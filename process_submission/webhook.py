@@ -0,0 +1,63 @@
+"""
+Модуль webhook: проверка подписи вебхука Typeform и разбор его JSON в ответы формы
+в том же виде, что и из redirect_url (ref -> строка).
+"""
+
+import base64
+import hashlib
+import hmac
+
+SIGNATURE_HEADER = "Typeform-Signature"
+SIGNATURE_PREFIX = "sha256="
+FAIL_ENDING_REF = "thankyou_fail"
+
+# Тип ответа Typeform -> ключ, под которым лежит значение
+_ANSWER_KEYS = {
+    "text": "text", "email": "email", "phone_number": "phone_number", "url": "url",
+    "number": "number", "boolean": "boolean", "date": "date", "file_url": "file_url",
+}
+
+
+def verify_signature(body, signature, secret):
+    """
+    Typeform подписывает тело запроса: sha256=base64(HMAC-SHA256(secret, body)).
+    """
+    if not secret or not signature or not signature.startswith(SIGNATURE_PREFIX):
+        return False
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()
+    expected = SIGNATURE_PREFIX + base64.b64encode(digest).decode("ascii")
+    return hmac.compare_digest(expected, signature)
+
+
+def _answer_value(answer):
+    answer_type = answer.get("type")
+    if answer_type == "choice":
+        choice = answer.get("choice") or {}
+        return choice.get("label") or choice.get("other") or ""
+    if answer_type == "choices":
+        choices = answer.get("choices") or {}
+        return ", ".join(choices.get("labels") or [])
+    value = answer.get(_ANSWER_KEYS.get(answer_type, answer_type))
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    return "" if value is None else str(value)
+
+
+def parse_form_response(payload):
+    """
+    Разбирает payload вебхука. Возвращает dict: form_id, token, submitted_at, ending_ref,
+    form_data (ref -> ответ строкой; скрытые поля тоже попадают сюда).
+    """
+    response = payload.get("form_response") or {}
+    form_data = {key: str(value) for key, value in (response.get("hidden") or {}).items()}
+    for answer in response.get("answers") or []:
+        ref = (answer.get("field") or {}).get("ref")
+        if ref:
+            form_data[ref] = _answer_value(answer)
+    return {
+        "form_id": response.get("form_id"),
+        "token": response.get("token"),
+        "submitted_at": response.get("submitted_at"),
+        "ending_ref": (response.get("ending") or {}).get("ref"),
+        "form_data": form_data,
+    }
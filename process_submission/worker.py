@@ -0,0 +1,105 @@
+"""
+Модуль worker: разбор очереди ответов из вебхука пачками — валидация must-haves
+и сохранение вердикта. Запускается функцией drain_submissions или из командной строки:
+
+    python worker.py [--batch-size 200] [--interval 5]
+"""
+
+import argparse
+import json
+import logging
+import time
+import candidate_store
+import dedup_index
+import rules
+import submission_queue
+from webhook import parse_form_response, FAIL_ENDING_REF
+from settings import QUEUE_BATCH_SIZE
+
+logger = logging.getLogger("worker")
+
+
+def evaluate_submission(payload, must_haves):
+    """
+    Вердикт по одному ответу: rejected, если форма закончилась экраном отказа,
+    иначе — по правилам must-have (rules.evaluate). Индекс дублей учитывает ответ
+    по его token один раз — повторная обработка после сбоя не делает его дублем.
+    """
+    submission = parse_form_response(json.loads(payload))
+    form_data = submission["form_data"]
+    must_haves = must_haves or form_data.get("must_haves", "")
+    scope = dedup_index.form_scope(submission["form_id"], must_haves)
+    candidate_key, duplicate = dedup_index.get_index().observe(
+        scope, form_data.get("email", ""), form_data.get("phone", ""), submission["token"]
+    )
+    if submission["ending_ref"] == FAIL_ENDING_REF:
+        passed, verdicts = False, []
+    else:
+        passed, verdicts = rules.evaluate(must_haves, form_data)
+    return {
+        "status": "success" if passed else "rejected",
+        "form_id": submission["form_id"],
+        "token": submission["token"],
+        "submitted_at": submission["submitted_at"],
+        "candidate_data": {
+            "email": form_data.get("email", ""),
+            "phone": form_data.get("phone", ""),
+            "must_haves": must_haves,
+        },
+        "verdicts": verdicts,
+        "candidate_key": candidate_key,
+        "duplicate": duplicate,
+    }
+
+
+def drain(batch_size=QUEUE_BATCH_SIZE, max_batches=None):
+    """
+    Разбирает очередь пачками, пока она не опустеет (или max_batches пачек).
+    Кандидаты пачки сохраняются (candidate_store) до подтверждения пачки в очереди —
+    при сбое между ними пачка будет обработана повторно. Упавший ответ возвращается в очередь.
+    Возвращает счётчики processed, passed, rejected, duplicates, errors, exported.
+    """
+    summary = {
+        "processed": 0, "passed": 0, "rejected": 0, "duplicates": 0, "errors": 0, "batches": 0, "exported": 0
+    }
+    while max_batches is None or summary["batches"] < max_batches:
+        batch = submission_queue.claim(batch_size)
+        if not batch:
+            break
+        summary["batches"] += 1
+        results = []
+        for item_id, payload, must_haves in batch:
+            try:
+                result = evaluate_submission(payload, must_haves)
+            except Exception as e:
+                logger.error(f"Ошибка обработки ответа {item_id}: {e}")
+                submission_queue.fail(item_id, e)
+                summary["errors"] += 1
+                continue
+            summary["passed" if result["status"] == "success" else "rejected"] += 1
+            summary["duplicates"] += int(result["duplicate"])
+            results.append((item_id, result))
+        candidate_store.save([result for _, result in results], "webhook")
+        submission_queue.complete([(item_id, json.dumps(result, ensure_ascii=False)) for item_id, result in results])
+        summary["processed"] += len(results)
+        logger.info(f"Пачка {summary['batches']}: обработано {len(results)} из {len(batch)}")
+        summary["exported"] += candidate_store.flush()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=QUEUE_BATCH_SIZE)
+    parser.add_argument("--interval", type=float, default=5.0, help="пауза между опросами пустой очереди, с")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        summary = drain(args.batch_size)
+        summary["exported"] += candidate_store.flush()
+        if summary["batches"] or summary["exported"]:
+            logger.info(f"Очередь разобрана: {summary}")
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()